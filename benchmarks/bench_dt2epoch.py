@@ -0,0 +1,58 @@
+"""Rows/s of dt2epoch: per-call dateutil vs. format-aware bulk stream.
+
+    python benchmarks/bench_dt2epoch.py [--rows N] [--format iso|dotted] [--json]
+"""
+import argparse
+import datetime
+import json
+import time
+from typing import Callable
+
+import datagen
+from dateutil.parser import parse
+
+from twlib.timeconv import _numpy, dt2epoch_stream
+
+
+def per_call(values: list[str]) -> None:
+    """Body of the single value `dt2epoch` command."""
+    for v in values:
+        int(parse(v).replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+
+
+def bulk(use_numpy: bool) -> Callable[[list[str]], None]:
+    def run(values: list[str]) -> None:
+        for _ in dt2epoch_stream(values, use_numpy=use_numpy):
+            pass
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--format", choices=datagen.DT_LAYOUTS, default="iso")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    values = datagen.datetime_lines(args.rows, args.format)
+
+    variants = {"per_call": per_call, "bulk_python": bulk(False)}
+    if _numpy() is not None:
+        variants["bulk_numpy"] = bulk(True)
+    results = {"rows": args.rows}
+    for name, func in variants.items():
+        t = time.perf_counter()
+        func(values)
+        results[f"{name}_rows_per_s"] = args.rows / (time.perf_counter() - t)
+
+    if args.json:
+        print(json.dumps({"format": args.format, **results}, indent=2))
+        return
+    print(f"format {args.format}")
+    for name, value in results.items():
+        print(f"{name:<24}{value:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
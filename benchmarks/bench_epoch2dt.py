@@ -0,0 +1,74 @@
+"""Rows/s of epoch2dt: per-call path vs. bulk stream (pure Python and NumPy).
+
+    python benchmarks/bench_epoch2dt.py [--rows N] [--local] [--json]
+"""
+import argparse
+import datetime
+import json
+import subprocess
+import sys
+import time
+from typing import Callable
+
+import datagen
+
+from twlib.timeconv import DT_FMT, _numpy, epoch2dt_stream
+
+
+def per_call(epochs: list[str], to_local: bool) -> None:
+    """Body of the single value `epoch2dt` command."""
+    for e in epochs:
+        if to_local:
+            datetime.datetime.fromtimestamp(int(e) / 1000).strftime(DT_FMT)
+        else:
+            datetime.datetime.utcfromtimestamp(int(e) / 1000).strftime(DT_FMT)
+
+
+def bulk(use_numpy: bool) -> Callable[[list[str], bool], None]:
+    def run(epochs: list[str], to_local: bool) -> None:
+        for _ in epoch2dt_stream(epochs, to_local=to_local, use_numpy=use_numpy):
+            pass
+
+    return run
+
+
+def cli_per_process(n: int = 5) -> float:
+    """Seconds per `twlib epoch2dt <epoch>` process launch."""
+    start = time.perf_counter()
+    for _ in range(n):
+        subprocess.run(
+            [sys.executable, "-m", "twlib", "epoch2dt", "1347517370000"],
+            capture_output=True,
+            check=True,
+        )
+    return (time.perf_counter() - start) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--local", action="store_true")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    # log export like data: a few days of consecutive timestamps
+    epochs = datagen.epoch_lines(args.rows)
+
+    variants = {"per_call": per_call, "bulk_python": bulk(False)}
+    if _numpy() is not None:
+        variants["bulk_numpy"] = bulk(True)
+    results = {"rows": args.rows, "cli_rows_per_s": 1 / cli_per_process()}
+    for name, func in variants.items():
+        t = time.perf_counter()
+        func(epochs, args.local)
+        results[f"{name}_rows_per_s"] = args.rows / (time.perf_counter() - t)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, value in results.items():
+        print(f"{name:<24}{value:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Latency and peak memory of heic2img: full decode vs. reduced decode paths.
+
+Every variant runs in a fresh interpreter, so `ru_maxrss` is the peak RSS of that
+variant alone (libheif/Pillow buffers are invisible to tracemalloc).
+
+    python benchmarks/bench_heic2img.py [--input FILE] [--repeat N] [--json]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.absolute()
+INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+
+VARIANTS = {
+    "full": {},
+    "max-size-2048": {"max_size": 2048},
+    "max-size-1024": {"max_size": 1024},
+    "max-size-256": {"max_size": 256},
+    "thumbnail": {"thumbnail": True},
+}
+
+
+def _maxrss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+
+def run_child(variant: str, input_file: Path, repeat: int) -> dict:
+    from twlib.image import ConvertOptions, _image_module, convert_image
+
+    _image_module()  # import cost is not part of the measurement
+    baseline_mb = _maxrss_mb()
+    options = ConvertOptions(**VARIANTS[variant])
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out_file = Path(tmp) / "out.jpg"
+        for _ in range(repeat):
+            start = time.perf_counter()
+            convert_image(input_file, options.mode, out_file, options)
+            timings.append(time.perf_counter() - start)
+        size = _image_module().open(out_file).size
+    return {
+        "variant": variant,
+        "size": size,
+        "best_s": min(timings),
+        "mean_s": sum(timings) / len(timings),
+        "peak_rss_mb": _maxrss_mb(),
+        "peak_rss_delta_mb": _maxrss_mb() - baseline_mb,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", type=Path, default=INPUT_FILE)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.input, args.repeat)))
+        return
+
+    results = []
+    for variant in VARIANTS:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", variant]
+            + ["--input", str(args.input), "--repeat", str(args.repeat)],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        results.append(json.loads(out.stdout))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    full = results[0]
+    print(f"{'variant':<16}{'size':>14}{'best ms':>10}{'speedup':>9}{'rss MB':>9}")
+    for r in results:
+        print(
+            f"{r['variant']:<16}{'x'.join(map(str, r['size'])):>14}"
+            f"{r['best_s'] * 1000:>10.1f}{full['best_s'] / r['best_s']:>8.1f}x"
+            f"{r['peak_rss_delta_mb']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
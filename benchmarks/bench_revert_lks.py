@@ -0,0 +1,92 @@
+"""Symlink discovery for revert_lks: rglob + filter_path/matcher vs. pruning walker.
+
+Builds a synthetic deep tree with datagen.make_link_tree where most entries live
+below excluded directories (.git, .venv, node_modules) and only a few symlinks
+are of interest.
+
+    python benchmarks/bench_revert_lks.py [--depth N] [--fanout N] [--files N]
+        [--exclude-ratio R] [--json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import datagen
+
+from twlib.exclude import ExcludeMatcher
+from twlib.lib import filter_path
+from twlib.lks import iter_symlinks
+
+
+def rglob_filter(root: Path) -> list[Path]:
+    symlks = [f for f in root.rglob("*") if f.is_symlink()]
+    return [f for f in symlks if not filter_path(f, datagen.EXCLUDES)]
+
+
+def rglob_matcher(root: Path) -> list[Path]:
+    matcher = ExcludeMatcher(datagen.EXCLUDES)
+    rel = (f.relative_to(root) for f in root.rglob("*") if f.is_symlink())
+    return list(matcher.filter(rel))
+
+
+def walker(root: Path) -> list[Path]:
+    return list(iter_symlinks(root, datagen.EXCLUDES))
+
+
+def measure(func: Callable[[Path], list[Path]], root: Path) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    found = func(root)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"links": len(found), "seconds": seconds, "peak_kb": peak / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--exclude-ratio", type=float, default=0.75)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        n_links = datagen.make_link_tree(
+            Path(tmp),
+            depth=args.depth,
+            fanout=args.fanout,
+            links=1,
+            exclude_ratio=args.exclude_ratio,
+            files=args.files,
+        )
+        root = Path(tmp) / "tree"
+        n_entries = sum(len(dirs) + len(files) for _, dirs, files in os.walk(root))
+        results = {
+            "entries": n_entries,
+            "expected_links": n_links,
+            "rglob_filter": measure(rglob_filter, root),
+            "rglob_matcher": measure(rglob_matcher, root),
+            "scandir_walker": measure(walker, root),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{n_entries} entries, {n_links} links of interest")
+    for name in ("rglob_filter", "rglob_matcher", "scandir_walker"):
+        r = results[name]
+        print(
+            f"{name:<16}{r['links']:>6} links{r['seconds'] * 1000:>10.1f} ms"
+            f"{r['peak_kb']:>10.1f} KiB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
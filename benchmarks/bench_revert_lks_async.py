@@ -0,0 +1,85 @@
+"""revert_lks on a latency-bound filesystem: sequential vs. --concurrency N.
+
+Simulates NFS/SMB round trips by delaying the metadata calls (scandir, lstat,
+stat, readlink, unlink, mkdir) of this process by --latency-ms. Every run gets
+a fresh tree from datagen.make_link_tree.
+
+    python benchmarks/bench_revert_lks_async.py [--latency-ms 1] [--fanout 4]
+        [--concurrency 0 4 16 64] [--json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+import datagen
+
+from twlib.lks import revert_symlinks
+
+METADATA_CALLS = ("scandir", "lstat", "stat", "readlink", "unlink", "mkdir")
+
+
+@contextlib.contextmanager
+def latency(seconds: float) -> Iterator[None]:
+    originals = {name: getattr(os, name) for name in METADATA_CALLS}
+
+    def delayed(func):
+        def call(*args, **kwargs):
+            time.sleep(seconds)  # releases the GIL like a blocking syscall
+            return func(*args, **kwargs)
+
+        return call
+
+    for name, func in originals.items():
+        setattr(os, name, delayed(func))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+
+def run(concurrency: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        n_links = datagen.make_link_tree(
+            Path(tmp), depth=args.depth, fanout=args.fanout, links=args.links
+        )
+        with latency(args.latency_ms / 1000):
+            start = time.perf_counter()
+            result = revert_symlinks(
+                Path(tmp) / "tree", datagen.EXCLUDES, concurrency=concurrency
+            )
+            seconds = time.perf_counter() - start
+    assert result.links == n_links, (result.links, n_links)
+    return {"concurrency": concurrency, "links": n_links, "seconds": seconds}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--links", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[0, 4, 16, 64])
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    results = [run(c, args) for c in args.concurrency]
+    if args.json:
+        print(json.dumps({"latency_ms": args.latency_ms, "runs": results}, indent=2))
+        return
+    base = results[0]["seconds"]
+    print(f"{results[0]['links']} links, {args.latency_ms} ms per metadata call")
+    for r in results:
+        print(
+            f"concurrency {r['concurrency']:>4}{r['seconds'] * 1000:>12.1f} ms"
+            f"{base / r['seconds']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
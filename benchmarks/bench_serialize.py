@@ -0,0 +1,68 @@
+"""Size and throughput of the base64 serializers: plain pickle vs. envelope formats.
+
+Payloads: a list of path strings, random bytes, compressible bytes and (with NumPy)
+a float array. Each is encoded to text and decoded again, in memory.
+
+    python benchmarks/bench_serialize.py [--mb N] [--json]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any
+
+from twlib.lib import deserialize_from_base64, serialize_to_base64
+from twlib.timeconv import _numpy
+
+FORMATS = (None, "none", "zlib", "lzma")
+
+
+def payloads(mb: float) -> dict[str, Any]:
+    size = int(mb * 1e6)
+    data = {
+        "paths": [f"/home/user/project/src/file{i:07d}.py" for i in range(size // 40)],
+        "random_bytes": os.urandom(size),
+        "text_bytes": (b"2012-09-13 06:22:50 INFO request served\n" * size)[:size],
+    }
+    if (np := _numpy()) is not None:
+        data["float_array"] = np.linspace(0, 1, size // 8)
+    return data
+
+
+def measure(obj: Any, compression: str | None) -> dict:
+    start = time.perf_counter()
+    text = serialize_to_base64(obj, compression=compression)
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    deserialize_from_base64(text)
+    decode = time.perf_counter() - start
+    return {"chars": len(text), "encode_s": encode, "decode_s": decode}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=8, help="payload size in MB")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    results = {}
+    for name, obj in payloads(args.mb).items():
+        results[name] = {str(c): measure(obj, c) for c in FORMATS}
+
+    if args.json:
+        print(json.dumps({"mb": args.mb, "results": results}, indent=2))
+        return
+    mb = args.mb
+    for name, formats in results.items():
+        print(name)
+        for fmt, r in formats.items():
+            fmt = "plain" if fmt == "None" else fmt
+            print(
+                f"  {fmt:<6}{r['chars'] / 1e6:>10.2f} MB text"
+                f"{mb / r['encode_s']:>10.1f} MB/s encode"
+                f"{mb / r['decode_s']:>10.1f} MB/s decode"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Synthetic, seeded inputs for the benchmark suite.
+
+Everything is generated offline, so results only depend on the scale and seed:
+image corpora, symlink trees, git work trees, epoch/datetime/CSV streams, path
+lists and pickle payloads. Import from benchmark scripts in this directory.
+"""
+import datetime
+import os
+import random
+from pathlib import Path
+from typing import Any
+
+EXCLUDES = [".venv", ".git", "node_modules"]
+DT_LAYOUTS = {"iso": "%Y-%m-%d %H:%M:%S", "dotted": "%d.%m.%Y %H:%M:%S"}
+EPOCH_START_MS = 1347517370000  # 2012-09-13
+
+
+def make_images(
+    root: Path, n: int, size: tuple[int, int] = (1024, 768), fmt: str = "heic"
+) -> list[Path]:
+    """Write n noisy gradient images as heic or png, spread over two subdirs."""
+    from PIL import Image
+
+    if fmt == "heic":
+        from pillow_heif import register_heif_opener
+
+        register_heif_opener()
+    gradient = Image.linear_gradient("L").resize(size)
+    files = []
+    for i in range(n):
+        noise = Image.effect_noise(size, 32 + i % 32)
+        img = Image.merge("RGB", (noise, gradient, gradient.rotate(90 * i)))
+        f = root / f"d{i % 2}" / f"img{i:04d}.{fmt}"
+        f.parent.mkdir(parents=True, exist_ok=True)
+        img.save(f)
+        files.append(f)
+    return files
+
+
+def make_link_tree(
+    root: Path,
+    depth: int = 3,
+    fanout: int = 4,
+    links: int = 2,
+    exclude_ratio: float = 0.25,
+    seed: int = 0,
+    files: int = 1,
+) -> int:
+    """Tree of `fanout` dirs per level with `links` symlinks and `files` plain
+    files per dir, return the number of links outside excluded dirs.
+
+    A share `exclude_ratio` of the subdirectories is placed below an excluded
+    name (.git, .venv, node_modules) with a full subtree of its own. Link
+    targets (files and small dirs) live in `root/targets`, the tree to revert in
+    `root/tree`.
+    """
+    rnd = random.Random(seed)
+    targets = root / "targets"
+    (targets / "dir").mkdir(parents=True)
+    (targets / "dir" / "inner.txt").write_text("inner")
+    for i in range(8):
+        (targets / f"t{i}.txt").write_bytes(rnd.randbytes(1024))
+    choices = [targets / "dir", *(targets / f"t{i}.txt" for i in range(8))]
+    n_links = 0
+
+    def populate(d: Path, level: int, excluded: bool) -> None:
+        nonlocal n_links
+        d.mkdir(parents=True)
+        for i in range(links):
+            os.symlink(rnd.choice(choices), d / f"lk{i}")
+            n_links += not excluded
+        for i in range(files):
+            (d / f"plain{i}.txt").touch()
+        if level == depth:
+            return
+        for i in range(fanout):
+            if rnd.random() < exclude_ratio:
+                excluded_dir = d / EXCLUDES[i % len(EXCLUDES)] / f"d{i}"
+                populate(excluded_dir, level + 1, True)
+            else:
+                populate(d / f"d{i}", level + 1, excluded)
+
+    populate(root / "tree", 0, False)
+    return n_links
+
+
+def epoch_lines(n: int, seed: int = 0) -> list[str]:
+    """Epochs in ms over three days, one per line."""
+    rnd = random.Random(seed)
+    return [str(EPOCH_START_MS + rnd.randrange(3 * 86_400_000)) for _ in range(n)]
+
+
+def datetime_lines(n: int, layout: str = "iso", seed: int = 0) -> list[str]:
+    start = datetime.datetime(2012, 9, 13)
+    rnd = random.Random(seed)
+    return [
+        (start + datetime.timedelta(seconds=rnd.randrange(3 * 86400))).strftime(
+            DT_LAYOUTS[layout]
+        )
+        for _ in range(n)
+    ]
+
+
+def path_list(
+    n: int, depth: int = 6, exclude_ratio: float = 0.25, seed: int = 0
+) -> list[Path]:
+    """Relative paths of varying depth, a share of them below an excluded dir."""
+    rnd = random.Random(seed)
+    paths = []
+    for _ in range(n):
+        parts = [f"d{rnd.randrange(8)}" for _ in range(rnd.randint(1, depth))]
+        if rnd.random() < exclude_ratio:
+            parts.insert(rnd.randrange(len(parts)), rnd.choice(EXCLUDES))
+        paths.append(Path(*parts, f"f{rnd.randrange(100)}.py"))
+    return paths
+
+
+def csv_lines(n: int, seed: int = 0) -> list[str]:
+    """CSV with header and an epoch ms column `ts`, as for `rewrite-ts`."""
+    epochs = epoch_lines(n, seed)
+    return ["id,ts,value"] + [f"{i},{ts},{i % 97}" for i, ts in enumerate(epochs)]
+
+
+def path_pairs(n: int, depth: int = 6, seed: int = 0) -> list[str]:
+    """'source<TAB>target' manifest lines of absolute files, as for `relative -f`."""
+    rnd = random.Random(seed)
+    dirs = [
+        "/" + "/".join(f"d{rnd.randrange(4)}" for _ in range(rnd.randint(1, depth)))
+        for _ in range(max(n // 50, 1))
+    ]
+    return [
+        f"{rnd.choice(dirs)}/s{i}.txt\t{rnd.choice(dirs)}/t{i}.txt" for i in range(n)
+    ]
+
+
+def pickle_payload(mb: float, seed: int = 0) -> dict[str, Any]:
+    """About `mb` MiB: half in large binary blobs, half in small Python objects."""
+    rnd = random.Random(seed)
+    n_blobs = max(int(mb * 2), 1)
+    n_records = int(mb * (1 << 20) / 2 / 100)
+    return {
+        "blobs": [rnd.randbytes(1 << 18) for _ in range(n_blobs)],
+        "records": [
+            {"id": i, "name": f"record-{i}", "value": rnd.random(), "tags": ["a", "b"]}
+            for i in range(n_records)
+        ],
+    }
+
+
+def make_repos(root: Path, n: int, fanout: int = 8) -> list[Path]:
+    """Work trees with a minimal .git (HEAD, config), grouped `fanout` per dir."""
+    repos = []
+    for i in range(n):
+        repo = root / f"group{i // fanout}" / f"repo{i}"
+        (repo / ".git").mkdir(parents=True)
+        (repo / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+        (repo / ".git" / "config").write_text(
+            '[remote "origin"]\n'
+            f"\turl = git@github.com:bench/repo{i}.git\n"
+            "\tfetch = +refs/heads/*:refs/remotes/origin/*\n"
+            '[branch "main"]\n\tremote = origin\n'
+        )
+        (repo / "README.md").touch()
+        repos.append(repo)
+    return repos
@@ -0,0 +1,381 @@
+"""Offline benchmark suite of the twlib commands on synthetic data.
+
+Every case runs in-process on inputs from `datagen.py`, so no network or sample
+files are needed. CLI cold start (interpreter, imports and one command) is
+measured separately in fresh interpreters, also through the thin client against
+a warm `twlib serve` daemon. Results carry version and platform
+metadata; `--compare` reports best-time ratios against an earlier results file
+and exits with 1 on regressions above `--threshold`.
+
+    python benchmarks/suite.py [--scale F] [--repeat N] [--only CASE ...]
+        [--out results.json] [--compare baseline.json] [--json]
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Iterator
+
+import datagen
+
+ROOT_DIR = Path(__file__).parent.parent.absolute()
+COLD_START = {
+    "python": ["-c", "pass"],
+    "import": ["-c", "import twlib.main"],
+    "environment": ["-c", "import twlib.environment"],
+    "settings": ["-c", "from twlib.environment import config; config.dbfile"],
+    "help": ["-m", "twlib", "--help"],
+    "epoch2dt": ["-m", "twlib", "epoch2dt", str(datagen.EPOCH_START_MS)],
+}
+DAEMON_CALLS = {  # thin client against a warm `twlib serve`
+    "client_epoch2dt": ["-m", "twlib.client", "epoch2dt", "1347517370000"],
+    "client_relative": ["-m", "twlib.client", "relative", "/a/b/c", "/a/d/e"],
+}
+
+
+@dataclass
+class Case:
+    unit: str
+    prepare: Callable[[Path, float], tuple[Any, int]]  # (tmp, scale) -> data, items
+    run: Callable[[Any], Any]
+    fresh: bool = False  # prepare before every repeat, the case changes its input
+
+
+def _drain(iterable: Any) -> None:
+    collections.deque(iterable, maxlen=0)
+
+
+def _epoch2dt(data: list[str]) -> None:
+    from twlib.timeconv import epoch2dt_stream
+
+    _drain(epoch2dt_stream(data))
+
+
+def _dt2epoch(data: list[str]) -> None:
+    from twlib.timeconv import dt2epoch_stream
+
+    _drain(dt2epoch_stream(data))
+
+
+def _prepare_csv(tmp: Path, scale: float) -> tuple[Any, int]:
+    n = max(int(100_000 * scale), 1)
+    return "\n".join(datagen.csv_lines(n)), n
+
+
+def _rewrite_ts(data: str) -> None:
+    from twlib.tscol import Converter, rewrite_csv
+
+    rewrite_csv(io.StringIO(data), io.StringIO(), ["ts"], Converter("dt"))
+
+
+def _relative(data: list[str]) -> None:
+    from twlib.relpath import _parts, _relpath, relative_paths
+
+    _parts.cache_clear()
+    _relpath.cache_clear()
+    _drain(relative_paths(data))
+
+
+def _filter_path(data: list[Path]) -> None:
+    from twlib.lib import _matcher, filter_path
+
+    _matcher.cache_clear()
+    _drain(p for p in data if not filter_path(p, datagen.EXCLUDES))
+
+
+def _exclude_filter(data: list[Path]) -> None:
+    from twlib.exclude import ExcludeMatcher
+
+    _drain(ExcludeMatcher(datagen.EXCLUDES).filter(data))
+
+
+def _serialize(compression: str | None) -> Callable[[Any], None]:
+    def run(data: Any) -> None:
+        from twlib.lib import serialize_to_base64
+
+        serialize_to_base64(data, compression=compression)
+
+    return run
+
+
+def _deserialize(data: str) -> None:
+    from twlib.lib import deserialize_from_base64
+
+    deserialize_from_base64(data)
+
+
+def _prepare_payload(compression: str | None, encoded: bool) -> Callable:
+    def prepare(tmp: Path, scale: float) -> tuple[Any, int]:
+        from twlib.lib import serialize_to_base64
+
+        mb = 16 * scale
+        payload = datagen.pickle_payload(mb)
+        if encoded:
+            return serialize_to_base64(payload, compression=compression), mb
+        return payload, mb
+
+    return prepare
+
+
+def _prepare_images(tmp: Path, scale: float) -> tuple[Any, int]:
+    n = max(int(8 * scale), 1)
+    datagen.make_images(tmp / "src", n, fmt="heic")
+    return tmp, n
+
+
+def _heic2img(tmp: Path) -> None:
+    from twlib.image import ConvertOptions, convert_batch, iter_inputs, plan_outputs
+
+    jobs = plan_outputs(iter_inputs([str(tmp / "src")]), "jpg", tmp / "out")
+    for result in convert_batch(jobs, ConvertOptions()):
+        if result.error is not None:
+            raise RuntimeError(result.error)
+
+
+def _prepare_corpus(tmp: Path, scale: float) -> tuple[Any, int]:
+    n = max(int(16 * scale), 2)
+    heic = datagen.make_images(tmp / "heic", n // 2, (640, 480), fmt="heic")
+    png = datagen.make_images(tmp / "png", n - n // 2, (640, 480), fmt="png")
+    return heic + png, n
+
+
+def _scan_img(data: list[Path]) -> None:
+    from twlib.imgindex import scan
+
+    _drain(scan(data))
+
+
+def _prepare_tree(tmp: Path, scale: float) -> tuple[Any, int]:
+    fanout = max(2, round(6 * scale ** (1 / 3)))
+    return tmp / "tree", datagen.make_link_tree(tmp, depth=3, fanout=fanout)
+
+
+def _revert_lks(tree: Path) -> None:
+    from typer.testing import CliRunner
+
+    from twlib.main import app
+
+    excludes = [arg for e in datagen.EXCLUDES for arg in ("-e", e)]
+    result = CliRunner().invoke(app, ["revert-lks", *excludes, str(tree)])
+    if result.exit_code != 0:
+        raise RuntimeError(result.output)
+
+
+def _revert_lks_plan(tree: Path) -> None:
+    from twlib.lks import make_plan
+
+    make_plan(tree, datagen.EXCLUDES)
+
+
+def _prepare_repos(tmp: Path, scale: float) -> tuple[Any, int]:
+    n = max(int(200 * scale), 1)
+    datagen.make_repos(tmp, n)
+    return tmp, n
+
+
+def _git_urls(root: Path) -> None:
+    from twlib.git_open import scan_repos
+
+    _drain(scan_repos(root))
+
+
+def _lines(make: Callable[[int], list[str]], base: int) -> Callable:
+    def prepare(tmp: Path, scale: float) -> tuple[Any, int]:
+        n = max(int(base * scale), 1)
+        return make(n), n
+
+    return prepare
+
+
+CASES = {
+    "epoch2dt": Case("rows", _lines(datagen.epoch_lines, 200_000), _epoch2dt),
+    "dt2epoch": Case("rows", _lines(datagen.datetime_lines, 100_000), _dt2epoch),
+    "rewrite_ts": Case("rows", _prepare_csv, _rewrite_ts),
+    "relative": Case("pairs", _lines(datagen.path_pairs, 200_000), _relative),
+    "filter_path": Case("paths", _lines(datagen.path_list, 100_000), _filter_path),
+    "exclude_filter": Case(
+        "paths", _lines(datagen.path_list, 100_000), _exclude_filter
+    ),
+    "serialize": Case("MiB", _prepare_payload(None, False), _serialize(None)),
+    "deserialize": Case("MiB", _prepare_payload(None, True), _deserialize),
+    "serialize_zlib": Case("MiB", _prepare_payload("zlib", False), _serialize("zlib")),
+    "deserialize_zlib": Case("MiB", _prepare_payload("zlib", True), _deserialize),
+    "heic2img": Case("images", _prepare_images, _heic2img),
+    "scan_img": Case("images", _prepare_corpus, _scan_img),
+    "revert_lks_plan": Case("links", _prepare_tree, _revert_lks_plan),
+    "revert_lks": Case("links", _prepare_tree, _revert_lks, fresh=True),
+    "git_urls": Case("repos", _prepare_repos, _git_urls),
+}
+
+
+def run_case(case: Case, scale: float, repeat: int) -> dict:
+    timings = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data, items = case.prepare(Path(tempfile.mkdtemp(dir=tmp)), scale)
+        case.run(data)  # warm-up: lazy imports are cold start, not throughput
+        for _ in range(repeat):
+            if case.fresh:
+                data, items = case.prepare(Path(tempfile.mkdtemp(dir=tmp)), scale)
+            gc.collect()
+            start = time.perf_counter()
+            case.run(data)
+            timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "unit": case.unit,
+        "items": items,
+        "best_s": best,
+        "mean_s": sum(timings) / len(timings),
+        "per_s": items / best,
+    }
+
+
+def run_cold_start(argv: list[str], repeat: int, env: dict | None = None) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *argv],
+            check=True,
+            capture_output=True,
+            cwd=ROOT_DIR,
+            env=env,
+        )
+        timings.append(time.perf_counter() - start)
+    return {"best_s": min(timings), "mean_s": sum(timings) / len(timings)}
+
+
+@contextlib.contextmanager
+def daemon(tmp: str) -> Iterator[dict]:
+    """Run `twlib serve` on a private socket, yield the client environment."""
+    env = {**os.environ, "TWLIB_SOCKET": os.path.join(tmp, "twlib.sock")}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "twlib", "serve"], env=env, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while not os.path.exists(env["TWLIB_SOCKET"]):
+            if time.monotonic() > deadline or proc.poll() is not None:
+                raise RuntimeError("twlib serve did not start")
+            time.sleep(0.05)
+        yield env
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def metadata(args: argparse.Namespace) -> dict:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        twlib_version = version("twlib")
+    except PackageNotFoundError:
+        twlib_version = None
+    git = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT_DIR,
+    )
+    try:
+        import numpy  # noqa: F401
+
+        has_numpy = True
+    except ImportError:
+        has_numpy = False
+    return {
+        "twlib": twlib_version,
+        "commit": git.stdout.strip() or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": has_numpy,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+    }
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float, out: IO[str] = sys.stdout
+) -> list[str]:
+    """Print best-time ratios against baseline, return the regressed entries."""
+    regressions = []
+    if baseline["meta"]["scale"] != results["meta"]["scale"]:
+        print(f"Warning: baseline scale {baseline['meta']['scale']}", file=out)
+    print(f"{'':<22}{'baseline ms':>12}{'current ms':>12}{'ratio':>8}", file=out)
+    for section in ("cases", "cold_start"):
+        for name, r in results[section].items():
+            if (old := baseline.get(section, {}).get(name)) is None:
+                continue
+            ratio = r["best_s"] / old["best_s"]
+            flag = ""
+            if ratio > threshold:
+                regressions.append(f"{section}.{name}")
+                flag = "  REGRESSION"
+            print(
+                f"{name:<22}{old['best_s'] * 1000:>12.1f}"
+                f"{r['best_s'] * 1000:>12.1f}{ratio:>7.2f}x{flag}",
+                file=out,
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="input size factor")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=CASES, help="cases to run")
+    parser.add_argument("--no-cold-start", action="store_true")
+    parser.add_argument("--out", type=Path, help="write JSON results to this file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON results file")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {"meta": metadata(args), "cases": {}, "cold_start": {}}
+    for name in args.only or CASES:
+        results["cases"][name] = run_case(CASES[name], args.scale, args.repeat)
+        if not args.json:
+            r = results["cases"][name]
+            print(
+                f"{name:<22}{r['items']:>10,} {r['unit']:<7}"
+                f"{r['best_s'] * 1000:>10.1f} ms{r['per_s']:>14,.1f} {r['unit']}/s"
+            )
+    if not args.no_cold_start:
+        for name, argv in COLD_START.items():
+            results["cold_start"][name] = run_cold_start(argv, max(args.repeat, 5))
+            if not args.json:
+                r = results["cold_start"][name]
+                print(f"cold start {name:<16}{r['best_s'] * 1000:>23.1f} ms")
+        with tempfile.TemporaryDirectory() as tmp, daemon(tmp) as env:
+            for name, argv in DAEMON_CALLS.items():
+                r = run_cold_start(argv, max(args.repeat, 5), env)
+                results["cold_start"][name] = r
+                if not args.json:
+                    print(f"cold start {name:<16}{r['best_s'] * 1000:>23.1f} ms")
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        out = sys.stderr if args.json else sys.stdout
+        if compare(results, baseline, args.threshold, out):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,14 @@
-from twlib.git_open import app
-from twlib.main import app
-
 __all__ = ["git_open", "app"]
+
+
+def __getattr__(name: str) -> object:
+    # lazy, so that twlib.client does not import typer and the apps
+    if name == "app":
+        from twlib.main import app
+
+        return app
+    if name == "git_open":
+        import twlib.git_open
+
+        return twlib.git_open
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
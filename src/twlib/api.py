@@ -0,0 +1,207 @@
+import datetime
+import logging
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterable, Iterator, Sequence
+
+from twlib.exclude import ExcludeMatcher
+from twlib.image import (
+    ConvertOptions,
+    ConvertResult,
+    ImageInfo,
+    convert_batch,
+    convert_image,
+    iter_inputs,
+    plan_outputs,
+)
+from twlib.lks import RevertResult, revert_symlinks
+from twlib.relpath import relative_path, relative_paths
+from twlib.timeconv import DT_FMT, dt2epoch_stream, epoch2dt_stream
+
+""" Library API of the twlib commands: typed, no console I/O, no typer
+
+Single values go in and results come out. The bulk variants take iterables and
+return generators, which consume their input lazily. Invalid input raises
+ValueError, except in the bulk variants, where it yields an empty or None
+result to keep the output aligned with the input.
+"""
+
+if TYPE_CHECKING:
+    from twlib.git_open import RepoUrl
+    from twlib.imgindex import ImageMeta
+    from twlib.tscol import RewriteStats
+
+_log = logging.getLogger(__name__)
+
+__all__ = [
+    "ConvertOptions",
+    "ConvertResult",
+    "ImageInfo",
+    "RevertResult",
+    "dt2epoch",
+    "dts2epoch",
+    "epoch2dt",
+    "epochs2dt",
+    "git_urls",
+    "heic2img",
+    "heic2imgs",
+    "image_info",
+    "relative",
+    "relatives",
+    "revert_lks",
+    "rewrite_ts",
+    "scan_img",
+]
+
+
+def epoch2dt(epoch: int, to_local: bool = False) -> str:
+    """Epoch in ms (UTC) as '%Y-%m-%d %H:%M:%S' datetime in local time or UTC."""
+    if to_local:
+        return datetime.datetime.fromtimestamp(epoch / 1000).strftime(DT_FMT)
+    return datetime.datetime.utcfromtimestamp(epoch / 1000).strftime(DT_FMT)
+
+
+def epochs2dt(epochs: Iterable[int | str], to_local: bool = False) -> Iterator[str]:
+    """`epoch2dt` for many epochs, invalid values yield an empty string."""
+    lines = (e if isinstance(e, str) else str(e) for e in epochs)
+    for chunk in epoch2dt_stream(lines, to_local=to_local):
+        yield from chunk
+
+
+def dt2epoch(dt: str, is_local: bool = False) -> int:
+    """Epoch in ms (UTC) of a datetime string, read as local time or UTC."""
+    from dateutil.parser import ParserError, parse
+
+    from twlib.timeconv import local_timezone
+
+    try:
+        parsed = parse(dt)
+    except (ParserError, OverflowError) as e:
+        raise ValueError(f"Invalid datetime {dt!r}: {e}") from None
+    tz = local_timezone() if is_local else datetime.timezone.utc
+    return int(parsed.replace(tzinfo=tz).timestamp() * 1000)
+
+
+def dts2epoch(
+    dts: Iterable[str], is_local: bool = False, fmt: str | None = None
+) -> Iterator[int | None]:
+    """`dt2epoch` for many datetimes of one layout (strptime format or "iso",
+    detected if omitted), invalid values yield None."""
+    for chunk in dt2epoch_stream(dts, is_local=is_local, fmt=fmt):
+        yield from (int(v) if v else None for v in chunk)
+
+
+def relative(source: str | Path, target: str | Path) -> str:
+    """Path of file target relative to the directory of file source."""
+    return relative_path(str(source), str(target))
+
+
+def relatives(pairs: Iterable[tuple[str, str] | str]) -> Iterator[str]:
+    """`relative` for (source, target) pairs or 'source<TAB>target' lines, invalid
+    pairs yield an empty string."""
+    return relative_paths(pairs)
+
+
+def image_info(input_file: str | Path) -> ImageInfo:
+    """Mode, size, format, metadata keys and bands of an image, not decoded."""
+    from twlib.image import _image_module
+
+    with _image_module().open(input_file) as img:
+        return ImageInfo.of(img)
+
+
+def heic2img(
+    input_file: str | Path,
+    mode: str = "jpg",
+    out_file: str | Path | None = None,
+    max_size: int | None = None,
+    thumbnail: bool = False,
+) -> Path:
+    """Convert one HEIC (or any Pillow readable) image, return the output path."""
+    options = ConvertOptions(mode=mode, max_size=max_size, thumbnail=thumbnail)
+    return convert_image(input_file, mode, out_file, options)
+
+
+def heic2imgs(
+    inputs: Iterable[str | Path],
+    mode: str = "jpg",
+    out_dir: str | Path | None = None,
+    max_size: int | None = None,
+    thumbnail: bool = False,
+    workers: int = 1,
+) -> Iterator[ConvertResult]:
+    """Convert files, directories and globs, results in input order.
+
+    Failed conversions are results with an `error`, they do not stop the batch.
+    """
+    options = ConvertOptions(mode=mode, max_size=max_size, thumbnail=thumbnail)
+    jobs = plan_outputs(
+        iter_inputs(str(i) for i in inputs),
+        mode=mode,
+        out_dir=None if out_dir is None else Path(out_dir),
+    )
+    return convert_batch(jobs, options=options, workers=workers)
+
+
+def revert_lks(
+    root: str | Path,
+    excludes: Iterable[str] | ExcludeMatcher = (".venv", ".git"),
+    move: bool = False,
+    dedup: str = "none",
+    workers: int = 1,
+    dry_run: bool = False,
+    concurrency: int = 0,
+) -> RevertResult:
+    """Replace the symlinks below root with their targets, see `revert_symlinks`."""
+    return revert_symlinks(root, excludes, move, dedup, workers, dry_run, concurrency)
+
+
+def rewrite_ts(
+    fin: IO[str],
+    fout: IO[str],
+    columns: Sequence[str],
+    to: str = "dt",
+    tz: str = "UTC",
+    unit: str = "auto",
+    fmt: str = "auto",
+    kind: str = "csv",
+    workers: int = 1,
+) -> "RewriteStats":
+    """Rewrite timestamp columns of a CSV (with header) or JSONL stream."""
+    from twlib.tscol import (
+        UNITS,
+        Converter,
+        check_timezone,
+        rewrite_csv,
+        rewrite_jsonl,
+    )
+
+    if to not in ("dt", "epoch"):
+        raise ValueError(f"Invalid target {to}, must be dt or epoch")
+    if unit != "auto" and unit not in UNITS:
+        raise ValueError(f"Invalid unit {unit}, must be one of {list(UNITS)}")
+    if kind not in ("csv", "jsonl"):
+        raise ValueError(f"Invalid kind {kind}, must be csv or jsonl")
+    check_timezone(tz)
+    rewrite = rewrite_csv if kind == "csv" else rewrite_jsonl
+    converter = Converter(to=to, tz=tz, unit=unit, fmt=fmt)
+    return rewrite(fin, fout, columns, converter, workers=workers)
+
+
+def scan_img(inputs: Iterable[str | Path], workers: int = 1) -> Iterator["ImageMeta"]:
+    """Header metadata of the images in files, directories and globs."""
+    from twlib.imgindex import IMAGE_SUFFIXES, scan
+
+    files = iter_inputs((str(i) for i in inputs), suffixes=IMAGE_SUFFIXES)
+    return scan((f for f, _ in files), workers=workers)
+
+
+def git_urls(
+    root: str | Path,
+    remote: str | None = None,
+    workers: int = 8,
+    nested: bool = False,
+) -> Iterator["RepoUrl"]:
+    """Remote urls of the git repositories below root, in path order."""
+    from twlib.git_open import scan_repos
+
+    return scan_repos(Path(root).absolute(), remote, workers, None, nested)
@@ -0,0 +1,123 @@
+import _socket  # the C module: importing `socket` costs more than a call
+import os
+import struct
+import sys
+
+""" Thin client of the twlib daemon, runs the command in-process without one
+
+Imports nothing but the standard library, so that a call costs an interpreter
+start and a round trip to the warm daemon (see `twlib serve`).
+"""
+
+HEAD = struct.Struct("<I")  # payload size, sent together with the std fds
+CODE = struct.Struct("<i")  # exit code of the command
+PROGS = ("twlib", "git-open")
+
+
+def socket_path() -> str:
+    """$TWLIB_SOCKET, else twlib-<uid>.sock in $XDG_RUNTIME_DIR, $TMPDIR or /tmp."""
+    if path := os.environ.get("TWLIB_SOCKET"):
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR", "/tmp")
+    return os.path.join(runtime_dir, f"twlib-{os.getuid()}.sock")
+
+
+def encode_request(prog: str, argv: list[str], cwd: str, env: dict[str, str]) -> bytes:
+    """NUL separated: prog, cwd, argc, argv, then KEY=VALUE environment entries."""
+    fields = [prog, cwd, str(len(argv)), *argv, *(f"{k}={v}" for k, v in env.items())]
+    return b"\0".join(map(os.fsencode, fields))
+
+
+def decode_request(payload: bytes) -> tuple[str, list[str], str, dict[str, str]]:
+    prog, cwd, argc, *rest = map(os.fsdecode, payload.split(b"\0"))
+    argv, entries = rest[: int(argc)], rest[int(argc) :]
+    return prog, argv, cwd, dict(e.split("=", 1) for e in entries)
+
+
+def recv_exact(sock: _socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        if not (data := sock.recv(size - len(buf))):
+            raise ConnectionError("Connection closed by peer")
+        buf += data
+    return bytes(buf)
+
+
+def connect() -> _socket.socket | None:
+    """Socket to a daemon of this user, None if none is listening."""
+    if os.environ.get("TWLIB_NO_DAEMON") or not hasattr(_socket, "SCM_RIGHTS"):
+        return None
+    path = socket_path()
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        if os.stat(path).st_uid == os.getuid():
+            sock.connect(path)
+            return sock
+    except OSError:
+        pass
+    sock.close()
+    return None
+
+
+def call(sock: _socket.socket, prog: str, argv: list[str]) -> int:
+    """Run a command in the daemon with our stdin/stdout/stderr, return its exit
+    code. The daemon writes to the passed file descriptors directly."""
+    payload = encode_request(prog, argv, os.getcwd(), dict(os.environ))
+    fds = struct.pack("3i", 0, 1, 2)
+    sock.sendmsg(
+        [HEAD.pack(len(payload))], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)]
+    )
+    sock.sendall(payload)
+    try:
+        (code,) = CODE.unpack(recv_exact(sock, CODE.size))
+    except ConnectionError:
+        sys.stderr.write("twlib daemon: command aborted\n")
+        return 1
+    return int(code)
+
+
+def _in_process(prog: str) -> None:
+    if prog == "git-open":
+        from twlib.git_open import app
+    else:
+        from twlib.main import app
+    app(prog_name=prog)
+
+
+def open_std_fds() -> None:
+    """Put /dev/null on closed stdin/stdout/stderr.
+
+    Otherwise the socket would take the lowest free fd, be passed as one of the
+    command's std fds and the command would read or write its own connection.
+    """
+    for fd in (0, 1, 2):
+        try:
+            os.fstat(fd)
+        except OSError:
+            null = os.open(os.devnull, os.O_RDWR)
+            if null != fd:
+                os.dup2(null, fd)
+                os.close(null)
+
+
+def main(prog: str = "twlib") -> None:
+    """Entry point `twlibc`: `twlib` through the daemon if one is running."""
+    open_std_fds()
+    sock = connect()
+    if sock is None:
+        _in_process(prog)
+        return
+    try:
+        code = call(sock, prog, sys.argv[1:])
+    finally:
+        sock.close()
+    sys.exit(code)
+
+
+def git_open() -> None:
+    """Entry point `git-openc`: `git-open` through the daemon."""
+    main("git-open")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import gc
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+import traceback
+from typing import Any
+
+from twlib.client import CODE, HEAD, PROGS, decode_request, recv_exact
+
+""" Opt-in daemon keeping the CLI apps imported behind a Unix-domain socket
+
+Every request is served by a fork of the warm daemon: it takes over the std file
+descriptors, working directory and environment of the client, runs the command
+and reports the exit code. Process state of a command never leaks into the next.
+"""
+
+_log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+
+
+def warm_up() -> dict[str, Any]:
+    """Import the apps and the lazily imported modules of their commands and build
+    the click commands of the apps, which typer otherwise does on every call.
+
+    Nothing depending on the environment (settings, local timezone) is built
+    here, it is read per request in the fork.
+    """
+    import encodings.ascii  # noqa: F401, LANG=C clients
+
+    import dateutil.parser  # noqa: F401
+    import typer._click.decorators  # noqa: F401, used by click on invoke
+    import typer.rich_utils  # noqa: F401, help and error output
+    from typer.main import get_command
+
+    import twlib.environment
+    import twlib.relpath  # noqa: F401
+    import twlib.timeconv
+    from twlib.git_open import app as git_open_app
+    from twlib.image import _image_module
+    from twlib.main import app
+
+    _image_module()
+    twlib.environment.warm_up()
+    twlib.timeconv._numpy()
+    commands = {"twlib": get_command(app), "git-open": get_command(git_open_app)}
+    gc.collect()
+    gc.freeze()  # fewer copy-on-write faults in the forks from collections
+    return commands
+
+
+def _attach(fds: list[int]) -> None:
+    """Make the client's stdin/stdout/stderr ours, with fresh Python streams."""
+    for fd, client_fd in enumerate(fds):
+        os.dup2(client_fd, fd)
+        os.close(client_fd)
+    sys.stdin = open(0, closefd=False)
+    sys.stdout = open(1, "w", closefd=False, buffering=1 if os.isatty(1) else -1)
+    sys.stderr = open(2, "w", closefd=False, buffering=1)
+    logging.root.handlers.clear()  # the app configures logging to the new stderr
+
+
+def _run(command: Any, prog: str, argv: list[str]) -> int:
+    try:
+        command.main(args=argv, prog_name=prog)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        sys.stderr.write(f"{e.code}\n")
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "Daemon"
+
+    def handle(self) -> None:
+        # runs in the fork, see Daemon.process_request
+        head, fds, _, _ = socket.recv_fds(self.request, HEAD.size, 3)
+        if len(fds) != 3:
+            raise ConnectionError(f"Expected 3 file descriptors, got {len(fds)}")
+        head += recv_exact(self.request, HEAD.size - len(head))
+        (size,) = HEAD.unpack(head)
+        prog, argv, cwd, env = decode_request(recv_exact(self.request, size))
+        _attach(fds)
+        os.chdir(cwd)
+        os.environ.clear()
+        os.environ.update(env)
+        time.tzset()
+        sys.argv = [prog, *argv]
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = _run(self.server.commands[prog], prog, argv) if prog in PROGS else 2
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.request.sendall(CODE.pack(code))
+
+
+class Daemon(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    block_on_close = False  # do not wait for running commands on shutdown
+    timeout = POLL_INTERVAL
+
+    def __init__(self, path: str, commands: dict[str, Any]) -> None:
+        umask = os.umask(0o177)  # socket accessible by this user only
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
+        self.commands = commands
+        self.last_request = time.monotonic()
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.last_request = time.monotonic()
+        sys.stdout.flush()  # nothing buffered may be written twice by the fork
+        sys.stderr.flush()
+        super().process_request(request, client_address)
+
+
+def _remove_stale(path: str) -> None:
+    """Remove a socket file nobody listens on, fail if a daemon is running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except FileNotFoundError:
+        return
+    except ConnectionRefusedError:
+        _log.info(f"Removing stale socket {path}")
+        os.unlink(path)
+        return
+    finally:
+        sock.close()
+    raise ValueError(f"A daemon is already listening on {path}")
+
+
+def serve(path: str, idle: float | None = None) -> None:
+    """Serve requests of `twlib.client` until SIGTERM/SIGINT or `idle` seconds
+    without requests."""
+    if not hasattr(os, "fork") or not hasattr(socket, "recv_fds"):
+        raise ValueError("The daemon requires fork and Unix-domain sockets")
+    _remove_stale(path)
+    commands = warm_up()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with Daemon(path, commands) as daemon:
+        _log.info(f"Listening on {path}")
+        try:
+            while idle is None or time.monotonic() - daemon.last_request < idle:
+                daemon.handle_request()
+                daemon.collect_children()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+    _log.info("Daemon stopped")
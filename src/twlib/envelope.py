@@ -0,0 +1,171 @@
+import io
+import logging
+import pickle
+import struct
+from typing import IO, Any, Callable
+
+""" Versioned envelope: pickle protocol 5 with out-of-band buffers and compression
+
+Layout: MAGIC, version (u8), codec (u8), buffer count n (u32), n + 1 sizes (u64)
+of the pickle stream and the buffers, then the compressed concatenation of all.
+"""
+
+_log = logging.getLogger(__name__)
+
+MAGIC = b"\x00TWL"  # \x00 is no pickle opcode, plain pickles start with \x80
+VERSION = 1
+COMPRESSIONS = ("none", "zlib", "lzma")
+OOB_THRESHOLD = 1 << 12  # smaller buffers stay in the pickle stream
+CHUNK_SIZE = 1 << 20
+_HEAD = struct.Struct("<BBI")
+
+
+class _Identity:
+    def compress(self, data: Any) -> Any:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _compressor(compression: str) -> Any:
+    if compression == "zlib":
+        import zlib
+
+        return zlib.compressobj()
+    if compression == "lzma":
+        import lzma
+
+        return lzma.LZMACompressor()
+    return _Identity()
+
+
+def _decompressor(compression: str) -> Any:
+    if compression == "zlib":
+        import zlib
+
+        return zlib.decompressobj()
+    if compression == "lzma":
+        import lzma
+
+        return lzma.LZMADecompressor()
+    return _Identity()
+
+
+class _Pickler(pickle.Pickler):
+    """Collects large bytes, bytearrays, memoryviews and PickleBuffers (NumPy) as
+    out-of-band buffers without copying them into the pickle stream.
+
+    Persistent ids bypass the pickle memo, so they are memoized by object id here:
+    an object referenced twice is stored once and comes back as one object.
+    """
+
+    def __init__(self, file: IO[bytes]) -> None:
+        super().__init__(file, protocol=5)
+        self.buffers: list[memoryview] = []
+        self._memo: dict[int, tuple[Any, Any]] = {}  # id -> (obj kept alive, pid)
+
+    def persistent_id(self, obj: Any) -> Any:
+        kind = type(obj)
+        if kind not in (bytes, bytearray, memoryview, pickle.PickleBuffer):
+            return None
+        if (seen := self._memo.get(id(obj))) is not None:
+            return seen[1]
+        try:
+            view = memoryview(obj)
+            raw = view.cast("B") if view.c_contiguous else None
+        except (BufferError, TypeError):
+            return None
+        if raw is None or raw.nbytes < OOB_THRESHOLD:
+            return None
+        self.buffers.append(raw)
+        index = len(self.buffers) - 1
+        if kind is memoryview:
+            pid: Any = ("m", index, view.format, view.shape)
+        else:
+            pid = ("b" if kind is bytes else "p", index)  # bytearray is a buffer too
+        self._memo[id(obj)] = (obj, pid)
+        return pid
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: IO[bytes], buffers: list[bytearray]) -> None:
+        super().__init__(file)
+        self.buffers = buffers
+        self._memo: dict[Any, Any] = {}
+
+    def persistent_load(self, pid: Any) -> Any:
+        if (obj := self._memo.get(pid)) is None:
+            obj = self._memo[pid] = self._load(*pid)
+        return obj
+
+    def _load(self, kind: str, index: int, *rest: Any) -> Any:
+        buffer = self.buffers[index]
+        if kind == "b":
+            return bytes(buffer)
+        if kind == "m":
+            fmt, shape = rest
+            return memoryview(buffer).cast(fmt, shape)
+        return buffer  # reconstructors of PickleBuffer objects accept any buffer
+
+
+def write_envelope(
+    obj: Any, write: Callable[[Any], Any], compression: str = "zlib"
+) -> None:
+    """Pickle obj as envelope, passing the encoded parts to `write`."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Invalid compression {compression}, use {COMPRESSIONS}")
+    stream = io.BytesIO()
+    pickler = _Pickler(stream)
+    pickler.dump(obj)
+    parts = [stream.getbuffer(), *pickler.buffers]
+    write(MAGIC + _HEAD.pack(VERSION, COMPRESSIONS.index(compression), len(parts) - 1))
+    write(struct.pack(f"<{len(parts)}Q", *(p.nbytes for p in parts)))
+    compressor = _compressor(compression)
+    for part in parts:
+        for start in range(0, part.nbytes, CHUNK_SIZE):
+            if data := compressor.compress(part[start : start + CHUNK_SIZE]):
+                write(data)
+    if data := compressor.flush():
+        write(data)
+    _log.debug(f"Envelope {compression}: {len(parts) - 1} out-of-band buffers")
+
+
+def read_envelope(fp: IO[bytes]) -> Any:
+    """Unpickle an envelope from a binary stream positioned after MAGIC."""
+    head = fp.read(_HEAD.size)
+    if len(head) < _HEAD.size:
+        raise ValueError("Truncated envelope header")
+    version, codec, n = _HEAD.unpack(head)
+    if version != VERSION or codec >= len(COMPRESSIONS):
+        raise ValueError(f"Unsupported envelope version {version}, codec {codec}")
+    sizes = struct.unpack(f"<{n + 1}Q", fp.read(8 * (n + 1)))
+
+    targets = [bytearray(size) for size in sizes]
+    views = [memoryview(t) for t in targets]
+    part, pos = 0, 0
+
+    def fill(data: bytes) -> None:
+        nonlocal part, pos
+        view = memoryview(data)
+        while view:
+            if part == len(views):
+                raise ValueError("Envelope has trailing data")
+            take = min(len(view), len(views[part]) - pos)
+            views[part][pos : pos + take] = view[:take]
+            view, pos = view[take:], pos + take
+            if pos == len(views[part]):
+                part, pos = part + 1, 0
+
+    decompressor = _decompressor(COMPRESSIONS[codec])
+    while chunk := fp.read(CHUNK_SIZE):
+        fill(decompressor.decompress(chunk))
+    fill(getattr(decompressor, "flush", bytes)())
+    while part < len(views) and not views[part]:  # trailing empty parts
+        part += 1
+    if part != len(views):
+        raise ValueError("Truncated envelope")
+    return _Unpickler(io.BytesIO(targets[0]), targets[1:]).load()
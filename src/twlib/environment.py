@@ -1,12 +1,14 @@
 ################################################################################
 # Environment
 ################################################################################
+import functools
 import platform
-import sys
 from enum import IntEnum
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol, cast
 
-from pydantic import BaseSettings
+if TYPE_CHECKING:
+    from pydantic import BaseSettings
 
 ROOT_DIR = Path(__file__).parent.parent.parent.absolute()
 
@@ -17,27 +19,79 @@ class Os(IntEnum):
     LINUX = 3
 
 
-plt = platform.system()
-if plt == "Windows":
-    OS = Os.WIN
-elif plt == "Linux":
-    OS = Os.LINUX
-elif plt == "Darwin":
-    OS = Os.MAC
-else:
-    print("Unidentified system")
-    sys.exit(1)
+@functools.cache
+def detect_os() -> Os:
+    plt = platform.system()
+    if plt == "Windows":
+        return Os.WIN
+    elif plt == "Linux":
+        return Os.LINUX
+    elif plt == "Darwin":
+        return Os.MAC
+    raise RuntimeError(f"Unidentified system {plt}")
 
 
-class Environment(BaseSettings):
-    os: Os = OS
-    log_level: str = "INFO"
-    twbm_db_url: str = "sqlite:///db/bm.db"
+class Settings(Protocol):
+    """Static type of the settings model built by `_settings_class`."""
+
+    os: Os
+    log_level: str
+    twbm_db_url: str
 
     @property
-    def dbfile(self):
-        return f"{self.twbm_db_url.split('sqlite:///')[-1]}"
+    def dbfile(self) -> str:
+        ...
+
+
+@functools.cache
+def _settings_class() -> type["BaseSettings"]:
+    """The settings model, pydantic is imported on first use only."""
+    from pydantic import BaseSettings, Field
+
+    class Environment(BaseSettings):
+        os: Os = Field(default_factory=detect_os)
+        log_level: str = "INFO"
+        twbm_db_url: str = "sqlite:///db/bm.db"
+
+        @property
+        def dbfile(self) -> str:
+            return f"{self.twbm_db_url.split('sqlite:///')[-1]}"
+
+    return Environment
+
+
+def warm_up() -> None:
+    """Import pydantic and build the settings model ahead of time (daemon
+    warm-up). The environment itself is not read."""
+    _settings_class()
+
+
+@functools.cache
+def get_config() -> Settings:
+    """Settings read from the environment on first access, then memoized."""
+    return cast(Settings, _settings_class()())
+
+
+def reload_config() -> Settings:
+    """Drop the memoized settings and read the environment again, including TZ."""
+    import time
+
+    from twlib.timeconv import sync_local_zone
+
+    get_config.cache_clear()
+    detect_os.cache_clear()
+    if hasattr(time, "tzset"):  # not on Windows
+        time.tzset()
+    sync_local_zone()
+    return get_config()
 
 
-config = Environment()
-_ = None
+def __getattr__(name: str) -> Any:
+    # lazy module attributes of the former import time construction
+    if name == "config":
+        return get_config()
+    if name == "Environment":
+        return _settings_class()
+    if name == "OS":
+        return detect_os()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,210 @@
+import fnmatch
+import logging
+import os
+import re
+from pathlib import Path, PurePath
+from typing import Any, Iterable, Iterator, TypeVar
+
+""" Compiled exclude patterns: exact names, globs and gitignore style paths """
+
+_log = logging.getLogger(__name__)
+
+P = TypeVar("P", str, Path)
+_GLOB_CHARS = frozenset("*?[")
+_CACHE_SIZE = 1 << 16
+
+
+def _is_glob(pattern: str) -> bool:
+    return not _GLOB_CHARS.isdisjoint(pattern)
+
+
+def _split(path: str | Path) -> tuple[str, ...]:
+    if isinstance(path, PurePath):  # already split, without "" and "."
+        return path.parts[1:] if path.anchor else path.parts
+    return tuple(p for p in os.fspath(path).split(os.sep) if p not in ("", "."))
+
+
+def _translate(pattern: str) -> str:
+    """Regex for a gitignore path pattern: `*`, `?` and `[]` stay within a path
+    component, `**` matches across components."""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and (end := pattern.find("]", i + 2)) != -1:
+            body = pattern[i + 1 : end]
+            out.append("[^" + body[1:] + "]" if body[0] in "!^" else f"[{body}]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class _Rule:
+    """One pattern of the spec, for ordered matching when negations are used."""
+
+    def __init__(self, pattern: str) -> None:
+        self.negated = pattern.startswith("!")
+        pattern = pattern[1:] if self.negated else pattern
+        self.dir_only = pattern.endswith("/")
+        self.anchored = "/" in pattern.rstrip("/")
+        self.name = pattern.strip("/")
+        self.regex = re.compile(_translate(self.name) if self.anchored else "")
+
+    def match(self, parts: tuple[str, ...], is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.anchored:
+            return self.regex.fullmatch("/".join(parts)) is not None
+        return fnmatch.fnmatchcase(parts[-1], self.name)
+
+
+class ExcludeMatcher:
+    """Exclude spec compiled once, matching paths relative to a scan root.
+
+    Patterns follow gitignore: a name or glob without "/" (`.git`, `*.pyc`)
+    matches at any depth, a pattern with a leading or inner "/" (`/build`,
+    `docs/_build`, `src/**/gen`) is anchored to the root, a trailing "/" matches
+    directories only and "!" re-includes. A path is excluded when it or one of
+    its parent directories matches. Exact names are a set lookup, globs share one
+    regex with a per-name cache and literal anchored paths are looked up in a
+    trie of components.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = tuple(p for p in patterns if p and not p.startswith("#"))
+        self._rules = [_Rule(p) for p in self.patterns]
+        self._ordered = any(r.negated for r in self._rules)
+        self._names: set[str] = set()
+        self._dir_names: set[str] = set()
+        self._trie: dict[str | None, Any] = {}  # name -> subtrie, None -> dir_only
+        self._anchored: list[_Rule] = []
+        globs: list[str] = []
+        dir_globs: list[str] = []
+        for rule in self._rules:
+            if rule.anchored and not _is_glob(rule.name):
+                node = self._trie
+                for part in rule.name.split("/"):
+                    node = node.setdefault(part, {})
+                node[None] = node.get(None, True) and rule.dir_only
+            elif rule.anchored:
+                self._anchored.append(rule)
+            elif _is_glob(rule.name):
+                (dir_globs if rule.dir_only else globs).append(rule.name)
+            else:
+                (self._dir_names if rule.dir_only else self._names).add(rule.name)
+        self._glob = self._combine(globs)
+        self._dir_glob = self._combine(dir_globs)
+        # only exact names (the common `.git`, `.venv` spec): a set intersection
+        self._names_only = not (
+            self._ordered or self._dir_names or self._trie or self._anchored
+        ) and not (globs or dir_globs)
+        self._cache: dict[tuple[str, bool], bool] = {}
+
+    @staticmethod
+    def _combine(globs: list[str]) -> re.Pattern | None:
+        if not globs:
+            return None
+        return re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in globs))
+
+    def __repr__(self) -> str:
+        return f"ExcludeMatcher({list(self.patterns)!r})"
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match_name(self, name: str, is_dir: bool = True) -> bool:
+        """Whether a path component is excluded by the unanchored patterns."""
+        key = (name, is_dir)
+        if (hit := self._cache.get(key)) is not None:
+            return hit
+        hit = name in self._names or (
+            self._glob is not None and bool(self._glob.match(name))
+        )
+        if is_dir and not hit:
+            hit = name in self._dir_names or (
+                self._dir_glob is not None and bool(self._dir_glob.match(name))
+            )
+        if len(self._cache) >= _CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = hit
+        return hit
+
+    def match_entry(self, parts: tuple[str, ...], is_dir: bool) -> bool:
+        """Whether the entry itself matches, its parents are known not to."""
+        if not parts:
+            return False
+        if self._ordered:
+            excluded = False
+            for rule in self._rules:
+                if rule.negated == excluded and rule.match(parts, is_dir):
+                    excluded = not rule.negated
+            return excluded
+        if self.match_name(parts[-1], is_dir):
+            return True
+        node = self._trie
+        for part in parts:
+            if (child := node.get(part)) is None:
+                break
+            node = child
+        else:
+            if None in node and (is_dir or not node[None]):
+                return True
+        return any(rule.match(parts, is_dir) for rule in self._anchored)
+
+    def match(self, path: str | Path, is_dir: bool = False) -> bool:
+        """Whether path (relative to the root) or one of its parents is excluded."""
+        parts = _split(path)
+        if self._names_only:
+            return not self._names.isdisjoint(parts)
+        return any(
+            self.match_entry(parts[: i + 1], is_dir or i < len(parts) - 1)
+            for i in range(len(parts))
+        )
+
+    __call__ = match
+
+    def filter(self, paths: Iterable[P]) -> Iterator[P]:
+        """Lazily yield the paths which are not excluded.
+
+        Parent directory results are memoized, so paths from the same directory
+        cost one entry match each.
+        """
+        if self._names_only:
+            for path in paths:
+                if self._names.isdisjoint(_split(path)):
+                    yield path
+                else:
+                    _log.debug(f"Excluding {path}")
+            return
+        parents: dict[str, bool] = {}
+        for path in paths:
+            parent = os.path.dirname(os.fspath(path))
+            excluded = parents.get(parent)
+            if excluded is None:
+                excluded = self.match(parent, is_dir=True)
+                if len(parents) >= _CACHE_SIZE:
+                    parents.clear()
+                parents[parent] = excluded
+            if not excluded and not self.match_entry(_split(path), is_dir=False):
+                yield path
+            else:
+                _log.debug(f"Excluding {path}")
+
+
+def compile_excludes(excludes: Iterable[str] | ExcludeMatcher) -> ExcludeMatcher:
+    """Matcher for an exclude spec, compiled matchers are passed through."""
+    if isinstance(excludes, ExcludeMatcher):
+        return excludes
+    return ExcludeMatcher(excludes)
@@ -0,0 +1,213 @@
+import errno
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from twlib.metrics import span
+
+""" Copy engine: reflink / copy_file_range / sendfile with a worker pool """
+
+_log = logging.getLogger(__name__)
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.EPERM,
+}
+_LINUX = sys.platform.startswith("linux")
+
+# (src st_dev, dst st_dev, method) combinations which failed once and are skipped
+_unsupported: set[tuple[int, int, str]] = set()
+
+
+def _reflink(src_fd: int, dst_fd: int, size: int) -> None:
+    import fcntl
+
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int) -> None:
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, min(size - copied, 1 << 30))
+        if n == 0:
+            break
+        copied += n
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int) -> None:
+    copied = 0
+    while copied < size:
+        n = os.sendfile(dst_fd, src_fd, copied, min(size - copied, 1 << 30))
+        if n == 0:
+            break
+        copied += n
+
+
+_METHODS = (
+    ("reflink", _reflink),
+    ("copy_file_range", _copy_file_range),
+    ("sendfile", _sendfile),
+)
+
+
+def copy_file(src: str | Path, dst: str | Path) -> str:
+    """Copy file data and metadata like `shutil.copy2`, return the method used.
+
+    On Linux the cheapest kernel path is tried first: reflink (FICLONE, shares
+    extents on btrfs/xfs), then copy_file_range (server side copy on NFS 4.2/SMB),
+    then sendfile. A method failing with "not supported" is remembered per
+    device pair and falls through to the next one, ending with a read/write loop.
+    """
+    if not _LINUX:
+        shutil.copy2(src, dst)
+        return "copy2"
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        st_src, st_dst = os.fstat(src_fd), os.fstat(dst_fd)
+        for name, method in _METHODS:
+            key = (st_src.st_dev, st_dst.st_dev, name)
+            if key in _unsupported:
+                continue
+            try:
+                method(src_fd, dst_fd, st_src.st_size)
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                _log.debug(f"{name} not supported for {src} -> {dst}: {e.strerror}")
+                _unsupported.add(key)
+                os.ftruncate(dst_fd, 0)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                continue
+            break
+        else:
+            name = "copyfileobj"
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(src, dst)
+    return name
+
+
+@dataclass
+class FileTiming:
+    path: str
+    bytes: int
+    seconds: float
+    method: str
+
+
+@dataclass
+class CopyStats:
+    files: int = 0
+    bytes: int = 0
+    seconds: float = 0.0  # wall time of the engine
+    timings: list[FileTiming] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, timing: FileTiming) -> None:
+        with self.lock:
+            self.files += 1
+            self.bytes += timing.bytes
+            self.timings.append(timing)
+
+    @property
+    def methods(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for t in self.timings:
+            counts[t.method] = counts.get(t.method, 0) + 1
+        return counts
+
+    def __str__(self) -> str:
+        seconds = self.seconds or 1e-9
+        slowest = max((t.seconds for t in self.timings), default=0.0)
+        return (
+            f"Copied {self.files} files, {self.bytes / 1e6:.1f} MB in "
+            f"{self.seconds:.2f}s: {self.bytes / seconds / 1e6:.1f} MB/s, "
+            f"slowest file {slowest * 1000:.1f} ms, methods {self.methods}"
+        )
+
+
+class CopyEngine:
+    """Copy files and trees on a thread pool, recording per-file timings.
+
+    With `workers <= 1` every copy runs inline. Directory copies are split into
+    file tasks: the directory skeleton and symlinks are created immediately, file
+    data is copied by the pool and directory metadata is applied in `wait`.
+    """
+
+    def __init__(self, workers: int = 1) -> None:
+        self.workers = workers
+        self.stats = CopyStats()
+        self._executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        self._futures: list[Future] = []
+        self._dirs: list[tuple[str, str]] = []
+        self._start = time.perf_counter()
+
+    def __enter__(self) -> "CopyEngine":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        try:
+            self.wait()
+        finally:
+            self.close()
+
+    def _copy(self, src: str, dst: str) -> None:
+        start = time.perf_counter()
+        with span("copy"):
+            method = copy_file(src, dst)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(dst)
+        _log.debug(f"{method}: {src} -> {dst} {size} bytes in {seconds * 1000:.1f} ms")
+        self.stats.add(FileTiming(dst, size, seconds, method))
+
+    def copy_file(self, src: str | Path, dst: str | Path) -> None:
+        if self._executor is None:
+            self._copy(os.fspath(src), os.fspath(dst))
+        else:
+            self._futures.append(
+                self._executor.submit(self._copy, os.fspath(src), os.fspath(dst))
+            )
+
+    def copytree(self, src: str | Path, dst: str | Path) -> None:
+        """Like `shutil.copytree(src, dst, symlinks=True)`."""
+        src, dst = os.fspath(src), os.fspath(dst)
+        for root, dirs, files in os.walk(src):
+            rel = os.path.relpath(root, src)
+            out_root = os.path.normpath(os.path.join(dst, rel))
+            os.makedirs(out_root, exist_ok=True)
+            self._dirs.append((root, out_root))
+            for name in list(dirs) + files:
+                s, d = os.path.join(root, name), os.path.join(out_root, name)
+                if os.path.islink(s):
+                    os.symlink(os.readlink(s), d)
+                    shutil.copystat(s, d, follow_symlinks=False)
+                    if name in dirs:
+                        dirs.remove(name)
+                elif name in files:
+                    self.copy_file(s, d)
+
+    def wait(self) -> CopyStats:
+        """Block until all copies are done, re-raising the first copy error."""
+        futures, self._futures = self._futures, []
+        for f in futures:
+            f.result()
+        for src, dst in reversed(self._dirs):
+            shutil.copystat(src, dst)
+        self._dirs.clear()
+        self.stats.seconds = time.perf_counter() - self._start
+        return self.stats
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -1,46 +1,355 @@
+import json
+import logging
+import os
 import re
-import subprocess
+import threading
 import webbrowser
-from typing import Optional
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
 
 import typer
 
+from twlib.exclude import ExcludeMatcher
+
+_log = logging.getLogger(__name__)
+
 app = typer.Typer(name="git-open")
 
+_HTTPS_URL = re.compile(r".*://(.*@)?(?P<host>.*?)(:\d+)?/(?P<path>.*)")
+_SCP_URL = re.compile(
+    r"([^@/]*@)?(?P<host>[^:/]+):(?!\d+/)(?P<path>.+)"
+)  # git@host:a/b
+_SSH_URL = re.compile(r"(.*@)?(?P<host>.*?)(:\d+)?/(?P<path>.*)")
+_SECTION = re.compile(r'\s*\[\s*([^\s\]"]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]\s*(.*)')
+_ENTRY = re.compile(r"\s*([A-Za-z][-A-Za-z0-9]*)\s*(?:=\s*(.*))?")
 
-def extract_url(url: str) -> str:
-    https_pattern = re.compile(r".*://(.*@)?(.*?)(:\d+)?/(.*)")
-    ssh_pattern = re.compile(r"(.*@)?(.*?)(:\d+)?/(.*)")
-    match = https_pattern.match(url)
-    if match is None:
-        match = ssh_pattern.match(url)
+GitConfig = dict[tuple[str, str], dict[str, list[str]]]
+
+
+def _browse_url(url: str) -> str | None:
+    match = _HTTPS_URL.match(url) or _SCP_URL.match(url) or _SSH_URL.match(url)
     if match is None:
+        return None
+    return f"https://{match.group('host')}/{match.group('path')}"
+
+
+def extract_url(url: str) -> str:
+    git_url = _browse_url(url)
+    if git_url is None:
         typer.secho(
             f"Could not extract http url from {url}", err=True, fg=typer.colors.RED
         )
         raise typer.Abort()
-    user = match.group(1)
-    host = match.group(2)
-    port = match.group(3)
-    path = match.group(4)
-    return f"https://{host}/{path}"
+    return git_url
+
+
+def _value(raw: str) -> str:
+    """Unquote a config value and strip its trailing comment."""
+    out, quoted, i = [], False, 0
+    while i < len(raw):
+        c = raw[i]
+        if c == "\\" and i + 1 < len(raw):
+            i += 1
+            out.append({"n": "\n", "t": "\t", "b": "\b"}.get(raw[i], raw[i]))
+        elif c == '"':
+            quoted = not quoted
+        elif c in "#;" and not quoted:
+            break
+        else:
+            out.append(c)
+        i += 1
+    return "".join(out).strip()
+
+
+def parse_git_config(text: str) -> GitConfig:
+    """Parse git config syntax into {(section, subsection): {key: [values]}}.
+
+    Section and key names are lower cased, subsections are case sensitive.
+    """
+    config: GitConfig = {}
+    entries: dict[str, list[str]] = {}
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip()[0] in "#;":
+            continue
+        if match := _SECTION.match(line):
+            name, sub, line = match.group(1).lower(), match.group(2) or "", match[3]
+            if "." in name and not sub:  # legacy [section.subsection]
+                name, sub = name.split(".", 1)
+            entries = config.setdefault((name, sub.replace('\\"', '"')), {})
+            if not line.strip():
+                continue
+        if match := _ENTRY.match(line):
+            value = "true" if match.group(2) is None else _value(match.group(2))
+            entries.setdefault(match.group(1).lower(), []).append(value)
+    return config
+
+
+def find_git_dir(path: str = ".") -> tuple[str, str] | None:
+    """Return (git dir, common dir) of the repository containing path.
+
+    Walks up to the first `.git` directory or `.git` file (`gitdir: ...` of
+    worktrees and submodules). The common dir holds the shared config and differs
+    from the git dir for linked worktrees.
+    """
+    current = os.path.abspath(path)
+    if not os.path.isdir(current):
+        current = os.path.dirname(current)
+    while True:
+        dot_git = os.path.join(current, ".git")
+        git_dir = None
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+        elif os.path.isfile(dot_git):
+            with open(dot_git) as fp:
+                content = fp.read().strip()
+            if content.startswith("gitdir:"):
+                git_dir = os.path.join(current, content[len("gitdir:") :].strip())
+        if git_dir is not None:
+            git_dir = os.path.normpath(git_dir)
+            common_dir = git_dir
+            commondir_file = os.path.join(git_dir, "commondir")
+            if os.path.isfile(commondir_file):
+                with open(commondir_file) as fp:
+                    common_dir = os.path.join(git_dir, fp.read().strip())
+            return git_dir, os.path.normpath(common_dir)
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def read_git_config(git_dir: str, common_dir: str) -> GitConfig:
+    config: GitConfig = {}
+    for file in (
+        os.path.join(common_dir, "config"),
+        os.path.join(git_dir, "config.worktree"),
+    ):
+        try:
+            with open(file) as fp:
+                text = fp.read()
+        except OSError:
+            continue
+        for section, entries in parse_git_config(text).items():
+            for key, values in entries.items():
+                config.setdefault(section, {}).setdefault(key, []).extend(values)
+    return config
+
+
+def current_branch(git_dir: str) -> str | None:
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as fp:
+            head = fp.read().strip()
+    except OSError:
+        return None
+    prefix = "ref: refs/heads/"
+    return head[len(prefix) :] if head.startswith(prefix) else None  # else detached
+
+
+def rewrite_url(url: str, config: GitConfig) -> str:
+    """Apply `url.<base>.insteadOf` rewrites, the longest matching prefix wins."""
+    best, base = "", None
+    for (section, sub), entries in config.items():
+        if section != "url":
+            continue
+        for prefix in entries.get("insteadof", []):
+            if url.startswith(prefix) and len(prefix) > len(best):
+                best, base = prefix, sub
+    return url if base is None else base + url[len(best) :]
+
 
+def select_remote(
+    config: GitConfig, remote: str | None = None, branch: str | None = None
+) -> str | None:
+    """The given remote, else the branch's upstream remote, origin or the first."""
+    remotes = [sub for section, sub in config if section == "remote"]
+    if remote is not None:
+        return remote if remote in remotes else None
+    if branch is not None:
+        upstream = config.get(("branch", branch), {}).get("remote", [None])[-1]
+        if upstream in remotes:
+            return upstream
+    if "origin" in remotes:
+        return "origin"
+    return remotes[0] if remotes else None
 
-def get_git_url(path: Optional[str] = ".") -> str:
-    cmd = f"pushd {path} > /dev/null 2>&1; git remote -v | awk '/fetch/{{print $2}}'; popd > /dev/null 2>&1"
-    result = subprocess.run(cmd, capture_output=True, shell=True)
-    url = result.stdout.decode().strip("\n")
-    return url
+
+def _remote_url(
+    dirs: tuple[str, str], remote: str | None = None, branch: str | None = None
+) -> tuple[str | None, str]:
+    config = read_git_config(*dirs)
+    name = select_remote(config, remote, branch or current_branch(dirs[0]))
+    urls = config.get(("remote", name or ""), {}).get("url")
+    if not urls:
+        _log.warning(f"No remote url for {remote or name or 'any remote'} in {dirs[1]}")
+        return name, ""
+    return name, rewrite_url(urls[-1], config)
+
+
+def get_git_url(
+    path: Optional[str] = ".",
+    remote: Optional[str] = None,
+    branch: Optional[str] = None,
+) -> str:
+    """Fetch URL of a remote of the repository containing path, "" if none.
+
+    Reads the git config directly: no git process is started. Without `remote`
+    the upstream remote of `branch` (default: the checked out branch) is used.
+    """
+    dirs = find_git_dir(path or ".")
+    if dirs is None:
+        _log.warning(f"No git repository at {path}")
+        return ""
+    return _remote_url(dirs, remote, branch)[1]
+
+
+@dataclass
+class RepoUrl:
+    path: str
+    remote: str | None
+    url: str
+    browse_url: str | None  # None if the url cannot be mapped to https
+
+
+def find_repos(
+    root: str | Path,
+    excludes: Iterable[str] = (".venv", "node_modules"),
+    nested: bool = False,
+) -> Iterator[str]:
+    """Yield work trees below root, in name order, without descending into them
+    unless `nested` (submodules, vendored checkouts)."""
+    matcher = ExcludeMatcher([".git", *excludes])
+    stack = [os.fspath(root)]
+    while stack:
+        path = stack.pop()
+        if os.path.lexists(os.path.join(path, ".git")):
+            yield path
+            if not nested:
+                continue
+        try:
+            with os.scandir(path) as it:
+                subdirs = sorted(
+                    e.path
+                    for e in it
+                    if e.is_dir(follow_symlinks=False)
+                    and not matcher.match_name(e.name)
+                )
+        except OSError as e:
+            _log.warning(f"Cannot scan {e.filename}: {e.strerror}")
+            continue
+        stack.extend(reversed(subdirs))
+
+
+def _stamp(git_dir: str, common_dir: str) -> list[int]:
+    """mtimes of the files a remote url depends on, 0 for missing ones."""
+    stamp = []
+    for file in (
+        os.path.join(common_dir, "config"),
+        os.path.join(git_dir, "config.worktree"),
+        os.path.join(git_dir, "HEAD"),
+    ):
+        try:
+            stamp.append(os.stat(file).st_mtime_ns)
+        except OSError:
+            stamp.append(0)
+    return stamp
+
+
+class UrlCache:
+    """Resolved urls per work tree, valid while config and HEAD mtimes match.
+
+    Holds at most `max_entries` work trees, the least recently used are dropped.
+    """
+
+    def __init__(self, file: str | Path | None = None, max_entries: int = 4096) -> None:
+        self.file = file
+        self.max_entries = max_entries
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.hits = 0
+        self._lock = threading.Lock()  # shared by the scan_repos threads
+        if file is not None and os.path.exists(file):
+            try:
+                with open(file) as fp:
+                    self.entries = json.load(fp)
+            except (OSError, ValueError) as e:
+                _log.warning(f"Ignoring unreadable cache {file}: {e}")
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]  # least recently used first
+
+    def get(self, key: str, stamp: list[int]) -> RepoUrl | None:
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry["stamp"] != stamp:  # stale: `put` replaces it
+                return None
+            self.entries[key] = entry  # move to the most recently used end
+            self.hits += 1
+        return RepoUrl(**entry["repo"])
+
+    def put(self, key: str, stamp: list[int], repo: RepoUrl) -> None:
+        with self._lock:
+            self.entries.pop(key, None)
+            self.entries[key] = {"stamp": stamp, "repo": asdict(repo)}
+            self._evict()
+
+    def save(self) -> None:
+        if self.file is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.file)), exist_ok=True)
+        tmp = f"{self.file}.tmp"
+        with open(tmp, "w") as fp:
+            json.dump(self.entries, fp)
+        os.replace(tmp, self.file)
+
+
+def resolve_repo(
+    path: str, remote: str | None = None, cache: UrlCache | None = None
+) -> RepoUrl:
+    dirs = find_git_dir(path)
+    if dirs is None:
+        return RepoUrl(path, None, "", None)
+    stamp = _stamp(*dirs)
+    key = f"{path}\0{remote or ''}"
+    if cache is not None and (hit := cache.get(key, stamp)) is not None:
+        return hit
+    name, url = _remote_url(dirs, remote)
+    repo = RepoUrl(path, name, url, _browse_url(url) if url else None)
+    if cache is not None:
+        cache.put(key, stamp, repo)
+    return repo
+
+
+def scan_repos(
+    root: str | Path,
+    remote: str | None = None,
+    workers: int = 8,
+    cache: UrlCache | None = None,
+    nested: bool = False,
+) -> Iterator[RepoUrl]:
+    """Resolve the urls of all repositories below root on a thread pool, in order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max(1, workers)) as executor:
+        yield from executor.map(
+            lambda path: resolve_repo(path, remote, cache),
+            find_repos(root, nested=nested),
+        )
 
 
 @app.command()
 def git_open(
     path: str = typer.Argument(".", help="path in directory of the desired repo."),
+    remote: str = typer.Option(None, "-r", "--remote", help="Remote to open"),
+    branch: str = typer.Option(
+        None, "-b", "--branch", help="Open the upstream remote of this branch"
+    ),
 ):
     """Open remote github/gitlab repository
     Add this command to your path, then you can use with via `git open .`.
     """
-    url = get_git_url(path)
+    url = get_git_url(path, remote=remote, branch=branch)
     git_url = extract_url(url)
     typer.secho(f"{git_url}", err=False, fg=None)
     webbrowser.open(git_url, new=2)
@@ -0,0 +1,239 @@
+import functools
+import glob
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from twlib.metrics import span
+
+""" Image conversion (HEIC -> JPG/PNG), single file and batch """
+
+_log = logging.getLogger(__name__)
+
+FORMATS = {"jpg": ("JPEG", ".jpg"), "png": ("PNG", ".png")}
+HEIC_SUFFIXES = {".heic", ".heif"}
+THUMBNAIL_SIZE = 320
+
+
+@dataclass(frozen=True)
+class ConvertOptions:
+    """Output settings of a conversion.
+
+    max_size: bounding box (longest side) of the output, None keeps full resolution
+    thumbnail: decode from the smallest embedded preview (HEIF thumbnail, JPEG DCT
+        scaling), output is at most max_size or THUMBNAIL_SIZE
+    """
+
+    mode: str = "jpg"
+    max_size: int | None = None
+    thumbnail: bool = False
+
+    @property
+    def box(self) -> int | None:
+        if self.thumbnail:
+            return self.max_size or THUMBNAIL_SIZE
+        return self.max_size
+
+
+@functools.cache
+def _image_module() -> Any:
+    """Import PIL and register the HEIF plugin on first use only."""
+    from PIL import Image
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()  # register PILLOW plugin
+    return Image
+
+
+def _out_path(input_file: str | Path, mode: str, out_file: str | Path | None) -> Path:
+    if mode not in FORMATS:
+        raise ValueError(f"Unknown type {mode}")
+    if out_file is None:
+        return Path(input_file).with_suffix(FORMATS[mode][1])
+    return Path(out_file)
+
+
+def _reduce(img: Any, options: ConvertOptions) -> Any:
+    """Shrink to the options box using the cheapest decode path of the format.
+
+    `draft` must run before pixels are loaded: HEIF selects the smallest embedded
+    thumbnail, JPEG the smallest 1/2 .. 1/8 scale still covering the box, other
+    formats ignore it. `thumbnail` then resizes in place, so only one reduced copy
+    is alive after decoding.
+    """
+    box = options.box
+    with span("decode"):
+        if box is None:
+            img.load()
+            return img
+        scale = min(1.0, box / max(img.size))
+        img.draft(img.mode, (round(img.width * scale), round(img.height * scale)))
+        img.thumbnail((box, box))
+    return img
+
+
+def _save(img: Any, out_file: Path, mode: str) -> None:
+    out_file.unlink(missing_ok=True)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with span("encode"):
+        img.save(out_file, FORMATS[mode][0])
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    mode: str
+    size: tuple[int, int]
+    format: str | None
+    info: tuple[str, ...]  # keys of the format specific metadata
+    bands: tuple[str, ...]
+
+    @classmethod
+    def of(cls, img: Any) -> "ImageInfo":
+        return cls(img.mode, img.size, img.format, tuple(img.info), img.getbands())
+
+    def __str__(self) -> str:
+        return (
+            f"mode={self.mode}, size={self.size}, format={self.format}, "
+            f"info={list(self.info)}, bands={self.bands}"
+        )
+
+
+def _heic2img(
+    input_file: str | Path,
+    mode: str,
+    out_file: str | Path | None,
+    options: ConvertOptions | None = None,
+) -> tuple[Path, ImageInfo]:
+    """Convert one image, return the output path and the info of the input."""
+    options = options or ConvertOptions(mode=mode)
+    out_path = _out_path(input_file, mode, out_file)
+    Image = _image_module()
+    with Image.open(input_file) as img:
+        info = ImageInfo.of(img)
+        _save(_reduce(img, options), out_path, mode)
+    return out_path, info
+
+
+def convert_image(
+    input_file: str | Path,
+    mode: str,
+    out_file: str | Path | None,
+    options: ConvertOptions | None = None,
+) -> Path:
+    """Convert one image without console output, return the output path."""
+    return _heic2img(input_file, mode, out_file, options)[0]
+
+
+@dataclass
+class ConvertResult:
+    input_file: Path
+    out_file: Path
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+def iter_inputs(
+    inputs: Iterable[str], suffixes: set[str] = HEIC_SUFFIXES
+) -> Iterator[tuple[Path, Path]]:
+    """Expand files, directories, globs and '-' (stdin list) into (file, relative path).
+
+    The relative path is used to mirror directory inputs below an output directory.
+    """
+    for item in inputs:
+        if item == "-":
+            for line in sys.stdin:
+                if line := line.strip():
+                    yield Path(line), Path(Path(line).name)
+        elif Path(item).is_dir():
+            root = Path(item)
+            for f in sorted(root.rglob("*")):
+                if f.suffix.lower() in suffixes and f.is_file():
+                    yield f, f.relative_to(root)
+        elif glob.has_magic(item):
+            for name in sorted(glob.glob(item, recursive=True)):
+                f = Path(name)
+                if f.suffix.lower() in suffixes and f.is_file():
+                    yield f, Path(f.name)
+        else:
+            yield Path(item), Path(Path(item).name)
+
+
+def plan_outputs(
+    inputs: Iterable[tuple[Path, Path]], mode: str, out_dir: Path | None
+) -> Iterator[tuple[Path, Path]]:
+    """Map (file, relative path) to (file, output file).
+
+    All outputs are planned before the first one is written: two inputs mapping
+    to the same output file (`a/x.heic` and `b/x.heic` with `out_dir`, `x.heic`
+    and `x.HEIF` next to each other) raise a ValueError.
+    """
+    jobs: list[tuple[Path, Path]] = []
+    seen: dict[Path, Path] = {}
+    for input_file, rel in inputs:
+        out_file = _out_path(
+            input_file if out_dir is None else out_dir / rel, mode, None
+        )
+        if (other := seen.setdefault(out_file, input_file)) != input_file:
+            raise ValueError(f"{other} and {input_file} both map to {out_file}")
+        jobs.append((input_file, out_file))
+    return iter(jobs)
+
+
+def _convert_job(job: tuple[Path, Path, ConvertOptions]) -> ConvertResult:
+    input_file, out_file, options = job
+    result = ConvertResult(input_file=input_file, out_file=out_file)
+    start = time.perf_counter()
+    try:
+        result.bytes_in = os.path.getsize(input_file)
+        convert_image(input_file, options.mode, out_file, options)
+        result.bytes_out = os.path.getsize(out_file)
+    except Exception as e:  # collect per file, do not abort the batch
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def convert_batch(
+    jobs: Iterable[tuple[Path, Path]],
+    options: ConvertOptions = ConvertOptions(),
+    workers: int = 1,
+) -> Iterator[ConvertResult]:
+    """Convert (input, output) pairs on a process pool, results keep input order."""
+    tasks = ((input_file, out_file, options) for input_file, out_file in jobs)
+    if workers <= 1:
+        yield from map(_convert_job, tasks)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_convert_job, tasks, chunksize=4)
+
+
+@dataclass
+class BatchSummary:
+    files: int = 0
+    errors: int = 0
+    skipped: int = 0
+    bytes_in: int = 0
+    seconds: float = 0.0
+
+    def add(self, result: ConvertResult) -> None:
+        self.files += 1
+        self.bytes_in += result.bytes_in
+        if result.error is not None:
+            self.errors += 1
+
+    def __str__(self) -> str:
+        seconds = self.seconds or 1e-9
+        return (
+            f"{self.files} files ({self.errors} errors, {self.skipped} unchanged) "
+            f"in {self.seconds:.2f}s: "
+            f"{self.files / seconds:.1f} files/s, "
+            f"{self.bytes_in / seconds / 1e6:.1f} MB/s"
+        )
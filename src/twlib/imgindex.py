@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import sqlite3
+from dataclasses import asdict, astuple, dataclass, fields
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+
+from twlib.image import _image_module
+
+""" Header-only image metadata scanner, results go to a JSONL or SQLite index """
+
+_log = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {
+    ".heic",
+    ".heif",
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".tif",
+    ".tiff",
+    ".webp",
+}
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_DATETIME = 0x0132
+
+
+@dataclass
+class ImageMeta:
+    path: str
+    bytes: int = 0
+    mtime_ns: int = 0
+    format: str | None = None
+    mode: str | None = None
+    width: int | None = None
+    height: int | None = None
+    exif_datetime: str | None = None
+    has_icc: bool = False
+    thumbnails: str | None = None  # JSON list of embedded thumbnail sizes
+    error: str | None = None
+
+
+def read_metadata(path: str | Path) -> ImageMeta:
+    """Read dimensions and metadata from the image header, pixels are not decoded."""
+    meta = ImageMeta(path=os.path.abspath(path))
+    try:
+        st = os.stat(path)
+        meta.bytes, meta.mtime_ns = st.st_size, st.st_mtime_ns
+        with _image_module().open(path) as img:
+            meta.format, meta.mode = img.format, img.mode
+            meta.width, meta.height = img.size
+            exif = img.getexif()
+            meta.exif_datetime = exif.get_ifd(EXIF_IFD).get(
+                EXIF_DATETIME_ORIGINAL
+            ) or exif.get(EXIF_DATETIME)
+            meta.has_icc = bool(img.info.get("icc_profile"))
+            if "thumbnails" in img.info:
+                meta.thumbnails = json.dumps(img.info["thumbnails"])
+    except Exception as e:  # collect per file, do not abort the scan
+        meta.error = f"{type(e).__name__}: {e}"
+    return meta
+
+
+def scan(paths: Iterable[Path], workers: int = 1) -> Iterator[ImageMeta]:
+    """Read metadata of all paths, in input order."""
+    if workers <= 1:
+        yield from map(read_metadata, paths)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(read_metadata, paths, chunksize=64)
+
+
+def write_jsonl(metas: Iterable[ImageMeta], fp: IO[str]) -> int:
+    n = 0
+    for n, meta in enumerate(metas, 1):
+        fp.write(json.dumps(asdict(meta)) + "\n")
+    return n
+
+
+def write_sqlite(
+    metas: Iterable[ImageMeta], db_file: str | Path, batch_size: int = 1000
+) -> int:
+    """Upsert into table `images` keyed on path, committing every `batch_size` rows."""
+    columns = [f.name for f in fields(ImageMeta)]
+    con = sqlite3.connect(db_file)
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS images ({columns[0]} TEXT PRIMARY KEY, "
+        + ", ".join(columns[1:])
+        + ")"
+    )
+    sql = f"INSERT OR REPLACE INTO images VALUES ({', '.join('?' * len(columns))})"
+    n = 0
+    batch = []
+    for n, meta in enumerate(metas, 1):
+        batch.append(astuple(meta))
+        if len(batch) >= batch_size:
+            con.executemany(sql, batch)
+            con.commit()
+            batch.clear()
+    con.executemany(sql, batch)
+    con.commit()
+    con.close()
+    return n
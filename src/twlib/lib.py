@@ -1,38 +1,204 @@
 import base64
+import functools
+import io
 import logging
+import mmap
+import os
 import pickle
-import textwrap
 from pathlib import Path
-from typing import Any, Iterable
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from twlib.exclude import ExcludeMatcher
 
 """ Functions which cannot be used on CLI """
 
 _log = logging.getLogger(__name__)
 
 
-def serialize_to_base64(obj: Any | list, line_length=80) -> str:
-    """Serialize an object to base64 string"""
-    # Serialize the object to a bytes object using pickle
-    serialized = pickle.dumps(obj)
-    # Encode the bytes object to a base64-encoded string
-    encoded = base64.b64encode(serialized).decode("utf-8")
-    # Wrap the base64-encoded string every `line_length` characters
-    wrapped = textwrap.fill(encoded, width=line_length)
-    return wrapped
+CHUNK_SIZE = 3 << 18  # raw bytes per base64 block, a multiple of 3
+MMAP_THRESHOLD = 1 << 24  # map inputs from this size instead of reading them
+_WHITESPACE = b" \t\r\n\v\f"
+
+
+class _Base64Writer:
+    """Binary sink which writes its data as base64 lines of `line_length`.
+
+    Data is encoded in blocks of CHUNK_SIZE as it arrives, so `pickle.dump` can
+    stream into it without the pickle, its encoding or the wrapped text ever being
+    held in memory completely. The output matches `textwrap.fill` of the encoding.
+    """
+
+    def __init__(self, write: Callable[[bytes], Any], line_length: int = 80) -> None:
+        self._write = write
+        self._line_length = line_length
+        self._pending = bytearray()  # less than 3 bytes
+        self._column = 0
+
+    def write(self, data: bytes | memoryview) -> int:
+        view = memoryview(data).cast("B")
+        n = len(view)
+        if self._pending:
+            take = 3 - len(self._pending)
+            self._pending += view[:take]
+            view = view[take:]
+            if len(self._pending) < 3:
+                return n
+            self._emit(self._pending)
+            self._pending = bytearray()
+        whole = len(view) - len(view) % 3
+        for start in range(0, whole, CHUNK_SIZE):
+            self._emit(view[start : min(start + CHUNK_SIZE, whole)])
+        self._pending += view[whole:]
+        return n
+
+    def close(self) -> None:
+        if self._pending:
+            self._emit(self._pending)
+            self._pending = bytearray()
+
+    def _emit(self, raw: bytes | bytearray | memoryview) -> None:
+        text = base64.b64encode(raw)
+        width, parts, pos = self._line_length, [], 0
+        if self._column:  # continue the current line
+            pos = min(width - self._column, len(text))
+            parts.append(text[:pos])
+            self._column += pos
+        for start in range(pos, len(text), width):
+            if self._column:
+                parts.append(b"\n")
+            parts.append(text[start : start + width])
+            self._column = len(parts[-1])
+        self._write(b"".join(parts))
+
+
+class _Base64Reader(io.RawIOBase):
+    """Raw binary stream decoding base64 text chunks, whitespace is skipped."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._rest = b""  # less than 4 undecoded characters
+        self._buf = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        while not self._buf:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                if not self._rest:
+                    return 0
+                data, self._rest = self._rest, b""
+            else:
+                data = self._rest + chunk.translate(None, _WHITESPACE)
+                whole = len(data) - len(data) % 4
+                data, self._rest = data[:whole], data[whole:]
+            self._buf = memoryview(base64.b64decode(data))
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def _read_chunks(fp: IO, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    while chunk := fp.read(size):
+        yield chunk.encode("ascii") if isinstance(chunk, str) else chunk
+
+
+def _mmap_chunks(path: str | Path, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as m:
+        for start in range(0, len(m), size):
+            yield m[start : start + size]
+
+
+def _is_text(fp: IO) -> bool:
+    return isinstance(fp, io.TextIOBase) or "b" not in getattr(fp, "mode", "b")
+
+
+def serialize_to_base64(
+    obj: Any | list, line_length=80, compression: str | None = None
+) -> str:
+    """Serialize an object to base64 string, as envelope if compression is given"""
+    out = io.BytesIO()
+    serialize_to_base64_file(obj, out, line_length, compression)
+    return out.getvalue().decode("ascii")
+
+
+def serialize_to_base64_file(
+    obj: Any,
+    out: str | Path | IO,
+    line_length: int = 80,
+    compression: str | None = None,
+) -> None:
+    """Stream `serialize_to_base64(obj)` to a path or a text/binary file object.
+
+    Without compression the output is a plain pickle, with compression "none",
+    "zlib" or "lzma" a `twlib.envelope` with out-of-band buffers.
+    """
+    if isinstance(out, (str, Path)):
+        with open(out, "wb") as fp:
+            return serialize_to_base64_file(obj, fp, line_length, compression)
+    if _is_text(out):
+        writer = _Base64Writer(lambda b: out.write(b.decode("ascii")), line_length)
+    else:
+        writer = _Base64Writer(out.write, line_length)
+    if compression is None:
+        pickle.dump(obj, writer)
+    else:
+        from twlib.envelope import write_envelope
+
+        write_envelope(obj, writer.write, compression)
+    writer.close()
 
 
 def deserialize_from_base64(base64_str: str) -> Any:
-    """Deserialize a base64-encoded string to original object"""
+    """Deserialize a base64-encoded string (pickle or envelope) to original object"""
     # Decode the base64-encoded string to a bytes object
     decoded = base64.b64decode(base64_str)
-    # Deserialize the bytes object to a Python object using pickle
-    obj = pickle.loads(decoded)
-    return obj
+    return _load(io.BufferedReader(io.BytesIO(decoded)))
+
+
+def deserialize_from_base64_file(src: str | Path | IO) -> Any:
+    """Streaming `deserialize_from_base64` of a path or a text/binary file object.
+
+    Text is decoded chunk by chunk, large files are memory mapped instead of read.
+    """
+    if isinstance(src, (str, Path)):
+        if os.path.getsize(src) >= MMAP_THRESHOLD:
+            return _load_chunks(_mmap_chunks(src))
+        with open(src, "rb") as fp:
+            return _load_chunks(_read_chunks(fp))
+    return _load_chunks(_read_chunks(src))
+
+
+def _load_chunks(chunks: Iterator[bytes]) -> Any:
+    return _load(io.BufferedReader(_Base64Reader(chunks), CHUNK_SIZE))
+
+
+def _load(fp: io.BufferedReader) -> Any:
+    from twlib.envelope import MAGIC, read_envelope
+
+    if fp.peek(len(MAGIC))[: len(MAGIC)] == MAGIC:
+        fp.read(len(MAGIC))
+        return read_envelope(fp)
+    return pickle.load(fp)
+
+
+@functools.lru_cache(maxsize=64)
+def _matcher(excludes: tuple[str, ...]) -> ExcludeMatcher:
+    return ExcludeMatcher(excludes)
 
 
 def filter_path(path: Path, excludes: Iterable[str]) -> bool:
-    for part in Path(path).parts:
-        if part in excludes:
-            _log.debug(f"Excluding {path} due to {part}")
-            return True
+    """Whether path or one of its parents matches an exclude (see `ExcludeMatcher`).
+
+    The compiled matcher is cached per exclude spec, for bulk filtering use
+    `ExcludeMatcher(excludes).filter(paths)`.
+    """
+    key = excludes if isinstance(excludes, tuple) else tuple(excludes)
+    if _matcher(key).match(path):
+        _log.debug(f"Excluding {path}")
+        return True
     return False
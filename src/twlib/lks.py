@@ -0,0 +1,501 @@
+import json
+import logging
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Iterable, Iterator
+
+from twlib.exclude import ExcludeMatcher, compile_excludes
+from twlib.metrics import span
+
+""" Symlink discovery and reversal helpers for revert_lks """
+
+if TYPE_CHECKING:
+    from twlib.fastcopy import CopyEngine, CopyStats
+
+_log = logging.getLogger(__name__)
+
+
+def iter_symlinks(
+    root: str | Path, excludes: Iterable[str] | ExcludeMatcher
+) -> Iterator[Path]:
+    """Yield symlinks below root, depth first in name order, skipping excluded dirs.
+
+    Excludes are names, globs or gitignore style patterns relative to root (see
+    `ExcludeMatcher`). Excluded entries are pruned before descending, entry types
+    come from the `DirEntry` (no extra stat per entry) and symlinked directories
+    are not followed. Each directory is listed completely before its links are
+    yielded, so callers can replace links while iterating. Memory is bounded by
+    the directory depth and the largest directory, not by the tree size.
+    """
+    matcher = compile_excludes(excludes)
+    if any(matcher.match_name(part) for part in Path(root).parts):
+        _log.debug(f"Excluding {root}")
+        return
+    stack: list[tuple[str, tuple[str, ...]]] = [(os.fspath(root), ())]
+    while stack:
+        links, subdirs = scan_dir(*stack.pop(), matcher)
+        yield from links
+        stack.extend(reversed(subdirs))
+
+
+def scan_dir(
+    path: str, parts: tuple[str, ...], matcher: ExcludeMatcher
+) -> tuple[list[Path], list[tuple[str, tuple[str, ...]]]]:
+    """Symlinks and (path, parts) of the subdirectories of one directory, in name
+    order, without excluded entries. `parts` is path relative to the root."""
+    try:
+        with span("walk"), os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        _log.warning(f"Cannot scan {e.filename}: {e.strerror}")
+        return [], []
+    links, subdirs = [], []
+    for entry in entries:
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if matcher and matcher.match_entry((*parts, entry.name), is_dir):
+            _log.debug(f"Excluding {entry.path}")
+            continue
+        if entry.is_symlink():
+            links.append(Path(entry.path))
+        elif is_dir:
+            subdirs.append((entry.path, (*parts, entry.name)))
+    return links, subdirs
+
+
+class Resolver:
+    """`Path.resolve` with memoized symlink resolution.
+
+    Every path component is lstat'ed and read at most once, so links sharing
+    parent directories or chains through the same intermediate links are
+    resolved from the cache. Loops fall back to `Path.resolve` for its error.
+    """
+
+    MAX_DEPTH = 40  # like the kernel's ELOOP limit
+
+    def __init__(self) -> None:
+        self._entries: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, path: str | Path) -> Path:
+        with span("resolve"):
+            try:
+                return Path(self._realpath(os.path.abspath(path), 0))
+            except RecursionError:
+                return Path(path).resolve()
+
+    def invalidate(self, path: str | Path) -> None:
+        """Forget a link which was replaced by a file or directory."""
+        parent, name = os.path.split(os.path.abspath(path))
+        self._entries.pop(os.path.join(self._realpath(parent, 0), name), None)
+
+    def _realpath(self, path: str, depth: int) -> str:
+        if depth > self.MAX_DEPTH:
+            raise RecursionError(path)
+        current = os.sep
+        for part in path.split(os.sep):
+            if part in ("", "."):
+                continue
+            if part == "..":
+                current = os.path.dirname(current)  # current has no links left
+                continue
+            current = self._entry(os.path.join(current, part), depth)
+        return current
+
+    def _entry(self, path: str, depth: int) -> str:
+        """Resolve the last component of path, its parent is already resolved."""
+        if path in self._entries:
+            self.hits += 1
+            return self._entries[path]
+        self.misses += 1
+        if os.path.islink(path):
+            target = os.path.join(os.path.dirname(path), os.readlink(path))
+            resolved = self._realpath(target, depth + 1)
+        else:
+            resolved = path
+        self._entries[path] = resolved
+        return resolved
+
+
+def group_by_target(
+    links: Iterable[Path], resolver: Resolver
+) -> dict[Path, list[Path]]:
+    """Group links by their resolved target, in order of first appearance."""
+    groups: dict[Path, list[Path]] = {}
+    for link in links:
+        groups.setdefault(resolver.resolve(link), []).append(link)
+    return groups
+
+
+def restore(link: Path, target: Path, move: bool, engine: "CopyEngine") -> Path | None:
+    """Replace link with a copy (or the moved original) of target.
+
+    Returns where the target's data lives now, None for dangling links. A link
+    already removed by an interrupted run is restored as well.
+    """
+    link.unlink(missing_ok=True)
+    if target.is_file():
+        if move:
+            shutil.move(target, link)
+            _log.debug(f"Moved {target} to {link}")
+        else:
+            engine.copy_file(target, link)
+            _log.debug(f"Copying {target} to {link}")
+        return link
+    elif target.is_dir():
+        if move:
+            shutil.move(target, link.parent)
+            _log.debug(f"Moved {target} to {link.parent}")
+            return link.parent / target.name
+        else:
+            engine.copytree(target, link)
+            _log.debug(f"Copying {target} to {link}")
+            return link
+    _log.warning(f"Dangling link {link} -> {target}")
+    return None
+
+
+def _hardlink(src: str, dst: str, engine: "CopyEngine") -> None:
+    try:
+        os.link(src, dst)
+    except OSError as e:  # cross device, no hardlink support, link count limit
+        _log.debug(f"Cannot hardlink {dst}: {e.strerror}, copying")
+        engine.copy_file(src, dst)
+
+
+def link_tree(src: str | Path, dst: str | Path, engine: "CopyEngine") -> None:
+    """Mirror a directory tree with hardlinked files (`cp -al`), symlinks are kept."""
+    src, dst = os.fspath(src), os.fspath(dst)
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        out_root = os.path.normpath(os.path.join(dst, rel))
+        os.makedirs(out_root, exist_ok=True)
+        for name in list(dirs) + files:
+            s, d = os.path.join(root, name), os.path.join(out_root, name)
+            if os.path.islink(s):
+                os.symlink(os.readlink(s), d)
+                if name in dirs:
+                    dirs.remove(name)
+            elif name in files:
+                _hardlink(s, d, engine)
+
+
+def _replica(source: Path, dst: Path, dedup: str, engine: "CopyEngine") -> None:
+    if source.is_dir():
+        if dedup == "hardlink":
+            link_tree(source, dst, engine)
+        else:
+            engine.copytree(source, dst)
+    elif dedup == "hardlink":
+        _hardlink(os.fspath(source), os.fspath(dst), engine)
+    else:
+        engine.copy_file(source, dst)
+
+
+def replicate(source: Path, link: Path, dedup: str, engine: "CopyEngine") -> None:
+    """Replace link with a hardlinked or reflinked/copied replica of source."""
+    link.unlink()
+    _replica(source, link, dedup, engine)
+    _log.debug(f"Replicated {source} to {link} ({dedup})")
+
+
+DEDUP_MODES = ("none", "hardlink", "reflink")
+
+
+@dataclass
+class RevertResult:
+    links: int = 0
+    stats: "CopyStats | None" = None  # None for dry runs
+
+
+def _inside(path: Path, links: set[str]) -> bool:
+    """Whether path is one of the links or lies below one of them."""
+    return any(os.fspath(p) in links for p in (path, *path.parents))
+
+
+def revert_symlinks(
+    root: str | Path,
+    excludes: Iterable[str] | ExcludeMatcher = (".venv", ".git"),
+    move: bool = False,
+    dedup: str = "none",
+    workers: int = 1,
+    dry_run: bool = False,
+    concurrency: int = 0,
+) -> RevertResult:
+    """Replace the symlinks below root with copies (or the moved originals) of
+    their targets, the `revert-lks` command without console output.
+
+    With dedup, further links to a target become hardlinked or reflinked
+    replicas of its first copy. With `concurrency` > 1 up to that many metadata
+    operations run at a time (see `twlib.lksasync`), for network filesystems.
+    """
+    from twlib.fastcopy import CopyEngine
+
+    if dedup not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode {dedup}, use {DEDUP_MODES}")
+    if concurrency > 1:
+        from twlib.lksasync import revert_concurrent
+
+        return revert_concurrent(
+            root, excludes, move, dedup, workers, dry_run, concurrency
+        )
+    resolver = Resolver()
+    links = iter_symlinks(Path(root), excludes)
+    if dedup == "none":
+        groups: Iterable[tuple[Path, list[Path]]] = (
+            (resolver.resolve(f), [f]) for f in links
+        )
+    else:
+        groups = group_by_target(links, resolver).items()
+
+    result = RevertResult()
+    if dry_run:
+        for target, group in groups:
+            result.links += len(group)
+            for f in group:
+                _log.info(f"Copy/move {target} to {f}")
+        return result
+
+    engine = CopyEngine(workers=workers)
+    replicas: list[tuple[Path, Path]] = []  # from the first copy, once complete
+    pending: set[str] = set()  # restored links whose copies may still be running
+    for target, group in groups:
+        result.links += len(group)
+        if pending and _inside(target, pending):
+            engine.wait()  # a chained link: its target is still being written
+            pending.clear()
+        source = restore(group[0], target, move, engine)
+        resolver.invalidate(group[0])
+        if workers > 1 and not move:
+            pending.add(os.fspath(group[0]))
+        if source is not None:
+            replicas.extend((source, f) for f in group[1:])
+
+    engine.wait()
+    for source, f in replicas:
+        replicate(source, f, dedup, engine)
+    with engine:
+        result.stats = engine.wait()
+    return result
+
+
+TMP_SUFFIX = ".twlib-tmp"
+
+
+def tree_size(path: str | Path) -> int:
+    """Bytes of a file or of all files below a directory, links are not followed."""
+    if not os.path.isdir(path):
+        return os.lstat(path).st_size
+    total = 0
+    stack = [os.fspath(path)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+@dataclass
+class PlanEntry:
+    target: str
+    kind: str  # file, dir or missing
+    bytes: int
+    links: list[str]
+
+
+@dataclass
+class Plan:
+    """Machine readable revert_lks plan, one entry per distinct target."""
+
+    root: str
+    move: bool
+    dedup: str
+    entries: list[PlanEntry] = field(default_factory=list)
+    version: int = 1
+
+    @property
+    def links(self) -> int:
+        return sum(len(e.links) for e in self.entries)
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes to be written: one copy per link, one per target when deduped."""
+        if self.move:
+            return 0
+        if self.dedup == "none":
+            return sum(e.bytes * len(e.links) for e in self.entries)
+        return sum(e.bytes for e in self.entries)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "links": self.links,
+            "targets": len(self.entries),
+            "total_bytes": self.total_bytes,
+        }
+
+    def dump(self, fp: IO[str]) -> None:
+        data = {"version": self.version, "root": self.root, "move": self.move}
+        data |= {"dedup": self.dedup, **self.summary()}
+        data["entries"] = [asdict(e) for e in self.entries]
+        json.dump(data, fp, indent=1)
+
+    @classmethod
+    def load(cls, fp: IO[str]) -> "Plan":
+        data = json.load(fp)
+        if data.get("version") != 1:
+            raise ValueError(f"Unsupported plan version {data.get('version')}")
+        entries = [PlanEntry(**e) for e in data["entries"]]
+        return cls(data["root"], data["move"], data["dedup"], entries)
+
+
+def make_plan(
+    root: str | Path,
+    excludes: Iterable[str] | ExcludeMatcher,
+    move: bool = False,
+    dedup: str = "none",
+    resolver: Resolver | None = None,
+) -> Plan:
+    resolver = resolver or Resolver()
+    plan = Plan(root=os.path.abspath(root), move=move, dedup=dedup)
+    groups = group_by_target(iter_symlinks(root, excludes), resolver)
+    for target, links in groups.items():
+        if target.is_file():
+            kind = "file"
+        elif target.is_dir():
+            kind = "dir"
+        else:
+            kind = "missing"
+        size = tree_size(target) if kind != "missing" else 0
+        plan.entries.append(
+            PlanEntry(os.fspath(target), kind, size, [os.fspath(f) for f in links])
+        )
+    return plan
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.unlink(path)
+
+
+def _swap_in(tmp: str, link: str) -> None:
+    """Replace the symlink by the staged copy, atomically for files."""
+    if os.path.isdir(tmp):
+        os.unlink(link)
+        os.rename(tmp, link)
+    else:
+        os.replace(tmp, link)
+
+
+def _finish_swap(link: str) -> None:
+    """Complete a directory swap interrupted between unlink and rename."""
+    tmp = link + TMP_SUFFIX
+    if not os.path.lexists(link) and os.path.isdir(tmp):
+        _log.debug(f"Finishing interrupted swap of {link}")
+        os.rename(tmp, link)
+
+
+def _unreverted(link: Path, target: Path) -> bool:
+    """Link still to restore: a symlink, or removed by an interrupted move."""
+    return link.is_symlink() or (not os.path.lexists(link) and target.exists())
+
+
+def _stage(entry: PlanEntry, links: list[str], engine: "CopyEngine") -> list[str]:
+    """Copy the target next to each still linked path, return the staged links."""
+    staged = []
+    for link in links:
+        _finish_swap(link)
+        if not os.path.islink(link):  # swapped in before an interruption
+            continue
+        tmp = link + TMP_SUFFIX
+        _remove(tmp)  # partial copy of an interrupted run
+        if entry.kind == "dir":
+            engine.copytree(entry.target, tmp)
+        else:
+            engine.copy_file(entry.target, tmp)
+        staged.append(link)
+    return staged
+
+
+def read_journal(journal: str | Path) -> set[int]:
+    """Indexes of plan entries which were completed by earlier runs."""
+    if not os.path.exists(journal):
+        return set()
+    done = set()
+    with open(journal) as fp:
+        for line in fp:
+            try:
+                done.add(json.loads(line)["step"])
+            except (ValueError, KeyError):  # torn last line of a killed run
+                continue
+    return done
+
+
+def execute_plan(
+    plan: Plan, journal: str | Path, engine: "CopyEngine", batch_size: int = 64
+) -> tuple[int, int]:
+    """Execute a plan, appending each completed entry to the journal.
+
+    Copies are staged next to the link and swapped in only when complete, so an
+    interrupted run leaves every link either untouched or fully restored. Entries
+    in the journal are skipped without touching the filesystem when resuming.
+    Returns (executed, skipped) entry counts.
+    """
+    done = read_journal(journal)
+    executed = 0
+    with open(journal, "a") as jf:
+        for start in range(0, len(plan.entries), batch_size):
+            batch = [
+                (i, plan.entries[i])
+                for i in range(start, min(start + batch_size, len(plan.entries)))
+                if i not in done
+            ]
+            staged: dict[int, list[str]] = {}
+            replicas: list[Path] = []
+            for i, entry in batch:
+                if plan.move or entry.kind == "missing":
+                    continue
+                copies = entry.links if plan.dedup == "none" else entry.links[:1]
+                staged[i] = _stage(entry, copies, engine)
+            engine.wait()
+
+            for i, entry in batch:
+                for staged_link in staged.get(i, []):
+                    _swap_in(staged_link + TMP_SUFFIX, staged_link)
+                links = [Path(link) for link in entry.links]
+                target = Path(entry.target)
+                if entry.kind == "missing" or (plan.move and plan.dedup == "none"):
+                    for link in links:
+                        if _unreverted(link, target):
+                            restore(link, target, plan.move, engine)
+                    continue
+                source = links[0]
+                if plan.move:
+                    if _unreverted(links[0], target):
+                        restore(links[0], target, plan.move, engine)
+                    if entry.kind == "dir":
+                        source = links[0].parent / target.name
+                if plan.dedup != "none":
+                    for link in links[1:]:
+                        _finish_swap(os.fspath(link))
+                        if link.is_symlink():
+                            tmp = Path(f"{link}{TMP_SUFFIX}")
+                            _remove(os.fspath(tmp))
+                            _replica(source, tmp, plan.dedup, engine)
+                            replicas.append(link)
+            engine.wait()
+            for link in replicas:
+                _swap_in(f"{link}{TMP_SUFFIX}", os.fspath(link))
+
+            for i, entry in batch:
+                jf.write(json.dumps({"step": i, "target": entry.target}) + "\n")
+            jf.flush()
+            os.fsync(jf.fileno())
+            executed += len(batch)
+    return executed, len(done)
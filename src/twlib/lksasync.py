@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, TypeVar
+
+from twlib.exclude import ExcludeMatcher, compile_excludes
+from twlib.lks import (
+    Resolver,
+    RevertResult,
+    group_by_target,
+    replicate,
+    restore,
+    scan_dir,
+)
+
+""" revert_lks with concurrent metadata operations, for network filesystems
+
+On NFS/SMB every lstat, readlink, unlink and mkdir is a round trip to the
+server. Run sequentially, a tree of many links is bound by latency, not by
+bandwidth. Here the blocking calls run on a thread pool driven by asyncio with
+at most `concurrency` of them in flight:
+
+- directories are listed concurrently, links keep the `iter_symlinks` order
+- all links are resolved before the first one is replaced
+- links of one directory are replaced one after the other in name order,
+  different directories concurrently
+
+Moves depend on each other (a moved target is gone for the next link, a link
+chained through a replaced link now points to a file), so with `move` the links
+are replaced sequentially in walk order. Without dedup each one is also resolved
+right before it is replaced, as `revert_symlinks` does.
+"""
+
+_log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def _each(items: Iterable[T], func: Callable[[T], Any], limit: int) -> None:
+    """Run the blocking func for every item on the executor, `limit` at a time,
+    re-raising the first error."""
+    loop = asyncio.get_running_loop()
+    it = iter(items)
+
+    async def worker() -> None:
+        for item in it:  # shared: every item is taken by exactly one worker
+            await loop.run_in_executor(None, func, item)
+
+    await asyncio.gather(*(worker() for _ in range(limit)))
+
+
+async def walk(
+    root: str | Path, excludes: Iterable[str] | ExcludeMatcher, limit: int
+) -> list[list[Path]]:
+    """Symlinks below root grouped by directory, in the order of `iter_symlinks`,
+    with up to `limit` directories listed at a time."""
+    matcher = compile_excludes(excludes)
+    if any(matcher.match_name(part) for part in Path(root).parts):
+        _log.debug(f"Excluding {root}")
+        return []
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[tuple[str, tuple[str, ...]]] = asyncio.Queue()
+    found: dict[str, tuple[list[Path], list[str]]] = {}
+    errors: list[BaseException] = []
+
+    async def worker() -> None:
+        while True:
+            path, parts = await queue.get()
+            try:
+                if not errors:
+                    links, subdirs = await loop.run_in_executor(
+                        None, scan_dir, path, parts, matcher
+                    )
+                    found[path] = (links, [p for p, _ in subdirs])
+                    for subdir in subdirs:
+                        queue.put_nowait(subdir)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                queue.task_done()
+
+    queue.put_nowait((os.fspath(root), ()))
+    workers = [asyncio.create_task(worker()) for _ in range(limit)]
+    await queue.join()
+    for task in workers:
+        task.cancel()
+    if errors:
+        raise errors[0]
+
+    result, stack = [], [os.fspath(root)]
+    while stack:
+        links, subdirs = found.pop(stack.pop())
+        if links:
+            result.append(links)
+        stack.extend(reversed(subdirs))
+    return result
+
+
+def _by_dir(items: Iterable[tuple[Path, T]]) -> list[list[tuple[Path, T]]]:
+    """Group (link, value) pairs by the directory of the link, keeping order."""
+    dirs: dict[Path, list[tuple[Path, T]]] = {}
+    for link, value in items:
+        dirs.setdefault(link.parent, []).append((link, value))
+    return list(dirs.values())
+
+
+async def _revert(
+    root: str | Path,
+    excludes: Iterable[str] | ExcludeMatcher,
+    move: bool,
+    dedup: str,
+    workers: int,
+    dry_run: bool,
+    limit: int,
+) -> RevertResult:
+    from twlib.fastcopy import CopyEngine
+
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(limit, thread_name_prefix="lks"))
+    dirs = await walk(root, excludes, limit)
+    links = [f for d in dirs for f in d]
+    if move and dedup == "none" and not dry_run:
+        return await loop.run_in_executor(None, _move_in_order, links, workers)
+    resolver = Resolver()
+    await _each(dirs, lambda links: [resolver.resolve(f) for f in links], limit)
+
+    if dedup == "none":  # resolved from the cache
+        groups = [(resolver.resolve(f), [f]) for f in links]
+    else:
+        groups = list(group_by_target(links, resolver).items())
+
+    result = RevertResult(links=len(links))
+    if dry_run:
+        for target, group in groups:
+            for f in group:
+                _log.info(f"Copy/move {target} to {f}")
+        return result
+
+    engine = CopyEngine(workers=workers)
+    sources: dict[Path, Path | None] = {}
+
+    def restore_all(items: list[tuple[Path, Path]]) -> None:
+        for link, target in items:
+            sources[link] = restore(link, target, move, engine)
+
+    firsts = [(group[0], target) for target, group in groups]
+    if move:  # targets grouped before the first move, like `revert_symlinks`
+        await loop.run_in_executor(None, restore_all, firsts)
+    else:
+        await _each(_by_dir(firsts), restore_all, limit)
+    engine.wait()
+
+    def replicate_all(items: list[tuple[Path, Path]]) -> None:
+        for link, source in items:
+            replicate(source, link, dedup, engine)
+
+    replicas = (
+        (f, source)
+        for _, group in groups
+        if (source := sources[group[0]]) is not None
+        for f in group[1:]
+    )
+    await _each(_by_dir(replicas), replicate_all, limit)
+    with engine:
+        result.stats = engine.wait()
+    return result
+
+
+def _move_in_order(links: list[Path], workers: int) -> RevertResult:
+    """Move the targets in walk order, resolving each link after the earlier moves."""
+    from twlib.fastcopy import CopyEngine
+
+    resolver = Resolver()
+    with CopyEngine(workers=workers) as engine:
+        for link in links:
+            restore(link, resolver.resolve(link), True, engine)
+            resolver.invalidate(link)
+        return RevertResult(links=len(links), stats=engine.wait())
+
+
+def revert_concurrent(
+    root: str | Path,
+    excludes: Iterable[str] | ExcludeMatcher = (".venv", ".git"),
+    move: bool = False,
+    dedup: str = "none",
+    workers: int = 1,
+    dry_run: bool = False,
+    concurrency: int = 16,
+) -> RevertResult:
+    """`revert_symlinks` with up to `concurrency` metadata operations in flight."""
+    if concurrency < 1:
+        raise ValueError(f"Invalid concurrency {concurrency}, must be at least 1")
+    return asyncio.run(
+        _revert(root, excludes, move, dedup, workers, dry_run, concurrency)
+    )
@@ -1,24 +1,38 @@
-import datetime
+import contextlib
+import itertools
 import logging
 import os
-import shutil
+import sys
+import time
 from pathlib import Path
-from typing import Iterable
+from typing import IO, ContextManager
 
 import typer
-from dateutil.parser import parse
-from PIL import Image
-from pillow_heif import register_heif_opener
 
-from twlib.lib import filter_path
+from twlib import api
+from twlib.image import (
+    BatchSummary,
+    ConvertOptions,
+    _heic2img,
+    _out_path,
+    convert_batch,
+    iter_inputs,
+    plan_outputs,
+)
+from twlib.lks import DEDUP_MODES, Plan, execute_plan, make_plan
 
 _log = logging.getLogger(__name__)
 
-register_heif_opener()  # register PILLOW plugin
-
 app = typer.Typer(name="twlib")
 
 
+def _open_input(path: Path | None) -> ContextManager[IO[str]]:
+    """Open a text input, None or '-' is stdin (which is not closed)."""
+    if path is None or str(path) == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(path)
+
+
 @app.command()
 def snake_say(
     message: str,
@@ -43,91 +57,310 @@ def snake_say(
 
 @app.command()
 def epoch2dt(
-    epoch: int = typer.Argument(..., help="epoch in ms"),
+    epoch: int = typer.Argument(None, help="epoch in ms, omit for bulk mode"),
     to_local: bool = typer.Option(False, "-l", "--local", help="In local time"),
+    input_file: Path = typer.Option(
+        None, "-f", "--file", help="Bulk mode: one epoch per line, '-' for stdin"
+    ),
 ):
     """Convert epoch in ms (UTC) to datetime (local or UTC)"""
-    if to_local:
-        dt = datetime.datetime.fromtimestamp(epoch / 1000).strftime("%Y-%m-%d %H:%M:%S")
-    else:
-        dt = datetime.datetime.utcfromtimestamp(epoch / 1000).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
+    if epoch is None:
+        from twlib.timeconv import epoch2dt_stream
+
+        with _open_input(input_file) as fp:
+            for chunk in epoch2dt_stream(fp, to_local=to_local):
+                sys.stdout.write("\n".join(chunk) + "\n")
+        return
 
-    typer.echo(dt)
+    typer.echo(api.epoch2dt(epoch, to_local))
 
 
 @app.command()
 def dt2epoch(
-    dt: str = typer.Argument(..., help="datetime string in '%Y-%m-%d %H:%M:%S'"),
+    dt: str = typer.Argument(
+        None, help="datetime string in '%Y-%m-%d %H:%M:%S', omit for bulk mode"
+    ),
     is_local: bool = typer.Option(
         False, "-l", "--local", help="Input is given in local time"
     ),
+    input_file: Path = typer.Option(
+        None, "-f", "--file", help="Bulk mode: one datetime per line, '-' for stdin"
+    ),
+    fmt: str = typer.Option(
+        None,
+        "-F",
+        "--format",
+        help="Bulk mode: strptime format or 'iso', detected from the input if omitted",
+    ),
 ):
     """Convert naive local datetime (local or UTC) string to epoch in ms (UTC)"""
-    if is_local:
-        # https://stackoverflow.com/a/39079819
-        LOCAL_TIMEZONE = datetime.datetime.now().astimezone().tzinfo
+    if dt is None:
+        from twlib.timeconv import dt2epoch_stream
+
+        with _open_input(input_file) as fp:
+            for chunk in dt2epoch_stream(fp, is_local=is_local, fmt=fmt):
+                sys.stdout.write("\n".join(chunk) + "\n")
+        return
+
+    try:
+        epoch = api.dt2epoch(dt, is_local)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    typer.echo(epoch)
 
-        dt_parsed = parse(dt)  # get naive dt
-        dt_parsed = dt_parsed.replace(tzinfo=LOCAL_TIMEZONE)  # localize naive dt
-    else:
-        dt_parsed = parse(dt)
-        dt_parsed = dt_parsed.replace(tzinfo=datetime.timezone.utc)
 
-    epoch = int(dt_parsed.timestamp() * 1000)
-    typer.echo(epoch)
+@app.command()
+def rewrite_ts(
+    input_file: Path = typer.Argument(None, help="CSV or JSONL file, '-' for stdin"),
+    columns: list[str] = typer.Option(
+        ..., "-c", "--column", help="Timestamp column (CSV) or field (JSONL)"
+    ),
+    to: str = typer.Option("dt", "--to", help="Convert to: dt or epoch"),
+    unit: str = typer.Option(
+        "auto", "-u", "--unit", help="Epoch unit: s, ms, us, ns or auto"
+    ),
+    tz: str = typer.Option(
+        "UTC", "--tz", help="Timezone of the datetimes: IANA name or 'local'"
+    ),
+    fmt: str = typer.Option(
+        "auto", "-F", "--format", help="Datetime layout: strptime format or 'iso'"
+    ),
+    kind: str = typer.Option(
+        None, "--kind", help="csv or jsonl, default from the file suffix"
+    ),
+    out: Path = typer.Option(None, "-o", "--out", help="Output file (default: stdout)"),
+    in_place: bool = typer.Option(False, "-i", "--in-place", help="Replace input"),
+    workers: int = typer.Option(
+        1, "-j", "--workers", help="Number of worker processes"
+    ),
+) -> None:
+    """Rewrite timestamp columns of CSV/JSONL files between epoch and datetime."""
+    stdin = input_file is None or str(input_file) == "-"
+    if in_place and (stdin or out is not None):
+        raise typer.BadParameter("--in-place needs an input file and no --out")
+    kind = kind or (
+        "jsonl" if not stdin and input_file.suffix in (".jsonl", ".ndjson") else "csv"
+    )
+    target = input_file.with_name(input_file.name + ".twlib-tmp") if in_place else out
+    try:
+        with contextlib.ExitStack() as stack:
+            fin = stack.enter_context(_open_input(input_file))
+            if target is None:
+                fout = sys.stdout
+            else:
+                fout = stack.enter_context(open(target, "w", newline=""))
+            stats = api.rewrite_ts(
+                fin,
+                fout,
+                columns,
+                to=to,
+                tz=tz,
+                unit=unit,
+                fmt=fmt,
+                kind=kind,
+                workers=workers,
+            )
+        if in_place:
+            os.replace(target, input_file)
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    finally:
+        if in_place and target.exists():  # not replaced: failed or interrupted
+            os.unlink(target)
+    typer.secho(str(stats), err=True, fg=typer.colors.GREEN)
 
 
 @app.command()
-def heic2img(input_file: str, *, mode="jpg", out_file: str = None) -> None:
+def heic2img(
+    inputs: list[str] = typer.Argument(
+        ..., help="Files, directories or globs, '-' reads a file list from stdin"
+    ),
+    mode: str = typer.Option("jpg", "--mode", help="Output format: jpg or png"),
+    out_file: str = typer.Option(None, "--out-file", help="Output file (single input)"),
+    out_dir: Path = typer.Option(None, "-o", "--out-dir", help="Output directory"),
+    workers: int = typer.Option(
+        1, "-j", "--workers", help="Number of worker processes for batch mode"
+    ),
+    max_size: int = typer.Option(
+        None, "-s", "--max-size", help="Longest side of the output in pixels"
+    ),
+    thumbnail: bool = typer.Option(
+        False, "-t", "--thumbnail", help="Fast preview from embedded thumbnails"
+    ),
+    incremental: bool = typer.Option(
+        False, "-i", "--incremental", help="Skip inputs unchanged since the last run"
+    ),
+    use_hash: bool = typer.Option(
+        False, "--hash", help="Compare content hashes when size/mtime changed"
+    ),
+    manifest_file: Path = typer.Option(
+        None,
+        "--manifest",
+        help="Manifest database, default: $XDG_STATE_HOME/twlib/heic2img.db",
+    ),
+    pipeline: bool = typer.Option(
+        False, "-p", "--pipeline", help="Overlap I/O and codec work, -j codec threads"
+    ),
+    depth: int = typer.Option(8, "--depth", help="Queue depth of the pipeline"),
+) -> None:
     """
     An HEIC file is a space-saving image format that uses High Efficiency Video Coding (HEVC)
     to compress and store images across your devices.
     Because Apple regularly uses HEIC files, you can easily open them on your Mac with Preview or Photoshop
     """
-    _heic2img(input_file=input_file, mode=mode, out_file=out_file)
-    typer.secho("Saved {out_file}", fg=typer.colors.GREEN, bold=False)
+    options = ConvertOptions(mode=mode, max_size=max_size, thumbnail=thumbnail)
+    single = len(inputs) == 1 and Path(inputs[0]).is_file() and out_dir is None
+    if single and not incremental:
+        out_path, info = _heic2img(inputs[0], mode, out_file, options)
+        typer.echo(str(info))
+        typer.secho(f"Saved {out_path}", fg=typer.colors.GREEN, bold=False)
+        return
+    if out_file is not None and not single:
+        raise typer.BadParameter("--out-file requires a single input file")
+
+    if single:
+        jobs = iter([(Path(inputs[0]), _out_path(inputs[0], mode, out_file))])
+    else:
+        try:
+            jobs = plan_outputs(iter_inputs(inputs), mode=mode, out_dir=out_dir)
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+    with contextlib.ExitStack() as stack:
+        manifest = None
+        if incremental:
+            from twlib.manifest import Manifest, default_db_file
+
+            manifest = stack.enter_context(
+                Manifest(manifest_file or default_db_file(), use_hash=use_hash)
+            )
+            jobs = manifest.pending(jobs, options)
+            if pipeline:  # the sqlite connection must stay on this thread
+                jobs = iter(list(jobs))
+
+        if pipeline:
+            from twlib.pipeline import Pipeline
+
+            stages = Pipeline(options, codec_workers=workers, depth=depth)
+            results = stages.run(jobs)
+        else:
+            results = convert_batch(jobs, options=options, workers=workers)
+
+        summary = BatchSummary()
+        start = time.perf_counter()
+        for result in results:
+            summary.add(result)
+            if manifest is not None:
+                manifest.record(result, options)
+            if result.error is None:
+                typer.echo(f"{result.input_file} -> {result.out_file}")
+            else:
+                typer.secho(
+                    f"{result.input_file}: {result.error}",
+                    err=True,
+                    fg=typer.colors.RED,
+                )
+        summary.seconds = time.perf_counter() - start
+        if manifest is not None:
+            summary.skipped = manifest.skipped
+    typer.secho(str(summary), fg=typer.colors.GREEN, bold=False)
+    if pipeline:
+        for stage in stages.stats:
+            typer.echo(str(stage))
+        typer.echo(f"bound by: {stages.bottleneck.name}")
+    if summary.errors:
+        raise typer.Exit(code=1)
 
 
-def _heic2img(input_file: str, mode: str, out_file: str | None) -> None:
-    with Image.open(input_file) as img:
-        print(
-            f"{img.mode=}, {img.size=}, {img.format=}, {img.info.keys()=}, {img.getbands()=}"
-        )
+@app.command()
+def scan_img(
+    inputs: list[str] = typer.Argument(
+        ..., help="Files, directories or globs, '-' reads a file list from stdin"
+    ),
+    out: Path = typer.Option(
+        None,
+        "-o",
+        "--out",
+        help="*.db/*.sqlite: SQLite index, else JSONL (default: stdout)",
+    ),
+    workers: int = typer.Option(
+        1, "-j", "--workers", help="Number of worker processes"
+    ),
+) -> None:
+    """Index image headers (size, EXIF date, ICC, thumbnails) without decoding."""
+    from twlib.imgindex import IMAGE_SUFFIXES, scan, write_jsonl, write_sqlite
+
+    paths = (f for f, _ in iter_inputs(inputs, suffixes=IMAGE_SUFFIXES))
+    metas = scan(paths, workers=workers)
+    start = time.perf_counter()
+    if out is None:
+        n = write_jsonl(metas, sys.stdout)
+    elif out.suffix in (".db", ".sqlite"):
+        n = write_sqlite(metas, out)
+    else:
+        with open(out, "w") as fp:
+            n = write_jsonl(metas, fp)
+    seconds = time.perf_counter() - start
+    typer.secho(
+        f"Indexed {n} images in {seconds:.2f}s", err=True, fg=typer.colors.GREEN
+    )
 
-        if mode == "jpg":
-            if out_file is None:
-                out_file = Path(input_file).with_suffix(".jpg")
-            Path(out_file).unlink(missing_ok=True)
-            Path(out_file).parent.mkdir(parents=True, exist_ok=True)
-            img.save(out_file, "JPEG")
-
-        elif mode == "png":
-            if out_file is None:
-                out_file = Path(input_file).with_suffix(".png")
-            Path(out_file).unlink(missing_ok=True)
-            Path(out_file).parent.mkdir(parents=True, exist_ok=True)
-            img.save(out_file, "PNG")
-        else:
-            raise ValueError(f"Unknown type {mode}")
+
+@app.command()
+def git_urls(
+    root: Path = typer.Argument(Path("."), help="Workspace root to scan"),
+    fmt: str = typer.Option("tsv", "-f", "--format", help="tsv or json"),
+    remote: str = typer.Option(None, "-r", "--remote", help="Remote to resolve"),
+    workers: int = typer.Option(8, "-j", "--workers", help="Resolver threads"),
+    nested: bool = typer.Option(False, "--nested", help="Scan inside repositories"),
+    cache: bool = typer.Option(True, "--cache/--no-cache", help="Cache by mtime"),
+) -> None:
+    """List the browsable remote urls of all git repositories below root."""
+    import json
+    from dataclasses import asdict
+
+    from twlib.git_open import UrlCache, scan_repos
+
+    if fmt not in ("tsv", "json"):
+        raise typer.BadParameter(f"Invalid format {fmt}, must be tsv or json")
+    cache_dir = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+    url_cache = UrlCache(Path(cache_dir) / "twlib" / "git_urls.json" if cache else None)
+    repos = scan_repos(root.absolute(), remote, workers, url_cache, nested)
+    if fmt == "json":
+        json.dump([asdict(r) for r in repos], sys.stdout, indent=1)
+        sys.stdout.write("\n")
+    else:
+        for r in repos:
+            typer.echo(f"{r.path}\t{r.browse_url or ''}\t{r.url}")
+    url_cache.save()
 
 
 @app.command()
-def relative(source: str, target: str) -> Path:
+def relative(
+    source: str = typer.Argument(None, help="Source file, omit for bulk mode"),
+    target: str = typer.Argument(None, help="Target file"),
+    input_file: Path = typer.Option(
+        None,
+        "-f",
+        "--file",
+        help="Bulk mode: 'source<TAB>target' per line, '-' for stdin",
+    ),
+) -> Path | None:
     """Calculate the relative path from source to target ."""
-    source_path = Path(source).parent
-    target_path = Path(target).parent
+    from twlib.relpath import relative_path, relative_paths
 
-    if not (source_path.is_absolute() and target_path.is_absolute()):
-        raise ValueError("Both source and target must be absolute paths")
+    if source is None:
+        with _open_input(input_file) as fp:
+            lines = relative_paths(line for line in fp if line.strip())
+            while chunk := list(itertools.islice(lines, 4096)):
+                sys.stdout.write("\n".join(chunk) + "\n")
+        return None
+    if target is None:
+        raise typer.BadParameter("Missing target")
 
-    name = Path(
-        target
-    ).name  # Gotcha: source_path.name is not the same as target_path.name
-    rel_path = os.path.relpath(target_path, source_path)
-    typer.echo(Path(rel_path) / name)
-    return Path(rel_path) / name
+    # Gotcha: the name of the source is not the name of the target
+    rel_path = Path(relative_path(source, target))
+    typer.echo(rel_path)
+    return rel_path
 
 
 @app.command()
@@ -136,57 +369,111 @@ def revert_lks(
         ..., help="Directory containing the lks files", exists=True
     ),
     excludes: list[str] = typer.Option(
-        [".venv", ".git"], "-e", "--exclude", help="Exclude dirs/files"
+        [".venv", ".git"],
+        "-e",
+        "--exclude",
+        help="Exclude dirs/files: names, globs or gitignore style patterns",
     ),
     dry_run: bool = typer.Option(False, "-d", "--dry-run", help="Dry run"),
     move: bool = typer.Option(False, "-m", "--move", help="Move instead of copy"),
+    workers: int = typer.Option(1, "-j", "--workers", help="Parallel copy workers"),
+    concurrency: int = typer.Option(
+        0,
+        "-c",
+        "--concurrency",
+        help="Concurrent metadata operations (lstat, readlink, unlink, mkdir) "
+        "for network filesystems, 0: sequential",
+    ),
+    dedup: str = typer.Option(
+        "none",
+        "--dedup",
+        help="Links to the same target: none (copy each), hardlink or reflink "
+        "replicas of the first copy",
+    ),
+    plan_file: Path = typer.Option(
+        None, "--plan", help="Write the plan as JSON ('-' for stdout), change nothing"
+    ),
+    execute_file: Path = typer.Option(
+        None, "--execute", help="Execute a plan, resuming from its <plan>.journal"
+    ),
 ) -> None:
     """Replace symlinks in given directory with their associated files/directories."""
+    from twlib.fastcopy import CopyEngine
+
+    if dedup not in DEDUP_MODES:
+        raise typer.BadParameter(f"Unknown dedup mode {dedup}")
+    if concurrency < 0:
+        raise typer.BadParameter(f"Invalid concurrency {concurrency}")
+
+    if plan_file is not None:
+        plan = make_plan(dir_, excludes, move=move, dedup=dedup)
+        if str(plan_file) == "-":
+            plan.dump(sys.stdout)
+        else:
+            with open(plan_file, "w") as fp:
+                plan.dump(fp)
+        typer.secho(f"Plan: {plan.summary()}", err=True, fg=typer.colors.GREEN)
+        return
+    if execute_file is not None:
+        with open(execute_file) as fp:
+            plan = Plan.load(fp)
+        if Path(plan.root) != dir_.absolute():
+            raise typer.BadParameter(f"Plan is for {plan.root}, not {dir_}")
+        with CopyEngine(workers=workers) as engine:
+            executed, skipped = execute_plan(plan, f"{execute_file}.journal", engine)
+            stats = engine.wait()
+        if stats.files:
+            typer.echo(str(stats))
+        typer.secho(
+            f"Executed {executed} targets, {skipped} already done",
+            fg=typer.colors.GREEN,
+        )
+        return
+
     typer.echo(f"xxx {dir_}")
     _log.info(f"Reverting symlinks in {dir_}")
 
     if dry_run:
         _log.info("Dry run, no changes will be made")
-        func = shutil.copy
+    elif move:
+        _log.info("Move mode")
     else:
-        if move:
-            _log.info("Move mode")
-        else:
-            _log.info("Copy mode")
+        _log.info("Copy mode")
 
-    symlks = [f for f in dir_.rglob("*") if f.is_symlink()]
+    result = api.revert_lks(dir_, excludes, move, dedup, workers, dry_run, concurrency)
+    if result.stats is not None and result.stats.files:
+        typer.echo(str(result.stats))
+    typer.secho(f"Reverted {result.links} symlinks", fg=typer.colors.GREEN, bold=False)
 
-    for f in symlks:
-        if filter_path(f, excludes):
-            continue
-        target = f.resolve()
 
-        if dry_run:
-            _log.info(f"Copy/move {target} to {f}")
-            continue
-
-        f.unlink()
-        if target.is_file():
-            if move:
-                shutil.move(target, f)
-                _log.debug(f"Moved {target} to {f}")
-            else:
-                shutil.copy2(target, f)
-                _log.debug(f"Copied {target} to {f}")
-        elif target.is_dir():
-            if move:
-                shutil.move(target, f.parent)
-                _log.debug(f"Moved {target} to {f.parent}")
-            else:
-                shutil.copytree(target, f, symlinks=True)
-                _log.debug(f"Copied {target} to {f}")
+@app.command()
+def serve(
+    socket_file: str = typer.Option(
+        None, "-s", "--socket", help="Default: $TWLIB_SOCKET or twlib-<uid>.sock"
+    ),
+    idle: float = typer.Option(None, "--idle", help="Exit after idle seconds"),
+) -> None:
+    """Keep the commands warm behind a Unix-domain socket for `twlibc`/`git-openc`."""
+    from twlib import daemon
+    from twlib.client import socket_path
 
-    typer.secho(f"Reverted {len(symlks)} symlinks", fg=typer.colors.GREEN, bold=False)
+    try:
+        daemon.serve(socket_file or socket_path(), idle)
+    except ValueError as e:
+        typer.secho(str(e), err=True, fg=typer.colors.RED)
+        raise typer.Exit(code=1)
 
 
 @app.callback()
 def main(
+    ctx: typer.Context,
     verbose: bool = typer.Option(False, "-v", "--verbose", help="verbosity"),
+    profile: str = typer.Option(
+        None, "--profile", help="cProfile stats file, '-' prints the top to stderr"
+    ),
+    metrics: str = typer.Option(
+        None, "--metrics", help="JSON file with wall/CPU/RSS per phase, '-' stderr"
+    ),
 ):
     log_fmt = r"%(asctime)-15s %(levelname)-7s %(message)s"
     if verbose:
@@ -197,6 +484,30 @@ def main(
         logging.basicConfig(
             format=log_fmt, level=logging.INFO, datefmt="%m-%d %H:%M:%S"
         )
+    if metrics is not None:
+        from twlib import metrics as _metrics
+
+        recorder = _metrics.enable()
+
+        def dump_metrics() -> None:
+            _metrics.disable()
+            report = recorder.report(command=ctx.invoked_subcommand, argv=sys.argv[1:])
+            _metrics.write_metrics(report, metrics)
+
+        ctx.call_on_close(dump_metrics)
+    if profile is not None:
+        import cProfile
+
+        from twlib.metrics import write_profile
+
+        profiler = cProfile.Profile()
+
+        def dump_profile() -> None:
+            profiler.disable()
+            write_profile(profiler, profile)
+
+        ctx.call_on_close(dump_profile)
+        profiler.enable()
 
 
 if __name__ == "__main__":
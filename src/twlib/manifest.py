@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from twlib.image import ConvertOptions, ConvertResult
+
+""" Persistent conversion manifest for incremental heic2img runs """
+
+_log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS heic2img_manifest (
+    input_file TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT,
+    settings TEXT NOT NULL,
+    out_file TEXT NOT NULL,
+    out_size INTEGER NOT NULL,
+    out_mtime_ns INTEGER NOT NULL
+)
+"""
+
+
+def default_db_file() -> Path:
+    """Per-user manifest in $XDG_STATE_HOME (default ~/.local/state)/twlib."""
+    state_dir = os.environ.get("XDG_STATE_HOME", Path.home() / ".local" / "state")
+    return Path(state_dir) / "twlib" / "heic2img.db"
+
+
+def file_digest(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _key(path: str | Path) -> str:
+    return os.path.abspath(path)
+
+
+def settings_key(options: ConvertOptions) -> str:
+    return json.dumps(asdict(options), sort_keys=True)
+
+
+class Manifest:
+    """Record of converted inputs keyed on path, size, mtime and output settings.
+
+    A file is up to date when its size and mtime match the record (content hash as
+    tie breaker with `use_hash`), the settings and output path are unchanged and the
+    output still has the recorded size and mtime. The lookup is one primary key hit.
+
+    Records are committed every `commit_every` records or `commit_seconds`, so an
+    interrupted batch keeps most of its progress.
+    """
+
+    def __init__(
+        self,
+        db_file: str | Path,
+        use_hash: bool = False,
+        commit_every: int = 100,
+        commit_seconds: float = 5.0,
+    ) -> None:
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(db_file)
+        self.con.execute(SCHEMA)
+        self.use_hash = use_hash
+        self.skipped = 0
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def commit(self) -> None:
+        self.con.commit()
+        self._uncommitted = 0
+        self._committed_at = time.monotonic()
+
+    def close(self) -> None:
+        self.commit()
+        self.con.close()
+
+    def is_current(self, input_file: Path, out_file: Path, settings: str) -> bool:
+        row = self.con.execute(
+            "SELECT size, mtime_ns, digest, settings, out_file, out_size, out_mtime_ns"
+            " FROM heic2img_manifest WHERE input_file = ?",
+            (_key(input_file),),
+        ).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, digest, old_settings, old_out, out_size, out_mtime_ns = row
+        if old_settings != settings or old_out != _key(out_file):
+            return False
+        try:
+            st_in = os.stat(input_file)
+            st_out = os.stat(out_file)
+        except FileNotFoundError:
+            return False
+        if (st_out.st_size, st_out.st_mtime_ns) != (out_size, out_mtime_ns):
+            _log.debug(f"Stale output {out_file}")
+            return False
+        if (st_in.st_size, st_in.st_mtime_ns) == (size, mtime_ns):
+            return True
+        if self.use_hash and digest is not None and st_in.st_size == size:
+            if file_digest(input_file) == digest:
+                self.con.execute(
+                    "UPDATE heic2img_manifest SET mtime_ns = ? WHERE input_file = ?",
+                    (st_in.st_mtime_ns, _key(input_file)),
+                )
+                return True
+        return False
+
+    def pending(
+        self, jobs: Iterable[tuple[Path, Path]], options: ConvertOptions
+    ) -> Iterator[tuple[Path, Path]]:
+        """Drop jobs whose output is up to date, counting them in `skipped`."""
+        settings = settings_key(options)
+        for input_file, out_file in jobs:
+            if self.is_current(input_file, out_file, settings):
+                _log.debug(f"Unchanged {input_file}")
+                self.skipped += 1
+                continue
+            yield input_file, out_file
+
+    def record(self, result: ConvertResult, options: ConvertOptions) -> None:
+        if result.error is not None:
+            return
+        st_in = os.stat(result.input_file)
+        st_out = os.stat(result.out_file)
+        digest = file_digest(result.input_file) if self.use_hash else None
+        self.con.execute(
+            "INSERT OR REPLACE INTO heic2img_manifest VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                _key(result.input_file),
+                st_in.st_size,
+                st_in.st_mtime_ns,
+                digest,
+                settings_key(options),
+                _key(result.out_file),
+                st_out.st_size,
+                st_out.st_mtime_ns,
+            ),
+        )
+        self._uncommitted += 1
+        if (
+            self._uncommitted >= self.commit_every
+            or time.monotonic() - self._committed_at >= self.commit_seconds
+        ):
+            self.commit()
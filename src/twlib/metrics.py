@@ -0,0 +1,112 @@
+import contextlib
+import json
+import logging
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, ContextManager, Iterator
+
+""" Opt-in run metrics: wall/CPU/RSS spans for named phases and cProfile """
+
+_log = logging.getLogger(__name__)
+
+_NULL = contextlib.nullcontext()
+_recorder: "Recorder | None" = None
+
+
+def _max_rss_kb() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0  # process CPU time, includes other threads running meanwhile
+    max_rss_kb: int | None = None
+
+
+@dataclass
+class Recorder:
+    """Aggregates spans by name, thread safe. Spans in worker processes are lost."""
+
+    spans: dict[str, SpanStats] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    start_wall: float = field(default_factory=time.perf_counter)
+    start_cpu: float = field(default_factory=time.process_time)
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            rss = _max_rss_kb()
+            with self.lock:
+                stats = self.spans.setdefault(name, SpanStats())
+                stats.count += 1
+                stats.wall += wall
+                stats.cpu += cpu
+                stats.max_rss_kb = rss
+
+    def report(self, **extra: Any) -> dict[str, Any]:
+        return {
+            **extra,
+            "wall": time.perf_counter() - self.start_wall,
+            "cpu": time.process_time() - self.start_cpu,
+            "max_rss_kb": _max_rss_kb(),
+            "spans": {name: asdict(s) for name, s in sorted(self.spans.items())},
+        }
+
+
+def span(name: str) -> ContextManager[None]:
+    """Time a named phase (walk, resolve, copy, decode, encode, ...) if enabled.
+
+    Disabled, this returns a shared null context: one global lookup per call.
+    """
+    if _recorder is None:
+        return _NULL
+    return _recorder.span(name)
+
+
+def enable() -> Recorder:
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def disable() -> Recorder | None:
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def write_metrics(report: dict[str, Any], out: str) -> None:
+    """Write a metrics report as JSON to a file, '-' is stderr."""
+    if out == "-":
+        json.dump(report, sys.stderr, indent=1)
+        sys.stderr.write("\n")
+        return
+    with open(out, "w") as fp:
+        json.dump(report, fp, indent=1)
+    _log.debug(f"Metrics written to {out}")
+
+
+def write_profile(profiler: Any, out: str, limit: int = 30) -> None:
+    """Dump cProfile stats for `pstats`/snakeviz, '-' prints the top functions."""
+    if out == "-":
+        import pstats
+
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(
+            limit
+        )
+        return
+    profiler.dump_stats(out)
+    _log.debug(f"Profile written to {out}")
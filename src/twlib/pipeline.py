@@ -0,0 +1,186 @@
+import io
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from twlib.image import (
+    FORMATS,
+    ConvertOptions,
+    ConvertResult,
+    _image_module,
+    _reduce,
+)
+from twlib.metrics import span
+
+""" Streaming heic2img: reader -> codec -> writer stages on bounded queues """
+
+_log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int = 1
+    items: int = 0
+    bytes: int = 0
+    busy: float = 0.0  # summed over the stage's threads
+    waited: float = 0.0  # blocked on the input queue
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, busy: float, waited: float, nbytes: int = 0) -> None:
+        with self.lock:
+            self.items += 1
+            self.bytes += nbytes
+            self.busy += busy
+            self.waited += waited
+
+    @property
+    def load(self) -> float:
+        """Busy seconds per thread, the largest value marks the bottleneck."""
+        return self.busy / self.workers
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<6} x{self.workers}: busy {self.busy:.2f}s "
+            f"(load {self.load:.2f}s/thread), waited {self.waited:.2f}s, "
+            f"{self.items} items, {self.bytes / 1e6:.1f} MB"
+        )
+
+
+@dataclass
+class _Item:
+    index: int
+    result: ConvertResult
+    data: bytes = b""
+
+
+def _decode_encode(data: bytes, options: ConvertOptions) -> bytes:
+    with _image_module().open(io.BytesIO(data)) as img:
+        out = io.BytesIO()
+        img = _reduce(img, options)
+        with span("encode"):
+            img.save(out, FORMATS[options.mode][0])
+    return out.getvalue()
+
+
+class Pipeline:
+    """Convert images with file reads and writes overlapping the codec work.
+
+    A reader thread prefetches input bytes, `codec_workers` threads decode/encode
+    (Pillow and libheif release the GIL) and a writer thread stores the results.
+    Memory is bounded by `depth` items per queue. Results are yielded in input order.
+    """
+
+    def __init__(
+        self, options: ConvertOptions, codec_workers: int = 2, depth: int = 8
+    ) -> None:
+        self.options = options
+        self.codec_workers = max(1, codec_workers)
+        self.read_q: queue.Queue[Any] = queue.Queue(maxsize=depth)
+        self.write_q: queue.Queue[Any] = queue.Queue(maxsize=depth)
+        self.result_q: queue.Queue[Any] = queue.Queue()
+        self.stats = [
+            StageStats("read"),
+            StageStats("codec", workers=self.codec_workers),
+            StageStats("write"),
+        ]
+        self.error: Exception | None = None  # of the reader, raised by `run`
+
+    @property
+    def bottleneck(self) -> StageStats:
+        return max(self.stats, key=lambda s: s.load)
+
+    def _reader(self, jobs: Iterable[tuple[Path, Path]]) -> None:
+        stats = self.stats[0]
+        try:
+            for index, (input_file, out_file) in enumerate(jobs):
+                item = _Item(index, ConvertResult(input_file, out_file))
+                start = time.perf_counter()
+                try:
+                    item.data = Path(input_file).read_bytes()
+                    item.result.bytes_in = len(item.data)
+                except OSError as e:
+                    item.result.error = f"{type(e).__name__}: {e}"
+                stats.add(time.perf_counter() - start, 0.0, len(item.data))
+                self.read_q.put(item)
+        except Exception as e:  # e.g. from the jobs iterable, not per file
+            self.error = e
+        finally:
+            for _ in range(self.codec_workers):
+                self.read_q.put(_DONE)
+
+    def _codec(self) -> None:
+        stats = self.stats[1]
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self.read_q.get()
+                if item is _DONE:
+                    break
+                waited = time.perf_counter() - start
+                if item.result.error is None:
+                    try:
+                        item.data = _decode_encode(item.data, self.options)
+                    except Exception as e:  # collect per file
+                        item.result.error = f"{type(e).__name__}: {e}"
+                        item.data = b""
+                stats.add(time.perf_counter() - start - waited, waited, len(item.data))
+                self.write_q.put(item)
+        finally:
+            self.write_q.put(_DONE)
+
+    def _writer(self) -> None:
+        stats = self.stats[2]
+        done = 0
+        try:
+            while done < self.codec_workers:
+                start = time.perf_counter()
+                item = self.write_q.get()
+                if item is _DONE:
+                    done += 1
+                    continue
+                waited = time.perf_counter() - start
+                result = item.result
+                if result.error is None:
+                    try:
+                        result.out_file.unlink(missing_ok=True)
+                        result.out_file.parent.mkdir(parents=True, exist_ok=True)
+                        result.out_file.write_bytes(item.data)
+                        result.bytes_out = len(item.data)
+                    except OSError as e:
+                        result.error = f"{type(e).__name__}: {e}"
+                busy = time.perf_counter() - start - waited
+                result.seconds = busy
+                stats.add(busy, waited, result.bytes_out)
+                self.result_q.put((item.index, result))
+        finally:
+            self.result_q.put(_DONE)
+
+    def run(self, jobs: Iterable[tuple[Path, Path]]) -> Iterator[ConvertResult]:
+        threads = [threading.Thread(target=self._reader, args=(jobs,), daemon=True)]
+        threads += [
+            threading.Thread(target=self._codec, daemon=True)
+            for _ in range(self.codec_workers)
+        ]
+        threads.append(threading.Thread(target=self._writer, daemon=True))
+        for t in threads:
+            t.start()
+
+        pending: dict[int, ConvertResult] = {}  # small results only, no image data
+        next_index = 0
+        while (entry := self.result_q.get()) is not _DONE:
+            index, result = entry
+            pending[index] = result
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+        for t in threads:
+            t.join()
+        if self.error is not None:
+            raise self.error
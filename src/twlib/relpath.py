@@ -0,0 +1,75 @@
+import functools
+import logging
+import os
+from pathlib import PurePath
+from typing import Iterable, Iterator
+
+""" Relative paths between absolute files, memoized per directory """
+
+_log = logging.getLogger(__name__)
+
+_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _parts(directory: str) -> tuple[str, ...]:
+    return tuple(
+        p for p in os.path.normpath(directory).split(os.sep) if p not in ("", ".")
+    )
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _relpath(target_dir: str, source_dir: str) -> str:
+    """`os.path.relpath(target_dir, source_dir)` for absolute directories."""
+    target, source = _parts(target_dir), _parts(source_dir)
+    common = 0
+    for a, b in zip(target, source):
+        if a != b:
+            break
+        common += 1
+    parts = [os.pardir] * (len(source) - common) + list(target[common:])
+    return os.path.join(*parts) if parts else os.curdir
+
+
+def _split(path: str) -> tuple[str, str]:
+    """(parent, name) as `PurePath` sees them, which ignores trailing separators and
+    '.' components."""
+    parent, _, name = path.rpartition(os.sep)
+    if name in ("", os.curdir):
+        pure = PurePath(path)
+        return str(pure.parent), pure.name
+    return parent, name
+
+
+def relative_path(source: str, target: str) -> str:
+    """Path of file target relative to the directory of file source.
+
+    E.g. for a link at source pointing to target. Both must be absolute. Only
+    the (target dir, source dir) pair is resolved, once per distinct pair.
+    """
+    if not (os.path.isabs(source) and os.path.isabs(target)):
+        raise ValueError("Both source and target must be absolute paths")
+    target_dir, name = _split(target)
+    rel = _relpath(target_dir, _split(source)[0])
+    return name if rel == os.curdir else os.path.join(rel, name)
+
+
+def _parse_pair(line: str) -> tuple[str, str]:
+    """Tab separated if the line has a tab, else whitespace separated."""
+    line = line.rstrip("\n")
+    source, target = line.split("\t") if "\t" in line else line.split()
+    return source, target
+
+
+def relative_paths(pairs: Iterable[tuple[str, str] | str]) -> Iterator[str]:
+    """`relative_path` for a stream of (source, target) pairs or manifest lines.
+
+    Invalid pairs yield an empty string to keep the output aligned.
+    """
+    for pair in pairs:
+        try:
+            source, target = _parse_pair(pair) if isinstance(pair, str) else pair
+            yield relative_path(source, target)
+        except ValueError as e:
+            _log.warning(f"Skipping {pair!r}: {e}")
+            yield ""
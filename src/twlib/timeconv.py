@@ -0,0 +1,300 @@
+import datetime
+import functools
+import itertools
+import logging
+import os
+import re
+import time
+import warnings
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar, cast
+
+from twlib.metrics import span
+
+""" Bulk epoch <-> datetime conversion for streams of values """
+
+_log = logging.getLogger(__name__)
+
+DT_FMT = "%Y-%m-%d %H:%M:%S"
+CHUNK_SIZE = 1 << 16
+OFFSET_BUCKET = 900  # tz transitions happen on quarter hours (UTC)
+# years 1 to 9999 with a day of margin for local UTC offsets, others are bad lines
+MIN_EPOCH_MS = -62135510400000  # 0001-01-02 00:00:00
+MAX_EPOCH_MS = 253402214400000  # 9999-12-31 00:00:00, exclusive
+
+
+def _numpy() -> Any:
+    """NumPy if installed (`pip install twlib[fast]`), else None."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+_LOCAL_CACHES: list[Any] = []
+_local_zone: tuple[str | None, tuple[str, str]] | None = None
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def local_cache(func: F) -> F:
+    """`lru_cache` for results in local time, cleared by `sync_local_zone`."""
+    cached = functools.lru_cache(maxsize=1 << 16)(func)
+    _LOCAL_CACHES.append(cached)
+    return cast(F, cached)
+
+
+def sync_local_zone() -> None:
+    """Clear the local time caches when TZ or the zone set by `time.tzset` changed
+    since the last call, so long running processes follow the current zone."""
+    global _local_zone
+    zone = (os.environ.get("TZ"), time.tzname)
+    if zone != _local_zone:
+        _local_zone = zone
+        for cached in _LOCAL_CACHES:
+            cached.cache_clear()
+
+
+@local_cache
+def _utc_offset(bucket: int) -> int:
+    """Local UTC offset in seconds for the quarter hour `bucket`."""
+    return time.localtime(bucket * OFFSET_BUCKET).tm_gmtoff
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _date(day: int) -> str:
+    t = time.gmtime(day * 86400)
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"  # %Y is not padded
+
+
+def format_epochs(epochs_ms: Sequence[int], to_local: bool = False) -> list[str]:
+    """Format epochs in ms as DT_FMT, per item but with cached days and offsets."""
+    if to_local:
+        sync_local_zone()
+    out = []
+    for ms in epochs_ms:
+        sec = ms // 1000
+        if to_local:
+            sec += _utc_offset(sec // OFFSET_BUCKET)
+        day, rest = divmod(sec, 86400)
+        hour, rest = divmod(rest, 3600)
+        out.append(f"{_date(day)} {hour:02d}:{rest // 60:02d}:{rest % 60:02d}")
+    return out
+
+
+def format_epochs_numpy(epochs_ms: Sequence[int], to_local: bool = False) -> list[str]:
+    """Vectorized `format_epochs` with datetime64 arithmetic."""
+    np = _numpy()
+    sec = np.floor_divide(np.asarray(epochs_ms, dtype=np.int64), 1000)
+    if to_local:
+        sync_local_zone()
+        buckets, inverse = np.unique(sec // OFFSET_BUCKET, return_inverse=True)
+        offsets = np.array([_utc_offset(int(b)) for b in buckets], dtype=np.int64)
+        sec = sec + offsets[inverse]
+    text = np.datetime_as_string(sec.astype("datetime64[s]"), unit="s")
+    return [s.replace("T", " ") for s in text.tolist()]
+
+
+def _parse_chunk(lines: Sequence[str]) -> tuple[list[int], list[int]]:
+    """Return (values, indexes of unparsable or out of range lines), bad lines
+    become 0."""
+    values, bad = [], []
+    for i, line in enumerate(lines):
+        try:
+            value: int | None = int(line)
+        except ValueError:
+            value = None
+        if value is not None and MIN_EPOCH_MS <= value < MAX_EPOCH_MS:
+            values.append(value)
+        else:
+            values.append(0)
+            bad.append(i)
+    return values, bad
+
+
+def epoch2dt_stream(
+    lines: Iterable[str],
+    to_local: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    use_numpy: bool | None = None,
+) -> Iterator[list[str]]:
+    """Convert a stream of epochs in ms, one per line, chunk by chunk.
+
+    Yields one list of formatted datetimes per chunk, so memory stays constant
+    for unbounded input. Unparsable lines yield an empty string to keep the
+    output aligned with the input. NumPy is used when installed unless
+    `use_numpy` is False.
+    """
+    if use_numpy is None:
+        use_numpy = _numpy() is not None
+    convert = format_epochs_numpy if use_numpy else format_epochs
+    it = iter(lines)
+    while chunk := list(itertools.islice(it, chunk_size)):
+        with span("format"):
+            values, bad = _parse_chunk(chunk)
+            out = convert(values, to_local)
+        for i in bad:
+            _log.debug(f"Cannot parse epoch {chunk[i]!r}")
+            out[i] = ""
+        yield out
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_MS = datetime.timedelta(milliseconds=1)
+ISO = "iso"  # any layout accepted by datetime.fromisoformat
+FORMATS = (
+    ISO,
+    "%d.%m.%Y %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y%m%d%H%M%S",
+    "%d.%m.%Y",
+)
+
+
+def local_timezone() -> datetime.tzinfo:
+    """The current local timezone, looked up once per zone setting."""
+    sync_local_zone()
+    return _local_timezone()
+
+
+@local_cache
+def _local_timezone() -> datetime.tzinfo:
+    # https://stackoverflow.com/a/39079819
+    tz = datetime.datetime.now().astimezone().tzinfo
+    assert tz is not None  # astimezone() always returns an aware datetime
+    return tz
+
+
+def _local_offset_ms() -> int:
+    """UTC offset of `local_timezone` in ms."""
+    offset = local_timezone().utcoffset(None)
+    assert offset is not None  # a fixed offset timezone
+    return offset // ONE_MS
+
+
+# start of a row which is not blank and not a 4 digit date: NumPy reads 'today',
+# 'now', bare, signed and 5 digit years, which `fromisoformat` does not
+_NOT_ISO_ROW = re.compile(r"\n(?![0-9]...-..-..|\n|$)")
+
+
+def compile_parser(fmt: str) -> Callable[[str], datetime.datetime]:
+    """Parser for one layout: `fromisoformat` for ISO, else a fixed strptime format."""
+    if fmt == ISO:
+        return datetime.datetime.fromisoformat
+    strptime = datetime.datetime.strptime
+    return lambda s: strptime(s, fmt)
+
+
+def detect_format(sample: Sequence[str]) -> str | None:
+    """First entry of FORMATS which parses every non-empty sample line."""
+    values = [s.strip() for s in sample if s.strip()]
+    for fmt in FORMATS:
+        parser = compile_parser(fmt)
+        try:
+            for value in values:
+                parser(value)
+        except ValueError:
+            continue
+        return fmt
+    return None
+
+
+def to_epoch_ms(dt: datetime.datetime, is_local: bool = False) -> int:
+    """Epoch in ms of a parsed datetime, naive values are local or UTC."""
+    if dt.tzinfo is not None:
+        return int(dt.timestamp() * 1000)
+    ms = (dt - EPOCH) // ONE_MS
+    if is_local:
+        ms -= _local_offset_ms()
+    return ms
+
+
+def _parse_fallback(value: str) -> datetime.datetime:
+    from dateutil.parser import parse
+
+    parsed: datetime.datetime = parse(value)
+    return parsed
+
+
+def _parse_numpy(values: list[str], is_local: bool) -> list[str]:
+    """Vectorized ISO parsing, raises ValueError if any row is not plain ISO.
+
+    Chunks with rows NumPy reads unlike `fromisoformat` take the per row path.
+    """
+    if _NOT_ISO_ROW.search("\n" + "\n".join(values)):
+        raise ValueError("Not plain ISO datetimes")
+    np = _numpy()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # timezone suffixes are deprecated in NumPy
+        try:
+            dts = np.array(values, dtype="datetime64[ms]")
+        except Warning as e:
+            raise ValueError(str(e)) from None
+    ms = dts.astype(np.int64)
+    nat = np.isnat(dts)
+    if (((ms < MIN_EPOCH_MS) | (ms >= MAX_EPOCH_MS)) & ~nat).any():
+        raise ValueError("Datetimes out of range")  # year 0 and the like
+    if is_local:
+        ms -= _local_offset_ms()
+    out = ms.astype(str)
+    out[nat] = ""  # blank lines, like the per row path
+    result: list[str] = out.tolist()
+    return result
+
+
+def dt2epoch_stream(
+    lines: Iterable[str],
+    is_local: bool = False,
+    fmt: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    use_numpy: bool | None = None,
+    sample_size: int = 100,
+) -> Iterator[list[str]]:
+    """Convert a stream of datetimes, one per line, to epochs in ms chunk by chunk.
+
+    The layout is detected once from the first `sample_size` lines unless `fmt` is
+    given (a strptime format or "iso"). Rows not matching it fall back to the
+    generic `dateutil` parser, rows failing both yield an empty string.
+    """
+    if use_numpy is None:
+        use_numpy = _numpy() is not None
+    it = iter(lines)
+    sample = list(itertools.islice(it, sample_size))
+    if fmt is None:
+        fmt = detect_format(sample)
+        _log.debug(f"Detected datetime format {fmt}")
+    parse = compile_parser(fmt) if fmt is not None else _parse_fallback
+    it = itertools.chain(sample, it)
+
+    while chunk := [s.strip() for s in itertools.islice(it, chunk_size)]:
+        with span("parse"):
+            out = _dt2epoch_chunk(chunk, parse, is_local, use_numpy and fmt == ISO)
+        yield out
+
+
+def _dt2epoch_chunk(
+    chunk: list[str],
+    parse: Callable[[str], datetime.datetime],
+    is_local: bool,
+    use_numpy: bool,
+) -> list[str]:
+    if use_numpy:
+        try:
+            return _parse_numpy(chunk, is_local)
+        except ValueError:
+            pass  # some rows need the per row path
+    out = []
+    for value in chunk:
+        try:
+            out.append(str(to_epoch_ms(parse(value), is_local)))
+            continue
+        except ValueError:
+            pass
+        try:
+            out.append(str(to_epoch_ms(_parse_fallback(value), is_local)))
+        except (ValueError, OverflowError):
+            _log.debug(f"Cannot parse datetime {value!r}")
+            out.append("")
+    return out
@@ -0,0 +1,305 @@
+import collections
+import csv
+import dataclasses
+import datetime
+import functools
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Iterable, Iterator, Sequence
+
+from twlib.timeconv import (
+    CHUNK_SIZE,
+    DT_FMT,
+    EPOCH,
+    ISO,
+    OFFSET_BUCKET,
+    _date,
+    _parse_fallback,
+    _utc_offset,
+    compile_parser,
+    detect_format,
+    local_cache,
+    sync_local_zone,
+)
+
+""" Streaming rewrite of timestamp columns in CSV and JSONL files """
+
+_log = logging.getLogger(__name__)
+
+UNITS = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+LOCAL = "local"
+_ONE_US = datetime.timedelta(microseconds=1)
+
+
+def detect_unit(values: Iterable[Any]) -> str:
+    """Epoch unit by magnitude: below 1e11 is seconds (until year 5138), etc."""
+    largest = 0
+    for value in values:
+        try:
+            largest = max(largest, abs(int(value)))
+        except (TypeError, ValueError):
+            continue
+    for unit, limit in (("s", 10**11), ("ms", 10**14), ("us", 10**17)):
+        if largest < limit:
+            return unit
+    return "ns"
+
+
+@functools.cache
+def _zone(tz: str) -> datetime.tzinfo:
+    from zoneinfo import ZoneInfo
+
+    return ZoneInfo(tz)
+
+
+def check_timezone(tz: str) -> None:
+    """Raise ValueError for unknown timezone names."""
+    if tz == LOCAL:
+        return
+    try:
+        _zone(tz)
+    except (KeyError, ValueError) as e:  # ZoneInfoNotFoundError is a KeyError
+        raise ValueError(f"Unknown timezone {tz!r}") from e
+
+
+def _offset_seconds(aware: datetime.datetime) -> int:
+    offset = aware.utcoffset()
+    if offset is None:  # only naive datetimes have no offset
+        raise ValueError(f"Naive datetime {aware}")
+    return int(offset.total_seconds())
+
+
+@local_cache
+def _zone_offset(tz: str, bucket: int) -> int:
+    """UTC offset in seconds of tz for the UTC quarter hour `bucket`."""
+    if tz == LOCAL:
+        return _utc_offset(bucket)
+    utc = datetime.datetime.fromtimestamp(bucket * OFFSET_BUCKET, datetime.timezone.utc)
+    return _offset_seconds(utc.astimezone(_zone(tz)))
+
+
+@local_cache
+def _naive_offset(tz: str, bucket: int) -> int:
+    """UTC offset in seconds of tz for the wall clock quarter hour `bucket`."""
+    naive = EPOCH + datetime.timedelta(seconds=bucket * OFFSET_BUCKET)
+    aware = naive.astimezone() if tz == LOCAL else naive.replace(tzinfo=_zone(tz))
+    return _offset_seconds(aware)
+
+
+@functools.cache
+def _parser(fmt: str) -> Callable[[str], datetime.datetime]:
+    return compile_parser(fmt)
+
+
+@dataclass(frozen=True)
+class Converter:
+    """Convert one timestamp value, between epoch in `unit` and datetimes in `tz`.
+
+    `fmt` is the datetime layout written when converting to datetimes and parsed
+    when converting to epochs (strptime format or "iso"). "auto" values are
+    resolved from a sample of the input with `resolve`.
+    """
+
+    to: str  # "dt" or "epoch"
+    tz: str = "UTC"
+    unit: str = "auto"
+    fmt: str = "auto"
+
+    def resolve(self, sample: Sequence[Any]) -> "Converter":
+        if self.tz == LOCAL:
+            sync_local_zone()
+        unit, fmt = self.unit, self.fmt
+        if self.to == "dt":
+            unit = detect_unit(sample) if unit == "auto" else unit
+            fmt = DT_FMT if fmt == "auto" else fmt
+        else:
+            unit = "ms" if unit == "auto" else unit
+            if fmt == "auto":
+                fmt = detect_format([str(v) for v in sample]) or "auto"
+        _log.debug(f"Resolved {self.to} conversion: unit {unit}, format {fmt}")
+        return dataclasses.replace(self, unit=unit, fmt=fmt)
+
+    def __call__(self, value: Any) -> Any:
+        if self.to == "dt":
+            return self.format(int(value))
+        return self.epoch(str(value).strip())
+
+    def format(self, epoch: int) -> str:
+        us = epoch * 1_000_000 // UNITS[self.unit]
+        sec, us = divmod(us, 1_000_000)
+        offset = _zone_offset(self.tz, sec // OFFSET_BUCKET)
+        if self.fmt in (DT_FMT, "auto"):
+            day, rest = divmod(sec + offset, 86400)
+            hour, rest = divmod(rest, 3600)
+            return f"{_date(day)} {hour:02d}:{rest // 60:02d}:{rest % 60:02d}"
+        dt = EPOCH + datetime.timedelta(seconds=sec + offset, microseconds=us)
+        if self.fmt == ISO:
+            tzinfo = datetime.timezone(datetime.timedelta(seconds=offset))
+            return dt.replace(tzinfo=tzinfo).isoformat()
+        return dt.strftime(self.fmt)
+
+    def epoch(self, value: str) -> int:
+        try:
+            dt = _parser(self.fmt)(value) if self.fmt != "auto" else None
+        except ValueError:
+            dt = None
+        if dt is None:
+            dt = _parse_fallback(value)
+        if dt.tzinfo is not None:
+            us = (dt - EPOCH.replace(tzinfo=datetime.timezone.utc)) // _ONE_US
+        else:
+            us = (dt - EPOCH) // _ONE_US
+            us -= _naive_offset(self.tz, us // 1_000_000 // OFFSET_BUCKET) * 1_000_000
+        return us * UNITS[self.unit] // 1_000_000
+
+
+@dataclass
+class RewriteStats:
+    rows: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        seconds = self.seconds or 1e-9
+        return (
+            f"{self.rows} rows ({self.errors} unconvertible values) in "
+            f"{self.seconds:.2f}s: {self.rows / seconds:.0f} rows/s"
+        )
+
+
+def _convert_value(converter: Converter, value: Any) -> tuple[Any, bool]:
+    if value is None or value == "":
+        return value, True
+    try:
+        return converter(value), True
+    except (ValueError, TypeError, OverflowError):
+        _log.debug(f"Cannot convert {value!r}")
+        return value, False
+
+
+def _convert_rows(
+    converter: Converter, indexes: Sequence[int], rows: list[list[str]]
+) -> tuple[list[list[str]], int]:
+    """Convert CSV rows in place, return (rows, errors)."""
+    errors = 0
+    for row in rows:
+        for i in indexes:
+            if i < len(row):
+                new, ok = _convert_value(converter, row[i])
+                row[i] = str(new)
+                errors += not ok
+    return rows, errors
+
+
+def _convert_lines(
+    converter: Converter, fields: Sequence[str], lines: list[str]
+) -> tuple[list[str], int]:
+    """Convert JSONL lines, return (lines, errors), blank lines are dropped and
+    values other than objects are passed through."""
+    out, errors = [], 0
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        for name in fields if isinstance(record, dict) else ():
+            if name in record:
+                record[name], ok = _convert_value(converter, record[name])
+                errors += not ok
+        out.append(json.dumps(record, ensure_ascii=False))
+    return out, errors
+
+
+def _chunks(it: Iterator[Any], size: int) -> Iterator[list[Any]]:
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def _imap(
+    func: Callable[..., Any], args: tuple, chunks: Iterable[Any], workers: int
+) -> Iterator[Any]:
+    """`func(*args, chunk)` per chunk in order, at most 2 * workers chunks in flight."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield func(*args, chunk)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending: collections.deque = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, *args, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _peek(it: Iterator[Any], size: int) -> tuple[list[Any], Iterator[Any]]:
+    """First items of it for format detection, and an iterator still yielding them."""
+    first = list(itertools.islice(it, size))
+    return first, itertools.chain(first, it)
+
+
+def rewrite_csv(
+    fin: IO[str],
+    fout: IO[str],
+    columns: Sequence[str],
+    converter: Converter,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = 1,
+) -> RewriteStats:
+    """Rewrite the named columns of a CSV file with header, chunk by chunk."""
+    start = time.perf_counter()
+    reader, writer = csv.reader(fin), csv.writer(fout, lineterminator="\n")
+    header = next(reader, None)
+    if header is None:
+        return RewriteStats()
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"Columns not found: {', '.join(missing)}")
+    indexes = [header.index(c) for c in columns]
+    writer.writerow(header)
+
+    first, rows = _peek(reader, 1000)
+    sample = [r[i] for r in first for i in indexes if i < len(r) and r[i]]
+    converter = converter.resolve(sample)
+
+    stats = RewriteStats()
+    chunks = _chunks(rows, chunk_size)
+    for out, errors in _imap(_convert_rows, (converter, indexes), chunks, workers):
+        writer.writerows(out)
+        stats.rows += len(out)
+        stats.errors += errors
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def rewrite_jsonl(
+    fin: IO[str],
+    fout: IO[str],
+    fields: Sequence[str],
+    converter: Converter,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = 1,
+) -> RewriteStats:
+    """Rewrite the named top level fields of JSON lines, chunk by chunk."""
+    start = time.perf_counter()
+    first, lines = _peek(iter(fin), 1000)
+    sample = []
+    for line in first:
+        if line.strip() and isinstance(record := json.loads(line), dict):
+            sample += [record[f] for f in fields if record.get(f) not in (None, "")]
+    converter = converter.resolve(sample)
+
+    stats = RewriteStats()
+    chunks = _chunks(lines, chunk_size)
+    for out, errors in _imap(_convert_lines, (converter, fields), chunks, workers):
+        if out:
+            fout.write("\n".join(out) + "\n")
+        stats.rows += len(out)
+        stats.errors += errors
+    stats.seconds = time.perf_counter() - start
+    return stats
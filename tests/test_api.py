@@ -0,0 +1,103 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from twlib import api
+from twlib.environment import ROOT_DIR
+
+INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+
+
+def test_epoch2dt():
+    assert api.epoch2dt(1347517370000) == "2012-09-13 06:22:50"
+
+
+def test_epochs2dt():
+    result = api.epochs2dt(iter([1347517370000, "1347517370000", "x"]))
+    assert list(result) == ["2012-09-13 06:22:50", "2012-09-13 06:22:50", ""]
+
+
+def test_dt2epoch():
+    assert api.dt2epoch("2012-09-13 06:22:50") == 1347517370000
+    with pytest.raises(ValueError, match="Invalid datetime"):
+        api.dt2epoch("no date")
+
+
+def test_dts2epoch():
+    values = ["2012-09-13 06:22:50", "garbage", "2012-09-13 06:22:51"]
+    assert list(api.dts2epoch(values)) == [1347517370000, None, 1347517371000]
+
+
+def test_relative():
+    assert api.relative(Path("/a/b/c.txt"), "/a/d/e.txt") == "../d/e.txt"
+    pairs = [("/a/b/c.txt", "/a/b/e.txt"), "/a/b/c.txt\t/x/y.txt", ("a", "b")]
+    assert list(api.relatives(pairs)) == ["e.txt", "../../x/y.txt", ""]
+
+
+def test_heic2img(tmp_path, capsys):
+    out = api.heic2img(INPUT_FILE, "png", tmp_path / "out.png", max_size=64)
+    assert out == tmp_path / "out.png"
+    assert max(api.image_info(out).size) == 64
+    assert capsys.readouterr().out == ""
+
+
+def test_heic2imgs(tmp_path):
+    results = list(
+        api.heic2imgs(
+            [INPUT_FILE, tmp_path / "missing.heic"],
+            "jpg",
+            out_dir=tmp_path,
+            thumbnail=True,
+        )
+    )
+    assert results[0].error is None
+    assert results[0].out_file == tmp_path / "input.jpg"
+    assert results[1].error is not None
+
+
+def test_image_info():
+    info = api.image_info(INPUT_FILE)
+    assert info.format == "HEIF"
+    assert info.bands == ("R", "G", "B")
+
+
+def test_revert_lks(tmp_path):
+    target = tmp_path / "target.txt"
+    target.write_text("target")
+    tree = tmp_path / "tree"
+    (tree / ".venv").mkdir(parents=True)
+    os.symlink(target, tree / "lk")
+    os.symlink(target, tree / ".venv" / "lk")
+
+    result = api.revert_lks(tree, dry_run=True)
+    assert (result.links, result.stats) == (1, None)
+    assert (tree / "lk").is_symlink()
+
+    result = api.revert_lks(tree)
+    assert result.links == 1 and result.stats.files == 1
+    assert (tree / "lk").read_text() == "target"
+    assert (tree / ".venv" / "lk").is_symlink()
+    with pytest.raises(ValueError, match="dedup"):
+        api.revert_lks(tree, dedup="copy")
+
+
+def test_rewrite_ts():
+    fout = io.StringIO()
+    stats = api.rewrite_ts(io.StringIO("id,ts\n1,1347517370000\n"), fout, ["ts"])
+    assert stats.rows == 1
+    assert fout.getvalue() == "id,ts\n1,2012-09-13 06:22:50\n"
+    with pytest.raises(ValueError, match="target"):
+        api.rewrite_ts(io.StringIO(), io.StringIO(), ["ts"], to="x")
+
+
+def test_git_urls(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / ".git").mkdir(parents=True)
+    (repo / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (repo / ".git" / "config").write_text(
+        '[remote "origin"]\n\turl = git@github.com:sysid/twlib.git\n'
+    )
+    (url,) = api.git_urls(tmp_path)
+    assert url.browse_url == "https://github.com/sysid/twlib.git"
@@ -0,0 +1,124 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from twlib import client, daemon
+
+
+def test_request_roundtrip():
+    env = {"TZ": "UTC", "EMPTY": "", "EQ": "a=b"}
+    payload = client.encode_request("twlib", ["relative", "a b", ""], "/tmp", env)
+    assert client.decode_request(payload) == (
+        "twlib",
+        ["relative", "a b", ""],
+        "/tmp",
+        env,
+    )
+
+
+def test_socket_path(monkeypatch):
+    monkeypatch.delenv("TWLIB_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert client.socket_path() == f"/run/user/1000/twlib-{os.getuid()}.sock"
+    monkeypatch.setenv("TWLIB_SOCKET", "/tmp/x.sock")
+    assert client.socket_path() == "/tmp/x.sock"
+
+
+def test_connect_without_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv("TWLIB_SOCKET", str(tmp_path / "none.sock"))
+    assert client.connect() is None
+
+
+def test_remove_stale(tmp_path):
+    path = str(tmp_path / "stale.sock")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.close()  # bound but not listening
+    daemon._remove_stale(path)
+    assert not os.path.exists(path)
+
+
+def _run_client(env: dict, *argv: str, stdin: str = "") -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "twlib.client", *argv],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+
+@pytest.fixture(scope="module")
+def served(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("daemon") / "twlib.sock")
+    env = {**os.environ, "TWLIB_SOCKET": path, "TZ": "UTC"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "twlib", "serve"], env=env, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while not os.path.exists(path):
+        assert proc.poll() is None and time.monotonic() < deadline
+        time.sleep(0.05)
+    yield env
+    proc.terminate()
+    proc.wait(timeout=10)
+    assert not os.path.exists(path)
+
+
+def test_daemon_command(served):
+    result = _run_client(served, "epoch2dt", "1347517370000")
+    assert result.returncode == 0
+    assert result.stdout == "2012-09-13 06:22:50\n"
+
+
+def test_daemon_stdin_and_cwd(served, tmp_path):
+    pairs = tmp_path / "pairs.tsv"
+    pairs.write_text("/a/b/c.txt\t/a/d/e.txt\n")
+    result = _run_client(served, "relative", "-f", "-", stdin=pairs.read_text())
+    assert result.stdout == "../d/e.txt\n"
+    result = subprocess.run(
+        [sys.executable, "-m", "twlib.client", "relative", "-f", "pairs.tsv"],
+        capture_output=True,
+        text=True,
+        env=served,
+        cwd=tmp_path,
+    )
+    assert result.returncode == 0
+    assert result.stdout == "../d/e.txt\n"
+
+
+def test_daemon_environment(served):
+    result = _run_client(
+        {**served, "TZ": "Europe/Berlin"}, "epoch2dt", "-l", "1347517370000"
+    )
+    assert result.stdout == "2012-09-13 08:22:50\n"
+
+
+def test_daemon_closed_stdin(served):
+    result = subprocess.run(
+        ["sh", "-c", f"exec {sys.executable} -m twlib.client epoch2dt <&-"],
+        capture_output=True,
+        text=True,
+        env=served,
+        timeout=30,
+    )
+    assert result.returncode == 0
+    assert result.stdout == ""  # read from /dev/null, not from the connection
+
+
+def test_daemon_exit_code(served):
+    result = _run_client(served, "relative", "a", "b")
+    assert result.returncode == 1
+    assert "absolute" in result.stderr
+    assert _run_client(served, "nosuch").returncode == 2
+
+
+def test_in_process_fallback(tmp_path):
+    env = {**os.environ, "TWLIB_SOCKET": str(tmp_path / "none.sock"), "TZ": "UTC"}
+    result = _run_client(env, "epoch2dt", "1347517370000")
+    assert result.returncode == 0
+    assert result.stdout == "2012-09-13 06:22:50\n"
@@ -0,0 +1,70 @@
+import array
+import io
+import struct
+
+import pytest
+
+from twlib.envelope import MAGIC, read_envelope, write_envelope
+from twlib.lib import deserialize_from_base64, serialize_to_base64
+
+BLOB = bytes(range(256)) * 64
+
+
+def roundtrip(obj, compression):
+    out = io.BytesIO()
+    write_envelope(obj, out.write, compression)
+    data = out.getvalue()
+    assert data.startswith(MAGIC)
+    n_buffers = struct.unpack_from("<I", data, len(MAGIC) + 2)[0]
+    fp = io.BytesIO(data)
+    fp.read(len(MAGIC))
+    return read_envelope(fp), n_buffers
+
+
+@pytest.mark.parametrize("compression", ("none", "zlib", "lzma"))
+def test_envelope_roundtrip(compression):
+    view = memoryview(array.array("d", range(2048)))
+    obj = {"bytes": BLOB, "view": view, "array": bytearray(BLOB), "small": b"x"}
+    result, n_buffers = roundtrip(obj, compression)
+    assert n_buffers == 3  # "small" stays in band
+    assert result["bytes"] == BLOB and type(result["bytes"]) is bytes
+    assert result["array"] == BLOB and type(result["array"]) is bytearray
+    assert result["view"].format == "d" and result["view"].tolist() == view.tolist()
+    assert result["small"] == b"x"
+
+
+def test_envelope_shared_buffers():
+    shared = bytearray(BLOB)
+    obj = {"a": shared, "b": shared, "blobs": [BLOB] * 5}
+    result, n_buffers = roundtrip(obj, "none")
+    assert n_buffers == 2
+    assert result["a"] is result["b"]
+    assert result["blobs"] == [BLOB] * 5
+
+
+def test_envelope_numpy():
+    np = pytest.importorskip("numpy")
+    arr = np.arange(10_000, dtype=np.float32).reshape(100, 100)
+    obj = {"arr": arr, "t": arr.T, "s": arr[::2, ::2]}
+    result, n_buffers = roundtrip(obj, "zlib")
+    assert n_buffers == 3  # NumPy copies the strided view to bytes
+    for key, value in obj.items():
+        assert (result[key] == value).all()
+
+
+def test_envelope_errors():
+    with pytest.raises(ValueError, match="compression"):
+        write_envelope([], io.BytesIO().write, "bz2")
+    out = io.BytesIO()
+    write_envelope(BLOB, out.write, "zlib")
+    fp = io.BytesIO(out.getvalue()[len(MAGIC) : -10])
+    with pytest.raises(ValueError, match="Truncated"):
+        read_envelope(fp)
+
+
+@pytest.mark.parametrize("compression", (None, "none", "zlib", "lzma"))
+def test_serialize_to_base64_compression(compression):
+    obj = ["file1", BLOB]
+    text = serialize_to_base64(obj, compression=compression)
+    assert text.startswith("AFRXT") is (compression is not None)
+    assert deserialize_from_base64(text) == obj
@@ -1,6 +1,65 @@
+import subprocess
+import sys
+
+import pytest
+
+from twlib import environment
 from twlib.environment import Os, config
 
 
 def test_os():
     assert config.os == 2
     assert config.os == Os.MAC
+
+
+def test_import_does_not_construct_settings():
+    code = (
+        "import sys, twlib.environment as e; "
+        "print('pydantic' in sys.modules, e.get_config.cache_info().currsize)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.split() == ["False", "0"]
+
+
+def test_config_is_memoized():
+    assert environment.get_config() is environment.get_config()
+    assert environment.config is environment.get_config()
+
+
+def test_reload_config(monkeypatch):
+    before = environment.get_config()
+    monkeypatch.setenv("TWBM_DB_URL", "sqlite:///tmp/other.db")
+    assert environment.get_config() is before
+    config = environment.reload_config()
+    assert config is not before
+    assert config.dbfile == "tmp/other.db"
+    monkeypatch.delenv("TWBM_DB_URL")
+    assert environment.reload_config().dbfile == "db/bm.db"
+
+
+def test_reload_config_timezone(monkeypatch):
+    import datetime
+    import time
+
+    from twlib.timeconv import local_timezone
+
+    monkeypatch.setenv("TZ", "UTC")
+    environment.reload_config()
+    assert local_timezone().utcoffset(None) == datetime.timedelta(0)
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    environment.reload_config()
+    assert local_timezone().utcoffset(None) == datetime.timedelta(hours=9)
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_detect_os_unknown(monkeypatch):
+    monkeypatch.setattr(environment.platform, "system", lambda: "Plan9")
+    environment.detect_os.cache_clear()
+    try:
+        with pytest.raises(RuntimeError, match="Plan9"):
+            environment.detect_os()
+    finally:
+        environment.detect_os.cache_clear()
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from twlib.exclude import ExcludeMatcher
+from twlib.lks import iter_symlinks
+
+SPEC = [".venv", "*.pyc", "/build", "docs/_build/", "src/**/gen", "tmp*/"]
+
+
+@pytest.mark.parametrize(
+    ("path", "is_dir", "expected"),
+    (
+        ("a/.venv/x", False, True),
+        ("a/venv/x", False, False),
+        ("x.pyc", False, True),
+        ("a/b.pyc/c", False, True),
+        ("build/x", False, True),
+        ("a/build/x", False, False),  # anchored to the root
+        ("docs/_build", False, False),  # directories only
+        ("docs/_build", True, True),
+        ("docs/_build/x", False, True),
+        ("src/gen/x", False, True),
+        ("src/a/b/gen", False, True),
+        ("gen", False, False),
+        ("tmp1", False, False),
+        ("a/tmp1/x", False, True),
+        ("./a/.venv", False, True),
+    ),
+)
+def test_match(path, is_dir, expected):
+    assert ExcludeMatcher(SPEC).match(path, is_dir) is expected
+
+
+def test_negation():
+    matcher = ExcludeMatcher(["*.log", "!keep.log", "logs/", "!logs/a.log"])
+    assert matcher.match("x/a.log")
+    assert not matcher.match("x/keep.log")
+    assert matcher.match("logs/a.log")  # parent stays excluded, like git
+
+
+def test_filter():
+    paths = ["a.py", "b.pyc", Path("build/x.py"), "src/build/y.py", "s/.venv/z"]
+    assert list(ExcludeMatcher(SPEC).filter(paths)) == ["a.py", "src/build/y.py"]
+
+
+def test_iter_symlinks_patterns(tmp_path):
+    (tmp_path / "target").write_text("x")
+    for rel in ("a/lk", "build/lk", "a/build/lk", "a/b.tmp/lk", "a/c.lk"):
+        link = tmp_path / rel
+        link.parent.mkdir(parents=True, exist_ok=True)
+        link.symlink_to(tmp_path / "target")
+    found = iter_symlinks(tmp_path, ["/build", "*.tmp/", "*.lk"])
+    assert [f.relative_to(tmp_path).as_posix() for f in found] == [
+        "a/lk",
+        "a/build/lk",
+    ]
+
+
+@pytest.mark.parametrize(
+    "path", ("a/.git/x", Path("a/.git/x"), Path("/r/node_modules"), "a/git", Path("/"))
+)
+def test_names_only(path):
+    names = ExcludeMatcher([".git", "node_modules"])
+    general = ExcludeMatcher([".git", "node_modules", "!keep"])  # ordered rules
+    assert names._names_only and not general._names_only
+    assert names.match(path) is general.match(path)
+    assert list(names.filter([path])) == list(general.filter([path]))
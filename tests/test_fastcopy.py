@@ -0,0 +1,58 @@
+import errno
+import os
+import sys
+
+import pytest
+
+from twlib import fastcopy
+from twlib.fastcopy import CopyEngine, copy_file
+
+
+@pytest.fixture
+def src_tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "a.txt").write_bytes(b"a" * 100_000)
+    (src / "sub" / "b.txt").write_text("b")
+    os.symlink("a.txt", src / "lk")
+    os.symlink("sub", src / "lk_dir")
+    os.utime(src / "sub" / "b.txt", (1_000_000, 1_000_000))
+    return src
+
+
+def test_copy_file(src_tree, tmp_path):
+    method = copy_file(src_tree / "a.txt", tmp_path / "a.txt")
+    assert method in ("reflink", "copy_file_range", "sendfile", "copy2")
+    assert (tmp_path / "a.txt").read_bytes() == b"a" * 100_000
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_copy_file_fallback(src_tree, tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    monkeypatch.setattr(fastcopy, "_unsupported", set())
+    monkeypatch.setattr(
+        fastcopy,
+        "_METHODS",
+        (("reflink", unsupported), ("sendfile", fastcopy._sendfile)),
+    )
+    monkeypatch.setattr(fastcopy, "_LINUX", True)
+    assert copy_file(src_tree / "a.txt", tmp_path / "a.txt") == "sendfile"
+    assert (tmp_path / "a.txt").read_bytes() == b"a" * 100_000
+    assert len(fastcopy._unsupported) == 1
+
+
+@pytest.mark.parametrize("workers", (1, 3))
+def test_copytree(src_tree, tmp_path, workers):
+    dst = tmp_path / "dst"
+    with CopyEngine(workers=workers) as engine:
+        engine.copytree(src_tree, dst)
+        engine.copy_file(src_tree / "a.txt", tmp_path / "single.txt")
+    assert (dst / "a.txt").read_bytes() == b"a" * 100_000
+    assert (dst / "sub" / "b.txt").stat().st_mtime == 1_000_000
+    assert os.readlink(dst / "lk") == "a.txt"
+    assert os.readlink(dst / "lk_dir") == "sub"
+    assert engine.stats.files == 3
+    assert engine.stats.bytes == 200_001
+    assert "MB/s" in str(engine.stats)
@@ -1,6 +1,21 @@
+import json
+
 import pytest
+from typer.testing import CliRunner
+
+from twlib import git_open
+from twlib.git_open import (
+    RepoUrl,
+    UrlCache,
+    extract_url,
+    find_git_dir,
+    get_git_url,
+    parse_git_config,
+    scan_repos,
+)
+from twlib.main import app as twlib
 
-from twlib.git_open import extract_url, get_git_url
+runner = CliRunner()
 
 
 @pytest.mark.parametrize(
@@ -37,3 +52,121 @@ def test_extract_url(url, result):
 )
 def test_get_git_url(path, url):
     assert url in get_git_url(path)
+
+
+CONFIG = """
+[core]
+	bare = false
+[remote "origin"]
+	url = git@github.com:sysid/twlib.git  ; comment
+	fetch = +refs/heads/*:refs/remotes/origin/*
+[remote "work"]
+	url = "gl:team/twlib.git"
+[branch "main"]
+	remote = origin
+[branch "feature"]
+	remote = work
+[url "https://gitlab.example.com/"]
+	insteadOf = gl:
+	insteadOf = gitlab:
+"""
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    git_dir = tmp_path / "repo" / ".git"
+    (git_dir / "worktrees" / "wt").mkdir(parents=True)
+    (git_dir / "config").write_text(CONFIG)
+    (git_dir / "HEAD").write_text("ref: refs/heads/feature\n")
+    (tmp_path / "repo" / "src" / "pkg").mkdir(parents=True)
+    # linked worktree: .git file -> per worktree git dir with commondir
+    wt_git = git_dir / "worktrees" / "wt"
+    (wt_git / "commondir").write_text("../..\n")
+    (wt_git / "HEAD").write_text("ref: refs/heads/main\n")
+    (tmp_path / "wt").mkdir()
+    (tmp_path / "wt" / ".git").write_text(f"gitdir: {wt_git}\n")
+    return tmp_path
+
+
+def test_parse_git_config():
+    config = parse_git_config(CONFIG)
+    assert config[("remote", "origin")]["url"] == ["git@github.com:sysid/twlib.git"]
+    assert config[("url", "https://gitlab.example.com/")]["insteadof"] == [
+        "gl:",
+        "gitlab:",
+    ]
+
+
+@pytest.mark.parametrize(
+    ("path", "remote", "branch", "url"),
+    (
+        ("repo/src/pkg", None, None, "https://gitlab.example.com/team/twlib.git"),
+        ("repo", None, "main", "git@github.com:sysid/twlib.git"),
+        ("repo", "origin", "feature", "git@github.com:sysid/twlib.git"),
+        ("repo", "nope", None, ""),
+        ("wt", None, None, "git@github.com:sysid/twlib.git"),  # worktree on main
+    ),
+)
+def test_get_git_url_from_config(repo, path, remote, branch, url):
+    assert get_git_url(str(repo / path), remote=remote, branch=branch) == url
+
+
+def test_find_git_dir(repo):
+    git_dir, common_dir = find_git_dir(str(repo / "wt"))
+    assert git_dir == str(repo / "repo" / ".git" / "worktrees" / "wt")
+    assert common_dir == str(repo / "repo" / ".git")
+    assert find_git_dir("/") is None
+
+
+@pytest.mark.parametrize(
+    ("url", "result"),
+    (
+        ("git@github.com:sysid/twlib.git", "https://github.com/sysid/twlib.git"),
+        ("gitlab.example.com:team/x.git", "https://gitlab.example.com/team/x.git"),
+    ),
+)
+def test_extract_url_scp(url, result):
+    assert extract_url(url) == result
+
+
+def test_scan_repos(repo, mocker):
+    nested = repo / "repo" / "vendor" / "lib"
+    (nested / ".git").mkdir(parents=True)
+    (nested / ".git" / "config").write_text('[remote "origin"]\n url = gl:x/lib\n')
+    (repo / "plain" / "node_modules" / "dep" / ".git").mkdir(parents=True)
+
+    repos = list(scan_repos(repo, workers=2))
+    assert [(r.path, r.browse_url) for r in repos] == [
+        (str(repo / "repo"), "https://gitlab.example.com/team/twlib.git"),
+        (str(repo / "wt"), "https://github.com/sysid/twlib.git"),
+    ]
+    assert len(list(scan_repos(repo, nested=True))) == 3
+
+    cache = UrlCache()
+    list(scan_repos(repo, cache=cache))
+    spy = mocker.spy(git_open, "read_git_config")
+    assert list(scan_repos(repo, cache=cache)) == repos
+    assert cache.hits == 2 and spy.call_count == 0
+
+
+def test_url_cache_lru(tmp_path):
+    cache = UrlCache(tmp_path / "urls.json", max_entries=2)
+    repos = {k: RepoUrl(k, "origin", f"git@github.com:u/{k}.git", None) for k in "abc"}
+    cache.put("a", [1], repos["a"])
+    cache.put("b", [1], repos["b"])
+    assert cache.get("a", [1]) == repos["a"]  # b is least recently used now
+    cache.put("c", [1], repos["c"])
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.get("b", [1]) is None
+    cache.save()
+    assert list(UrlCache(tmp_path / "urls.json", max_entries=1).entries) == ["c"]
+
+
+def test_git_urls_cli(repo, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    for _ in range(2):  # second run from the cache file
+        result = runner.invoke(twlib, ["git-urls", str(repo), "-f", "json"])
+        assert result.exit_code == 0
+        data = json.loads(result.stdout)
+        assert [d["remote"] for d in data] == ["work", "origin"]
+    assert (tmp_path / "cache" / "twlib" / "git_urls.json").exists()
@@ -0,0 +1,112 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.environment import ROOT_DIR
+from twlib.image import (
+    BatchSummary,
+    ConvertOptions,
+    _image_module,
+    convert_batch,
+    convert_image,
+    iter_inputs,
+    plan_outputs,
+)
+from twlib.main import app as twlib
+
+runner = CliRunner()
+
+INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+
+
+@pytest.fixture
+def heic_dir(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    shutil.copy(INPUT_FILE, src / "a.heic")
+    shutil.copy(INPUT_FILE, src / "sub" / "b.HEIC")
+    (src / "c.heic").write_bytes(b"not an image")
+    (src / "ignored.txt").write_text("x")
+    return src
+
+
+class TestIterInputs:
+    def test_directory(self, heic_dir):
+        result = [rel for _, rel in iter_inputs([str(heic_dir)])]
+        assert result == [Path("a.heic"), Path("c.heic"), Path("sub/b.HEIC")]
+
+    def test_glob(self, heic_dir):
+        result = [f.name for f, _ in iter_inputs([f"{heic_dir}/**/*.heic"])]
+        assert result == ["a.heic", "c.heic"]
+
+    def test_stdin(self, heic_dir, monkeypatch):
+        monkeypatch.setattr("sys.stdin", [f"{heic_dir}/a.heic\n", "\n"])
+        assert [f for f, _ in iter_inputs(["-"])] == [heic_dir / "a.heic"]
+
+
+class TestPlanOutputs:
+    def test_out_dir(self, heic_dir, tmp_path):
+        jobs = plan_outputs(iter_inputs([str(heic_dir)]), mode="png", out_dir=tmp_path)
+        assert [out for _, out in jobs] == [
+            tmp_path / "a.png",
+            tmp_path / "c.png",
+            tmp_path / "sub" / "b.png",
+        ]
+
+    def test_collision(self, heic_dir, tmp_path):
+        out_dir = tmp_path / "out"
+        inputs = [str(heic_dir / "a.heic"), str(heic_dir / "sub" / "b.HEIC")]
+        (heic_dir / "sub" / "a.heic").write_bytes(b"")
+        inputs.append(str(heic_dir / "sub" / "a.heic"))
+        with pytest.raises(ValueError, match="both map to"):
+            plan_outputs(iter_inputs(inputs), mode="jpg", out_dir=out_dir)
+        result = runner.invoke(twlib, ["heic2img", "-o", str(out_dir), *inputs])
+        assert result.exit_code == 2
+        assert "both map to" in result.output
+        assert not out_dir.exists()
+
+    @pytest.mark.parametrize("workers", (1, 2))
+    def test_convert_batch(self, heic_dir, tmp_path, workers):
+        out_dir = tmp_path / "out"
+        jobs = plan_outputs(iter_inputs([str(heic_dir)]), mode="jpg", out_dir=out_dir)
+        results = list(convert_batch(jobs, workers=workers))
+
+        assert [r.input_file.name for r in results] == ["a.heic", "c.heic", "b.HEIC"]
+        assert [r.error is None for r in results] == [True, False, True]
+        assert (out_dir / "a.jpg").exists()
+        assert (out_dir / "sub" / "b.jpg").exists()
+
+        summary = BatchSummary(seconds=1.0)
+        for r in results:
+            summary.add(r)
+        assert summary.files == 3
+        assert summary.errors == 1
+        assert "files/s" in str(summary)
+
+
+class TestReducedDecode:
+    @pytest.mark.parametrize(
+        ("options", "size"),
+        (
+            (ConvertOptions(max_size=256), (192, 256)),
+            (ConvertOptions(max_size=1024), (768, 1024)),
+            (ConvertOptions(thumbnail=True), (240, 320)),
+            (ConvertOptions(max_size=100, thumbnail=True), (75, 100)),
+        ),
+    )
+    def test_convert_image_max_size(self, tmp_path, options, size):
+        out_file = convert_image(INPUT_FILE, "jpg", tmp_path / "out.jpg", options)
+        with _image_module().open(out_file) as img:
+            assert img.size == size
+
+    def test_thumbnail_jpeg_covers_box(self, tmp_path):
+        Image = _image_module()
+        Image.new("RGB", (1600, 1200), "red").save(tmp_path / "in.jpg")
+        options = ConvertOptions(max_size=300, thumbnail=True)
+        out_file = convert_image(
+            tmp_path / "in.jpg", "png", tmp_path / "out.png", options
+        )
+        with Image.open(out_file) as img:
+            assert img.size == (300, 225)  # not the 1/8 scale draft of 200x150
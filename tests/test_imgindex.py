@@ -0,0 +1,54 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.environment import ROOT_DIR
+from twlib.imgindex import read_metadata, scan, write_sqlite
+from twlib.main import app as twlib
+
+INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def img_dir(tmp_path):
+    shutil.copy(INPUT_FILE, tmp_path / "a.heic")
+    (tmp_path / "b.jpg").write_bytes(b"broken")
+    return tmp_path
+
+
+def test_read_metadata():
+    meta = read_metadata(INPUT_FILE)
+    assert meta.error is None
+    assert (meta.format, meta.width, meta.height) == ("HEIF", 3024, 4032)
+    assert meta.exif_datetime == "2022:08:14 17:46:40"
+    assert meta.has_icc is True
+    assert json.loads(meta.thumbnails) == [320]
+
+
+def test_read_metadata_error(img_dir):
+    meta = read_metadata(img_dir / "b.jpg")
+    assert meta.error is not None
+    assert meta.bytes == 6
+
+
+def test_write_sqlite(img_dir, tmp_path):
+    db_file = tmp_path / "index.db"
+    paths = [img_dir / "a.heic", img_dir / "b.jpg"]
+    assert write_sqlite(scan(paths, workers=2), db_file, batch_size=1) == 2
+    assert write_sqlite(scan(paths), db_file) == 2  # upsert, no duplicates
+    rows = sqlite3.connect(db_file).execute(
+        "SELECT width, error IS NULL FROM images ORDER BY path"
+    )
+    assert rows.fetchall() == [(3024, 1), (None, 0)]
+
+
+def test_scan_img_cli(img_dir):
+    result = runner.invoke(twlib, ["scan-img", str(img_dir)])
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line[0] == "{"]
+    assert [m["path"].rsplit("/", 1)[-1] for m in lines] == ["a.heic", "b.jpg"]
@@ -1,7 +1,18 @@
+import base64
+import io
+import pickle
+import textwrap
 from pathlib import Path
 
 import pytest
-from twlib.lib import deserialize_from_base64, serialize_to_base64, filter_path
+from twlib import lib
+from twlib.lib import (
+    deserialize_from_base64,
+    deserialize_from_base64_file,
+    serialize_to_base64,
+    serialize_to_base64_file,
+    filter_path,
+)
 
 FILES = [
     "file1____________________________________________________________",
@@ -41,6 +52,30 @@ aARoBWUu
     assert obj == FILES
 
 
+@pytest.mark.parametrize("line_length", (80, 7, 1))
+@pytest.mark.parametrize("size", (0, 1, 2, 100, 5000))
+def test_serialize_to_base64_file(mocker, tmp_path, size, line_length):
+    mocker.patch.object(lib, "CHUNK_SIZE", 3 * 11)  # many blocks per payload
+    obj = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    expected = textwrap.fill(
+        base64.b64encode(pickle.dumps(obj)).decode(), width=line_length
+    )
+    assert serialize_to_base64(obj, line_length) == expected
+
+    text, binary = io.StringIO(), io.BytesIO()
+    serialize_to_base64_file(obj, text, line_length)
+    serialize_to_base64_file(obj, binary, line_length)
+    assert text.getvalue() == binary.getvalue().decode() == expected
+
+    assert deserialize_from_base64_file(io.StringIO(expected)) == obj
+    assert deserialize_from_base64_file(io.BytesIO(expected.encode())) == obj
+    path = tmp_path / "obj.b64"
+    serialize_to_base64_file(obj, path, line_length)
+    assert deserialize_from_base64_file(path) == obj
+    mocker.patch.object(lib, "MMAP_THRESHOLD", 0)
+    assert deserialize_from_base64_file(path) == obj
+
+
 @pytest.mark.parametrize(
     ("dir_", "expected"),
     (
@@ -0,0 +1,254 @@
+import io
+import json
+import os
+import shutil
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from tests.conftest import REF_PROJ
+from twlib import fastcopy
+from twlib.fastcopy import CopyEngine
+from twlib.lib import filter_path
+from twlib.lks import (
+    TMP_SUFFIX,
+    Plan,
+    Resolver,
+    execute_plan,
+    group_by_target,
+    iter_symlinks,
+    make_plan,
+    read_journal,
+    revert_symlinks,
+)
+from twlib.main import app as twlib
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / ".git" / "objects").mkdir(parents=True)
+    (tmp_path / "node_modules" / "x").mkdir(parents=True)
+    (tmp_path / "target.txt").write_text("x")
+    os.symlink(tmp_path / "target.txt", tmp_path / "a" / "lk1")
+    os.symlink(tmp_path / "a", tmp_path / "a" / "b" / "lk_dir")
+    os.symlink(tmp_path / "target.txt", tmp_path / ".git" / "objects" / "lk")
+    os.symlink(tmp_path / "target.txt", tmp_path / "node_modules" / "x" / "lk")
+    return tmp_path
+
+
+def test_iter_symlinks(tree):
+    result = sorted(iter_symlinks(tree, [".git", "node_modules"]))
+    assert result == [tree / "a" / "b" / "lk_dir", tree / "a" / "lk1"]
+
+
+def test_iter_symlinks_excluded_root(tree):
+    assert list(iter_symlinks(tree / ".git", [".git"])) == []
+
+
+@pytest.mark.parametrize("excludes", ([".venv"], [".venv", ".git"], []))
+def test_iter_symlinks_matches_rglob(excludes):
+    expected = [
+        f
+        for f in REF_PROJ.rglob("*")
+        if f.is_symlink() and not filter_path(f, excludes)
+    ]
+    assert sorted(iter_symlinks(REF_PROJ, excludes)) == sorted(expected)
+
+
+@pytest.fixture
+def chains(tmp_path):
+    (tmp_path / "real" / "sub").mkdir(parents=True)
+    (tmp_path / "real" / "sub" / "f.txt").write_text("f")
+    os.symlink("real", tmp_path / "l1")
+    os.symlink("l1/sub", tmp_path / "l2")
+    os.symlink(tmp_path / "l2" / "f.txt", tmp_path / "l3")
+    os.symlink("../l1/../l3", tmp_path / "real" / "up")
+    os.symlink("missing", tmp_path / "dangling")
+    return tmp_path
+
+
+@pytest.mark.parametrize("name", ("l1", "l2", "l3", "real/up", "dangling", "l2/f.txt"))
+def test_resolver_matches_resolve(chains, name):
+    assert Resolver().resolve(chains / name) == (chains / name).resolve()
+
+
+def test_resolver_memoizes(chains):
+    resolver = Resolver()
+    resolver.resolve(chains / "l3")
+    misses = resolver.misses
+    resolver.resolve(chains / "l3")
+    resolver.resolve(chains / "l2")
+    assert resolver.misses == misses
+    assert resolver.hits > 0
+
+
+def test_resolver_loop(tmp_path):
+    os.symlink("b", tmp_path / "a")
+    os.symlink("a", tmp_path / "b")
+    with pytest.raises(RuntimeError):
+        Resolver().resolve(tmp_path / "a")
+
+
+def test_group_by_target(chains):
+    links = [chains / "l3", chains / "l1", chains / "real" / "up"]
+    groups = group_by_target(links, Resolver())
+    assert list(groups.values()) == [
+        [chains / "l3", chains / "real" / "up"],
+        [chains / "l1"],
+    ]
+
+
+@pytest.fixture
+def farm(tmp_path):
+    (tmp_path / "store" / "dir").mkdir(parents=True)
+    (tmp_path / "store" / "file.txt").write_text("file")
+    (tmp_path / "store" / "dir" / "x.txt").write_text("x")
+    for i in range(3):
+        (tmp_path / "farm" / str(i)).mkdir(parents=True)
+        os.symlink(tmp_path / "store" / "file.txt", tmp_path / "farm" / str(i) / "f")
+        os.symlink(tmp_path / "store" / "dir", tmp_path / "farm" / str(i) / "d")
+    return tmp_path
+
+
+def test_revert_dedup_hardlink(farm):
+    result = runner.invoke(
+        twlib, ["revert-lks", "--dedup", "hardlink", str(farm / "farm")]
+    )
+    assert result.exit_code == 0
+    inodes = {(farm / "farm" / str(i) / "f").stat().st_ino for i in range(3)}
+    assert len(inodes) == 1
+    assert inodes != {(farm / "store" / "file.txt").stat().st_ino}
+    inodes = {(farm / "farm" / str(i) / "d" / "x.txt").stat().st_ino for i in range(3)}
+    assert len(inodes) == 1
+    assert not any(f.is_symlink() for f in (farm / "farm").rglob("*"))
+
+
+def test_revert_dedup_move(farm):
+    result = runner.invoke(
+        twlib, ["revert-lks", "-m", "--dedup", "reflink", str(farm / "farm")]
+    )
+    assert result.exit_code == 0
+    assert not (farm / "store" / "file.txt").exists()
+    for i in range(3):
+        assert (farm / "farm" / str(i) / "f").read_text() == "file"
+    assert (farm / "farm" / "0" / "dir" / "x.txt").read_text() == "x"  # moved as 'dir'
+    assert (farm / "farm" / "1" / "d" / "x.txt").read_text() == "x"
+    assert (farm / "farm" / "2" / "d" / "x.txt").read_text() == "x"
+
+
+def test_revert_workers_chained(farm, monkeypatch):
+    """A link into a directory copied in parallel waits for that copy."""
+    copy_file = fastcopy.copy_file
+
+    def slow_copy(src, dst):
+        time.sleep(0.05)
+        return copy_file(src, dst)
+
+    monkeypatch.setattr(fastcopy, "copy_file", slow_copy)
+    tree = farm / "farm" / "0"
+    os.symlink(tree / "d" / "x.txt", tree / "x")  # after 'd' in walk order
+    revert_symlinks(tree, [], workers=4)
+    assert (tree / "x").read_text() == "x"
+    assert not (tree / "x").is_symlink()
+
+
+class TestPlan:
+    def test_make_plan(self, farm):
+        plan = make_plan(farm / "farm", excludes=[], dedup="hardlink")
+        assert plan.summary() == {"links": 6, "targets": 2, "total_bytes": 5}
+        assert [(e.kind, e.bytes, len(e.links)) for e in plan.entries] == [
+            ("dir", 1, 3),
+            ("file", 4, 3),
+        ]
+        assert make_plan(farm / "farm", excludes=[]).total_bytes == 15
+
+    def test_dump_load(self, farm):
+        plan = make_plan(farm / "farm", excludes=[])
+        buf = io.StringIO()
+        plan.dump(buf)
+        assert json.loads(buf.getvalue())["links"] == 6
+        buf.seek(0)
+        assert Plan.load(buf) == plan
+
+    @pytest.mark.parametrize("dedup", ("none", "hardlink"))
+    def test_execute_resume(self, farm, tmp_path, monkeypatch, dedup):
+        plan = make_plan(farm / "farm", excludes=[], dedup=dedup)
+        journal = tmp_path / "plan.journal"
+
+        calls = []
+        copy_file = fastcopy.copy_file
+
+        def crash_on_second_target(src, dst):
+            calls.append(src)
+            if src.endswith("file.txt"):
+                raise KeyboardInterrupt
+            return copy_file(src, dst)
+
+        monkeypatch.setattr(fastcopy, "copy_file", crash_on_second_target)
+        with pytest.raises(KeyboardInterrupt):
+            execute_plan(plan, journal, CopyEngine(), batch_size=1)
+        assert read_journal(journal) == {0}
+        assert all((farm / "farm" / str(i) / "f").is_symlink() for i in range(3))
+
+        monkeypatch.setattr(fastcopy, "copy_file", copy_file)
+        assert execute_plan(plan, journal, CopyEngine(), batch_size=1) == (1, 1)
+        assert not any(f.is_symlink() for f in (farm / "farm").rglob("*"))
+        assert not list((farm / "farm").rglob(f"*{TMP_SUFFIX}"))
+        assert (farm / "farm" / "2" / "d" / "x.txt").read_text() == "x"
+        assert execute_plan(plan, journal, CopyEngine(), batch_size=1) == (0, 2)
+
+    def test_execute_resume_swap(self, farm, tmp_path, monkeypatch):
+        plan = make_plan(farm / "farm", excludes=[])
+        journal = tmp_path / "plan.journal"
+        rename = os.rename
+
+        def crash_after_unlink(src, dst):
+            monkeypatch.setattr(os, "rename", rename)
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(os, "rename", crash_after_unlink)
+        with pytest.raises(KeyboardInterrupt):
+            execute_plan(plan, journal, CopyEngine(), batch_size=1)
+        assert not os.path.lexists(farm / "farm" / "0" / "d")
+        assert (farm / "farm" / "0" / f"d{TMP_SUFFIX}").is_dir()
+
+        assert execute_plan(plan, journal, CopyEngine(), batch_size=1) == (2, 0)
+        for i in range(3):
+            assert (farm / "farm" / str(i) / "d" / "x.txt").read_text() == "x"
+        assert not list((farm / "farm").rglob(f"*{TMP_SUFFIX}"))
+
+    def test_execute_resume_move(self, farm, tmp_path, monkeypatch):
+        plan = make_plan(farm / "farm", excludes=[], move=True, dedup="hardlink")
+        journal = tmp_path / "plan.journal"
+        move = shutil.move
+
+        def crash_after_unlink(src, dst):
+            monkeypatch.setattr(shutil, "move", move)
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(shutil, "move", crash_after_unlink)
+        with pytest.raises(KeyboardInterrupt):
+            execute_plan(plan, journal, CopyEngine(), batch_size=1)
+        assert not os.path.lexists(farm / "farm" / "0" / "d")
+
+        assert execute_plan(plan, journal, CopyEngine(), batch_size=1) == (2, 0)
+        assert (farm / "farm" / "0" / "dir" / "x.txt").read_text() == "x"
+        assert (farm / "farm" / "2" / "d" / "x.txt").read_text() == "x"
+        assert not (farm / "store" / "dir").exists()
+
+    def test_cli_plan_execute(self, farm, tmp_path):
+        plan_file = tmp_path / "plan.json"
+        root = str(farm / "farm")
+        result = runner.invoke(twlib, ["revert-lks", root, "--plan", str(plan_file)])
+        assert result.exit_code == 0
+        assert json.loads(plan_file.read_text())["targets"] == 2
+        assert (farm / "farm" / "0" / "f").is_symlink()
+
+        result = runner.invoke(twlib, ["revert-lks", root, "--execute", str(plan_file)])
+        assert result.exit_code == 0
+        assert "Executed 2 targets, 0 already done" in result.stdout
+        assert (farm / "farm" / "0" / "f").read_text() == "file"
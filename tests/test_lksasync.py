@@ -0,0 +1,136 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from tests.conftest import REF_PROJ
+from twlib.lks import iter_symlinks, revert_symlinks
+from twlib.lksasync import revert_concurrent, walk
+
+
+def make_tree(root):
+    """Store with a file and a dir, links of all kinds in a nested farm."""
+    (root / "store" / "dir").mkdir(parents=True)
+    (root / "store" / "file.txt").write_text("file")
+    (root / "store" / "dir" / "x.txt").write_text("x")
+    farm = root / "farm"
+    for i in range(4):
+        for j in range(3):
+            d = farm / f"d{i}" / f"e{j}"
+            d.mkdir(parents=True)
+            os.symlink(root / "store" / "file.txt", d / "f")
+            os.symlink(root / "store" / "dir", d / "d")
+            os.symlink("f", d / "chain")  # resolved through a sibling link
+            os.symlink(root / "missing", d / "dangling")
+    (farm / ".git").mkdir()
+    os.symlink(root / "store" / "file.txt", farm / ".git" / "f")
+    return farm
+
+
+def snapshot(root):
+    """Entries below root, absolute link targets relative to the tree's base."""
+    base = str(root.parent)
+    result = {}
+    for dirpath, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(dirpath, name)
+            key = os.path.relpath(path, root)
+            if os.path.islink(path):
+                result[key] = ("link", os.readlink(path).replace(base, ""))
+            elif os.path.isfile(path):
+                with open(path) as fp:
+                    result[key] = ("file", fp.read())
+            else:
+                result[key] = ("dir", None)
+    return result
+
+
+@pytest.fixture
+def trees(tmp_path):
+    return make_tree(tmp_path / "seq"), make_tree(tmp_path / "con")
+
+
+@pytest.mark.parametrize("excludes", [[], [".git"], [".git", "e1"]])
+def test_walk_order(excludes):
+    links = asyncio.run(walk(REF_PROJ, excludes, 4))
+    assert [f for d in links for f in d] == list(iter_symlinks(REF_PROJ, excludes))
+    assert all(len({f.parent for f in d}) == 1 for d in links)
+
+
+def test_walk_excluded_root(trees):
+    assert asyncio.run(walk(trees[0] / ".git", [".git"], 4)) == []
+
+
+@pytest.mark.parametrize("dedup", ["none", "hardlink", "reflink"])
+def test_revert_matches_sequential(trees, dedup):
+    seq, con = trees
+    expected = revert_symlinks(seq, [".git"], dedup=dedup)
+    result = revert_symlinks(con, [".git"], dedup=dedup, concurrency=8)
+    assert result.links == expected.links == 48
+    assert result.stats.files == expected.stats.files
+    assert snapshot(con) == snapshot(seq)
+    assert (con / ".git" / "f").is_symlink()
+
+
+def test_revert_hardlink_replicas(trees):
+    farm = trees[1]
+    revert_concurrent(farm, [".git"], dedup="hardlink", concurrency=4)
+    inodes = {f.stat().st_ino for f in farm.glob("*/*/f")}
+    assert len(inodes) == 1
+    assert len({f.stat().st_ino for f in farm.glob("*/*/d/x.txt")}) == 1
+
+
+def test_revert_move(trees):
+    seq, con = trees
+    revert_symlinks(seq, [".git"], move=True)
+    revert_concurrent(con, [".git"], move=True, concurrency=4)
+    assert snapshot(con) == snapshot(seq)
+    assert snapshot(con.parent / "store") == snapshot(seq.parent / "store")
+
+
+@pytest.mark.parametrize("dedup", ["none", "hardlink"])
+def test_revert_move_chained(tmp_path, dedup):
+    for base in ("seq", "con"):
+        (tmp_path / base / "tgt").mkdir(parents=True)
+        (tmp_path / base / "tgt" / "f").write_text("f")
+        (tmp_path / base / "tree").mkdir()
+        os.symlink("../tgt/f", tmp_path / base / "tree" / "a")
+        os.symlink("a", tmp_path / base / "tree" / "b")
+    seq, con = tmp_path / "seq" / "tree", tmp_path / "con" / "tree"
+    revert_symlinks(seq, [], move=True, dedup=dedup)
+    revert_symlinks(con, [], move=True, dedup=dedup, concurrency=4)
+    assert snapshot(con) == snapshot(seq)
+    assert (con / "b").read_text() == "f"
+
+
+def test_revert_dry_run(trees):
+    farm = trees[1]
+    before = snapshot(farm)
+    result = revert_concurrent(farm, [".git"], dry_run=True, concurrency=4)
+    assert (result.links, result.stats) == (48, None)
+    assert snapshot(farm) == before
+
+
+def test_revert_error(trees, monkeypatch):
+    def fail(*args, **kwargs):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr("twlib.lksasync.restore", fail)
+    with pytest.raises(PermissionError):
+        revert_concurrent(trees[1], [".git"], concurrency=4)
+    with pytest.raises(ValueError, match="concurrency"):
+        revert_concurrent(trees[1], concurrency=0)
+
+
+def test_revert_lks_cli(tmp_path):
+    from typer.testing import CliRunner
+
+    from twlib.main import app
+
+    src = tmp_path / "proj"
+    shutil.copytree(REF_PROJ, src, symlinks=True)
+    result = CliRunner().invoke(app, ["revert-lks", "-c", "4", "-e", ".git", str(src)])
+    assert result.exit_code == 0
+    assert not list(iter_symlinks(src, [".git"]))
+    assert CliRunner().invoke(app, ["revert-lks", "-c", "-1", str(src)]).exit_code
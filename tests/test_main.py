@@ -64,9 +64,13 @@ class TestEpochConvert:
         # result = runner.invoke(app, ["epoch2datetime", epoch, "-v"], input="y\n")
         if is_local:
             mocker.patch(
-                "twlib.main.parse",
+                "dateutil.parser.parse",
                 return_value=datetime.datetime(2012, 9, 13, 7, 22, 50),
             )  # daylight saving
+            mocker.patch(
+                "twlib.timeconv.local_timezone",
+                return_value=datetime.timezone(datetime.timedelta(hours=1)),
+            )  # standard time offset, independent of today's date
             result = runner.invoke(twlib, ["dt2epoch", dt, "--local"])
         else:
             result = runner.invoke(twlib, ["dt2epoch", dt])
@@ -116,6 +120,19 @@ class TestConverter:
         _heic2img(input_file=INPUT_FILE, mode="jpg", out_file=None)
         assert Path(OUTPUT_FILE).exists()
 
+    def test_convert_heic_batch(self, tmp_path):
+        INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+        shutil.copy(INPUT_FILE, tmp_path / "a.heic")
+        shutil.copy(INPUT_FILE, tmp_path / "b.heic")
+        out_dir = tmp_path / "out"
+        result = runner.invoke(
+            twlib, ["heic2img", str(tmp_path), "-o", str(out_dir), "-j", "2"]
+        )
+        print(result.stdout)
+        assert result.exit_code == 0
+        assert "2 files (0 errors, 0 unchanged)" in result.stdout
+        assert (out_dir / "a.jpg").exists() and (out_dir / "b.jpg").exists()
+
     # noinspection PyPep8Naming
     @pytest.mark.skip("Long running test")
     def test__convert_heic_png_custom_path(self):
@@ -139,7 +156,17 @@ class TestRevertLks:
         assert result.exit_code == 0
 
     def test_revert_lks_copy(self):
-        revert_lks(dir_=TEST_PROJ, excludes=[".venv"], dry_run=False, move=False)
+        revert_lks(
+            dir_=TEST_PROJ,
+            excludes=[".venv"],
+            dry_run=False,
+            move=False,
+            workers=1,
+            concurrency=0,
+            dedup="none",
+            plan_file=None,
+            execute_file=None,
+        )
         assert (TEST_PROJ / "lks/d/.run").is_dir()
         assert (TEST_PROJ / "lks/xxx.txt").is_file()
         assert (TEST_PROJ / ".venv/bin/python").is_symlink()  # MUST NOT be reverted
@@ -148,8 +175,28 @@ class TestRevertLks:
         assert (TEST_PROJ / "xxx/xxx.txt").is_file()
         assert (TEST_PROJ / ".venv/bin/python").is_symlink()  # MUST NOT be reverted
 
+    def test_revert_lks_copy_parallel(self):
+        result = runner.invoke(
+            twlib, ["revert-lks", "-e", ".venv", "-j", "2", str(TEST_PROJ)]
+        )
+        print(result.stdout)
+        assert result.exit_code == 0
+        assert (TEST_PROJ / "lks/d/.run").is_dir()
+        assert (TEST_PROJ / "lks/xxx.txt").is_file()
+        assert (TEST_PROJ / ".venv/bin/python").is_symlink()  # MUST NOT be reverted
+
     def test_revert_lks_move(self):
-        revert_lks(dir_=TEST_PROJ, excludes=[".venv"], dry_run=False, move=True)
+        revert_lks(
+            dir_=TEST_PROJ,
+            excludes=[".venv"],
+            dry_run=False,
+            move=True,
+            workers=1,
+            concurrency=0,
+            dedup="none",
+            plan_file=None,
+            execute_file=None,
+        )
         assert (TEST_PROJ / "lks/d/.run").is_dir()
         assert (TEST_PROJ / "lks/xxx.txt").is_file()
         assert (TEST_PROJ / ".venv/bin/python").is_symlink()  # MUST NOT be reverted
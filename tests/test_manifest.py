@@ -0,0 +1,87 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.environment import ROOT_DIR
+from twlib.image import ConvertOptions, convert_batch
+from twlib.main import app as twlib
+from twlib.manifest import Manifest, default_db_file
+
+INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+OPTIONS = ConvertOptions(thumbnail=True)
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def job(tmp_path):
+    input_file = tmp_path / "a.heic"
+    shutil.copy(INPUT_FILE, input_file)
+    return input_file, tmp_path / "out" / "a.jpg"
+
+
+def _run(db_file, job, options=OPTIONS, use_hash=False) -> int:
+    """Run one incremental pass, return number of converted files."""
+    with Manifest(db_file, use_hash=use_hash) as manifest:
+        results = list(convert_batch(manifest.pending([job], options), options))
+        for result in results:
+            manifest.record(result, options)
+    return len(results)
+
+
+class TestManifest:
+    def test_unchanged_is_skipped(self, tmp_path, job):
+        db_file = tmp_path / "db" / "manifest.db"
+        assert _run(db_file, job) == 1
+        assert _run(db_file, job) == 0
+
+    def test_changed_settings(self, tmp_path, job):
+        db_file = tmp_path / "manifest.db"
+        assert _run(db_file, job) == 1
+        assert _run(db_file, job, ConvertOptions(max_size=64, thumbnail=True)) == 1
+
+    def test_stale_output(self, tmp_path, job):
+        db_file = tmp_path / "manifest.db"
+        assert _run(db_file, job) == 1
+        job[1].write_bytes(b"tampered")
+        assert _run(db_file, job) == 1
+        job[1].unlink()
+        assert _run(db_file, job) == 1
+
+    @pytest.mark.parametrize(("use_hash", "converted"), ((False, 1), (True, 0)))
+    def test_touched_input(self, tmp_path, job, use_hash, converted):
+        db_file = tmp_path / "manifest.db"
+        assert _run(db_file, job, use_hash=use_hash) == 1
+        st = os.stat(job[0])
+        os.utime(job[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert _run(db_file, job, use_hash=use_hash) == converted
+
+    def test_cli_incremental(self, tmp_path, job):
+        args = ["heic2img", str(tmp_path), "-t", "-i", "--manifest"]
+        args.append(str(tmp_path / "manifest.db"))
+        result = runner.invoke(twlib, args)
+        assert result.exit_code == 0
+        assert "0 unchanged" in result.stdout
+        result = runner.invoke(twlib, args)
+        assert result.exit_code == 0
+        assert "0 files (0 errors, 1 unchanged)" in result.stdout
+
+    def test_commits_while_running(self, tmp_path, job):
+        db_file = tmp_path / "manifest.db"
+        manifest = Manifest(db_file, commit_every=1)
+        for result in convert_batch(manifest.pending([job], OPTIONS), OPTIONS):
+            manifest.record(result, OPTIONS)
+        with sqlite3.connect(db_file) as con:  # e.g. after a crash before close
+            rows = con.execute("SELECT count(*) FROM heic2img_manifest").fetchone()
+        assert rows == (1,)
+        manifest.close()
+
+    def test_default_db_file(self, tmp_path, job, monkeypatch):
+        monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+        assert default_db_file() == tmp_path / "state" / "twlib" / "heic2img.db"
+        result = runner.invoke(twlib, ["heic2img", str(tmp_path), "-t", "-i"])
+        assert result.exit_code == 0
+        assert default_db_file().exists()
@@ -0,0 +1,39 @@
+import json
+
+from typer.testing import CliRunner
+
+from twlib import metrics
+from twlib.main import app as twlib
+
+runner = CliRunner()
+
+
+def test_span_disabled():
+    assert metrics._recorder is None
+    assert metrics.span("walk") is metrics.span("copy")  # shared null context
+
+
+def test_span_enabled():
+    recorder = metrics.enable()
+    try:
+        for _ in range(3):
+            with metrics.span("walk"):
+                sum(range(1000))
+    finally:
+        assert metrics.disable() is recorder
+    report = recorder.report(command="x")
+    assert report["command"] == "x"
+    assert report["spans"]["walk"]["count"] == 3
+    assert report["spans"]["walk"]["wall"] > 0
+
+
+def test_cli_metrics_and_profile(tmp_path):
+    metrics_file, profile_file = tmp_path / "m.json", tmp_path / "p.prof"
+    args = ["--metrics", str(metrics_file), "--profile", str(profile_file)]
+    result = runner.invoke(twlib, [*args, "epoch2dt"], input="0\n1\n")
+    assert result.exit_code == 0
+    report = json.loads(metrics_file.read_text())
+    assert report["command"] == "epoch2dt"
+    assert report["spans"]["format"]["count"] == 1
+    assert profile_file.stat().st_size > 0
+    assert metrics._recorder is None
@@ -0,0 +1,51 @@
+import shutil
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.environment import ROOT_DIR
+from twlib.image import ConvertOptions
+from twlib.main import app as twlib
+from twlib.pipeline import Pipeline
+
+INPUT_FILE = ROOT_DIR / "tests" / "resources" / "input.heic"
+
+
+def test_pipeline(tmp_path):
+    jobs = []
+    for name in ("a", "b", "c", "d"):
+        shutil.copy(INPUT_FILE, tmp_path / f"{name}.heic")
+        jobs.append((tmp_path / f"{name}.heic", tmp_path / "out" / f"{name}.jpg"))
+    (tmp_path / "b.heic").write_bytes(b"broken")
+    jobs.append((tmp_path / "missing.heic", tmp_path / "out" / "missing.jpg"))
+
+    pipeline = Pipeline(ConvertOptions(thumbnail=True), codec_workers=3, depth=1)
+    results = list(pipeline.run(iter(jobs)))
+
+    assert [r.input_file for r in results] == [job[0] for job in jobs]
+    assert [r.error is None for r in results] == [True, False, True, True, False]
+    assert all(out.exists() for _, out in jobs[2:4])
+    assert [s.items for s in pipeline.stats] == [5, 5, 5]
+    assert pipeline.bottleneck.name in ("read", "codec", "write")
+
+
+def test_pipeline_reader_error(tmp_path):
+    def jobs():
+        yield INPUT_FILE, tmp_path / "a.jpg"
+        raise RuntimeError("listing failed")
+
+    pipeline = Pipeline(ConvertOptions(thumbnail=True))
+    with pytest.raises(RuntimeError, match="listing failed"):
+        list(pipeline.run(jobs()))
+
+
+def test_pipeline_incremental_cli(tmp_path):
+    shutil.copy(INPUT_FILE, tmp_path / "a.heic")
+    args = ["heic2img", str(tmp_path), "-t", "-i", "-p", "-o", str(tmp_path / "out")]
+    args += ["--manifest", str(tmp_path / "manifest.db")]
+    result = CliRunner().invoke(twlib, args)
+    assert result.exit_code == 0
+    assert "1 files (0 errors, 0 unchanged)" in result.stdout
+    assert (tmp_path / "out" / "a.jpg").exists()
+    result = CliRunner().invoke(twlib, args)
+    assert "0 files (0 errors, 1 unchanged)" in result.stdout
@@ -0,0 +1,71 @@
+import os
+import random
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.main import app as twlib
+from twlib.relpath import relative_path, relative_paths
+
+runner = CliRunner()
+
+
+def random_path() -> str:
+    parts = random.choices(["a", "b", "cc", "d d"], k=random.randint(1, 5))
+    return "/" + "/".join(parts)
+
+
+def test_relative_path_matches_relpath():
+    for _ in range(2000):
+        source, target = random_path(), random_path()
+        expected = os.path.normpath(
+            os.path.join(
+                os.path.relpath(os.path.dirname(target), os.path.dirname(source)),
+                os.path.basename(target),
+            )
+        )
+        assert relative_path(source, target) == expected
+
+
+@pytest.mark.parametrize(
+    ("source", "target", "expected"),
+    (
+        ("/a/b/", "/a/c/", "c"),
+        ("/a/b/x.txt", "/a/c/", "../c"),
+        ("/a/b/.", "/a/./c/y.txt", "c/y.txt"),
+        ("/a//b/x.txt", "/a/c//y.txt", "../c/y.txt"),
+    ),
+)
+def test_relative_path_normalizes_like_pathlib(source, target, expected):
+    parent = os.path.relpath(Path(target).parent, Path(source).parent)
+    assert str(Path(parent) / Path(target).name) == expected  # the former version
+    assert relative_path(source, target) == expected
+
+
+def test_relative_paths():
+    pairs = [
+        ("/site/a/index.html", "/site/img/x.png"),
+        "/site/a/b/page.html\t/site/a/style with space.css\n",
+        "/site/x.html /site/y.html",
+        "relative/x.html /site/y.html",
+        "too many fields here",
+    ]
+    assert list(relative_paths(pairs)) == [
+        "../img/x.png",
+        "../style with space.css",
+        "y.html",
+        "",
+        "",
+    ]
+
+
+def test_relative_bulk_cli(tmp_path):
+    manifest = tmp_path / "pairs.tsv"
+    manifest.write_text("/a/b/c.txt\t/a/d/e.txt\n\n/a/b.txt\t/a/b.txt\n")
+    result = runner.invoke(twlib, ["relative", "-f", str(manifest)])
+    assert result.exit_code == 0
+    assert result.stdout == "../d/e.txt\nb.txt\n"
+
+    result = runner.invoke(twlib, ["relative"], input="/a/b/c.txt /a/d/e.txt\n")
+    assert result.stdout == "../d/e.txt\n"
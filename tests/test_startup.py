@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Regression budget for the lightweight commands which are called from shell hooks.
+STARTUP_BUDGET_S = float(os.environ.get("TWLIB_STARTUP_BUDGET", "1.0"))
+MAX_MODULES = 250
+HEAVY_MODULES = ("PIL", "pillow_heif", "dateutil", "numpy")
+
+LIGHT_COMMANDS = (
+    ["relative", "/a/b/c.txt", "/a/d/e.txt"],
+    ["epoch2dt", "1347517370000"],
+    ["snake-say", "hi"],
+)
+
+PROBE = """
+import json, sys
+from twlib.main import app
+try:
+    app({args!r})
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _imported_modules(args: list[str]) -> list[str]:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(args=args)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("args", LIGHT_COMMANDS)
+def test_light_commands_import_set(args):
+    modules = _imported_modules(args)
+    heavy = [m for m in modules if m.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    assert len(modules) <= MAX_MODULES
+
+
+@pytest.mark.parametrize("args", LIGHT_COMMANDS)
+def test_light_commands_cold_start(args):
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "twlib", *args], capture_output=True, check=True
+        )
+        timings.append(time.perf_counter() - start)
+    print(f"\n{args[0]}: {min(timings):.3f}s")
+    assert min(timings) < STARTUP_BUDGET_S
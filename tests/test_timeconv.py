@@ -0,0 +1,162 @@
+import datetime
+import random
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.main import app as twlib
+from twlib.timeconv import (
+    DT_FMT,
+    ISO,
+    _numpy,
+    detect_format,
+    dt2epoch_stream,
+    epoch2dt_stream,
+    format_epochs,
+    format_epochs_numpy,
+    local_timezone,
+)
+
+runner = CliRunner()
+
+EPOCHS = [1347517370000, 0, -1, -999, -1001, 1679792400000, 1698541200000]
+EPOCHS += [random.randint(-(10**12), 4 * 10**12) for _ in range(1000)]
+
+formatters = [format_epochs]
+if _numpy() is not None:
+    formatters.append(format_epochs_numpy)
+
+
+@pytest.mark.parametrize("formatter", formatters)
+@pytest.mark.parametrize("to_local", (False, True))
+def test_format_epochs(formatter, to_local):
+    if to_local:
+        ref = datetime.datetime.fromtimestamp
+    else:
+        ref = datetime.datetime.utcfromtimestamp
+    expected = [ref(e / 1000).strftime(DT_FMT) for e in EPOCHS]
+    assert formatter(EPOCHS, to_local) == expected
+
+
+@pytest.mark.parametrize(
+    "use_numpy", (False, True) if len(formatters) > 1 else (False,)
+)
+def test_epoch2dt_stream(use_numpy):
+    lines = ["1347517370000\n", "abc\n", "\n", "0"] * 3
+    chunks = list(epoch2dt_stream(lines, chunk_size=5, use_numpy=use_numpy))
+    assert [len(c) for c in chunks] == [5, 5, 2]
+    assert sum(chunks, [])[:4] == ["2012-09-13 06:22:50", "", "", "1970-01-01 00:00:00"]
+
+
+@pytest.mark.parametrize(
+    "use_numpy", (False, True) if len(formatters) > 1 else (False,)
+)
+@pytest.mark.parametrize("to_local", (False, True))
+def test_epoch2dt_stream_out_of_range(use_numpy, to_local):
+    lines = ["1347517370000", "100000000000000000000", "-99999999999999999"]
+    lines += ["-30610224000000"]
+    chunks = list(epoch2dt_stream(lines, to_local=to_local, use_numpy=use_numpy))
+    assert chunks[0][1:3] == ["", ""]
+    assert chunks[0][3][:4] in ("0999", "1000")  # zero padded on both paths
+
+
+@pytest.fixture
+def set_tz(monkeypatch):
+    def set_tz(tz):
+        monkeypatch.setenv("TZ", tz)
+        time.tzset()
+
+    yield set_tz
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_local_zone_change(set_tz):
+    set_tz("UTC")
+    assert sum(epoch2dt_stream(["0"], to_local=True), []) == ["1970-01-01 00:00:00"]
+    assert local_timezone().utcoffset(None) == datetime.timedelta(0)
+    set_tz("Asia/Tokyo")
+    assert sum(epoch2dt_stream(["0"], to_local=True), []) == ["1970-01-01 09:00:00"]
+    assert local_timezone().utcoffset(None) == datetime.timedelta(hours=9)
+
+
+def test_epoch2dt_bulk_cli():
+    result = runner.invoke(twlib, ["epoch2dt"], input="1347517370000\n0\n")
+    assert result.exit_code == 0
+    assert result.stdout == "2012-09-13 06:22:50\n1970-01-01 00:00:00\n"
+
+
+@pytest.mark.parametrize(
+    "sample, fmt",
+    (
+        (["2012-09-13 06:22:50", "2012-09-13T06:22:50.123"], ISO),
+        (["13.09.2012 06:22:50", ""], "%d.%m.%Y %H:%M:%S"),
+        (["20120913062250"], "%Y%m%d%H%M%S"),
+        (["Sep 13 2012 6:22"], None),
+    ),
+)
+def test_detect_format(sample, fmt):
+    assert detect_format(sample) == fmt
+
+
+@pytest.mark.parametrize(
+    "use_numpy", (False, True) if len(formatters) > 1 else (False,)
+)
+def test_dt2epoch_stream(use_numpy):
+    lines = ["2012-09-13 06:22:50\n", "2012-09-13T06:22:50.5\n", "abc\n"]
+    lines += ["13 Sep 2012 06:22:50\n", "2012-09-13 08:22:50+02:00"]
+    chunks = list(dt2epoch_stream(lines, chunk_size=2, use_numpy=use_numpy))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert sum(chunks, []) == [
+        "1347517370000",
+        "1347517370500",
+        "",
+        "1347517370000",  # dateutil fallback
+        "1347517370000",
+    ]
+
+
+@pytest.mark.parametrize(
+    "use_numpy", (False, True) if len(formatters) > 1 else (False,)
+)
+def test_dt2epoch_stream_blank(use_numpy):
+    lines = ["2012-09-13 06:22:50\n", "\n", "2012-09-13T06:22:51"]
+    chunks = list(dt2epoch_stream(lines, fmt=ISO, use_numpy=use_numpy))
+    assert chunks == [["1347517370000", "", "1347517371000"]]
+
+
+@pytest.mark.skipif(_numpy() is None, reason="needs numpy")
+@pytest.mark.parametrize(
+    "value",
+    ("today", "now", "2012", "2012-09", "20120913", "+2012-09-13", "0000-01-01"),
+)
+def test_dt2epoch_stream_numpy_literals(value):
+    lines = ["2012-09-13 06:22:50", value]
+    expected = list(dt2epoch_stream(lines, fmt=ISO, use_numpy=False))
+    assert list(dt2epoch_stream(lines, fmt=ISO, use_numpy=True)) == expected
+
+
+def test_dt2epoch_stream_local():
+    values = ["2012-09-13 06:22:50", "2023-01-01 00:00:00"]
+    offset = datetime.datetime.now().astimezone().utcoffset()
+    expected = [
+        str(
+            int(
+                datetime.datetime.fromisoformat(v)
+                .replace(tzinfo=datetime.timezone(offset))
+                .timestamp()
+                * 1000
+            )
+        )
+        for v in values
+    ]
+    assert sum(dt2epoch_stream(values, is_local=True), []) == expected
+
+
+def test_dt2epoch_bulk_cli():
+    result = runner.invoke(
+        twlib, ["dt2epoch", "-F", "%d.%m.%Y %H:%M"], input="13.09.2012 06:22\n"
+    )
+    assert result.exit_code == 0
+    assert result.stdout == "1347517320000\n"
@@ -0,0 +1,140 @@
+import io
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from twlib.main import app as twlib
+from twlib.tscol import Converter, detect_unit, rewrite_csv, rewrite_jsonl
+
+runner = CliRunner()
+
+CSV = "id,ts,name\n1,1347517370000,a\n2,,b\n3,abc,c\n4,1679792400000,d\n"
+
+
+@pytest.mark.parametrize(
+    "values, unit",
+    (
+        (["1347517370"], "s"),
+        ([1347517370000, "", None], "ms"),
+        (["1347517370000000"], "us"),
+        (["1347517370000000000"], "ns"),
+        (["0"], "s"),
+    ),
+)
+def test_detect_unit(values, unit):
+    assert detect_unit(values) == unit
+
+
+@pytest.mark.parametrize(
+    "converter, value, expected",
+    (
+        (Converter("dt", unit="ms"), 1347517370000, "2012-09-13 06:22:50"),
+        (Converter("dt", unit="s"), 1347517370, "2012-09-13 06:22:50"),
+        (
+            Converter("dt", tz="Europe/Berlin", unit="ns", fmt="iso"),
+            1347517370123456789,
+            "2012-09-13T08:22:50.123456+02:00",
+        ),
+        (
+            Converter("dt", tz="America/New_York", unit="ms", fmt="%d.%m.%Y %H:%M"),
+            1679792400000,  # 2023-03-26 01:00 UTC
+            "25.03.2023 21:00",
+        ),
+        (
+            Converter("epoch", unit="ms", fmt="iso"),
+            "2012-09-13 06:22:50",
+            1347517370000,
+        ),
+        (
+            Converter("epoch", tz="Europe/Berlin", unit="s", fmt="iso"),
+            "2012-09-13 08:22:50",
+            1347517370,
+        ),
+        (  # explicit offsets win over tz
+            Converter("epoch", tz="Asia/Tokyo", unit="us", fmt="iso"),
+            "2012-09-13T08:22:50.5+02:00",
+            1347517370500000,
+        ),
+        (  # dateutil fallback
+            Converter("epoch", tz="Europe/Berlin", unit="ms"),
+            "13 Jan 2023 10:00",
+            1673600400000,
+        ),
+    ),
+)
+def test_converter(converter, value, expected):
+    assert converter(value) == expected
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_rewrite_csv(workers):
+    out = io.StringIO()
+    stats = rewrite_csv(
+        io.StringIO(CSV), out, ["ts"], Converter("dt"), chunk_size=2, workers=workers
+    )
+    assert (stats.rows, stats.errors) == (4, 1)
+    assert out.getvalue().splitlines() == [
+        "id,ts,name",
+        "1,2012-09-13 06:22:50,a",
+        "2,,b",
+        "3,abc,c",
+        "4,2023-03-26 01:00:00,d",
+    ]
+
+
+def test_rewrite_csv_missing_column():
+    with pytest.raises(ValueError, match="xx"):
+        rewrite_csv(io.StringIO(CSV), io.StringIO(), ["xx"], Converter("dt"))
+
+
+def test_rewrite_jsonl_roundtrip():
+    lines = [{"ts": 1347517370, "x": 1}, {"ts": None}, {"x": 2}, [1, 2], "ts"]
+    text = "".join(json.dumps(r) + "\n" for r in lines)
+    out = io.StringIO()
+    to_dt = Converter("dt", tz="Europe/Berlin")
+    rewrite_jsonl(io.StringIO(text), out, ["ts"], to_dt)
+    assert json.loads(out.getvalue().splitlines()[0])["ts"] == "2012-09-13 08:22:50"
+
+    back = io.StringIO()
+    to_epoch = Converter("epoch", tz="Europe/Berlin", unit="s")
+    rewrite_jsonl(io.StringIO(out.getvalue()), back, ["ts"], to_epoch)
+    assert [json.loads(line) for line in back.getvalue().splitlines()] == lines
+
+
+def test_rewrite_ts_cli_in_place(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text(CSV)
+    result = runner.invoke(
+        twlib, ["rewrite-ts", str(csv_file), "-c", "ts", "--tz", "UTC", "-i"]
+    )
+    assert result.exit_code == 0
+    assert csv_file.read_text().splitlines()[1] == "1,2012-09-13 06:22:50,a"
+    assert list(tmp_path.iterdir()) == [csv_file]
+
+
+def test_rewrite_ts_cli_jsonl_not_objects(tmp_path):
+    jsonl_file = tmp_path / "data.jsonl"
+    jsonl_file.write_text('[1, 2]\n{"ts": 1}\n')
+    args = ["rewrite-ts", str(jsonl_file), "-c", "ts", "--kind", "jsonl", "-i"]
+    result = runner.invoke(twlib, [*args, "--tz", "UTC"])
+    assert result.exit_code == 0
+    assert jsonl_file.read_text() == '[1, 2]\n{"ts": "1970-01-01 00:00:01"}\n'
+    assert list(tmp_path.iterdir()) == [jsonl_file]
+
+
+@pytest.mark.parametrize(
+    "args", (["-c", "xx"], ["-c", "ts", "-u", "days"], ["-c", "ts", "--kind", "xml"])
+)
+def test_rewrite_ts_cli_in_place_invalid(tmp_path, args):
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text(CSV)
+    result = runner.invoke(twlib, ["rewrite-ts", str(csv_file), "-i", *args])
+    assert result.exit_code == 2
+    assert csv_file.read_text() == CSV
+    assert list(tmp_path.iterdir()) == [csv_file]
+
+
+def test_rewrite_ts_cli_invalid_tz():
+    result = runner.invoke(twlib, ["rewrite-ts", "-c", "ts", "--tz", "Mars/Base"])
+    assert result.exit_code != 0